@@ -0,0 +1,4 @@
+"""性能基准测试 (在仓库根目录下以 python -m benchmarks.<name> 运行)
+
+python -m benchmarks.suite 运行全部关键指标、写出 JSON 并与保存的基线比较，用于发现性能退化。
+"""
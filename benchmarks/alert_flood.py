@@ -0,0 +1,89 @@
+"""告警风暴基准：多泵窗口在大量告警待确认时，进度信号是否仍按全速处理
+
+一个后台线程以最快速度为每台泵发出 progress_updated，并按 --alert-every 的间隔发出 remaining_low_warning
+和 infusion_rejected (跨线程，经事件循环排队)。分别在 没有告警 / 告警风暴 两种情况下统计事件循环每秒处理的
+进度更新数；告警按 (类型, 泵) 合并，待确认的告警数不超过 2 x 泵数。使用 offscreen 平台。
+
+    python -m benchmarks.alert_flood [--pumps 32] [--seconds 2] [--alert-every 10]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from ui import PumpBenchWindow  # noqa: E402
+
+MAX_QUEUED = 2000  # 排队等待处理的进度更新数上限
+
+
+def flood(window, seconds, alert_every):
+    """返回 (事件循环处理的进度更新数, 发出的告警信号数, 实际耗时)"""
+    processed = [0]
+
+    def count(*args):
+        processed[0] += 1
+    for tile in window.tiles:
+        tile.pump.progress_updated.connect(count)
+
+    stop = threading.Event()
+    alerts_sent = [0]
+
+    def produce():
+        i = sent = 0
+        while not stop.is_set():
+            if sent - processed[0] > MAX_QUEUED:
+                time.sleep(0.0005)  # 事件循环跟不上时等待，队列长度有上限
+                continue
+            for tile in window.tiles:
+                tile.pump.progress_updated.emit(i % 100 * 0.1, 10.0, 200.0)
+                if alert_every and i % alert_every == 0:
+                    tile.pump.remaining_low_warning.emit()
+                    tile.pump.infusion_rejected.emit("开始注射失败", "剩余药量不足")
+                    alerts_sent[0] += 2
+            i += 1
+            sent += len(window.tiles)
+
+    app = QApplication.instance()
+    producer = threading.Thread(target=produce)
+    started = time.perf_counter()
+    producer.start()
+    while time.perf_counter() - started < seconds:
+        app.processEvents()
+    stop.set()
+    producer.join()
+    elapsed = time.perf_counter() - started
+    app.processEvents()  # 处理排队中剩余的信号
+    for tile in window.tiles:
+        tile.pump.progress_updated.disconnect(count)
+    return processed[0], alerts_sent[0], elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pumps", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--alert-every", type=int, default=10, help="每台泵每发出多少次进度发出一次告警")
+    args = parser.parse_args(argv)
+
+    app = QApplication(sys.argv)  # noqa: F841
+    window = PumpBenchWindow(args.pumps)
+    window.show()
+
+    for label, alert_every in (("no alerts", 0), ("alert storm", args.alert_every)):
+        while window.alerts.acknowledge() is not None:  # 每轮开始时清空待确认的告警
+            pass
+        processed, sent, elapsed = flood(window, args.seconds, alert_every)
+        print(f"{label:>12}: {processed / elapsed:>10,.0f} progress updates/s processed, "
+              f"{sent:>7} alert signals -> {len(window.alerts)} pending alerts "
+              f"({window.alerts.coalesced} coalesced so far)")
+    window.manager.shutdown(2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
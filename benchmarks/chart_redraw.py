@@ -0,0 +1,63 @@
+"""实时曲线基准：10 分钟与 10 天的会话，内存占用和整跨度重绘耗时是否保持不变
+
+在 offscreen 平台上运行，不显示窗口。样本按每 0.2 s 一个写入 (StepPlanner 的默认刷新周期)。
+
+    python -m benchmarks.chart_redraw [--repeat 20]
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtGui import QPixmap  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from ui import LiveChart  # noqa: E402
+
+SAMPLE_PERIOD = 0.2  # 样本间隔 (s)
+
+
+def fill(chart, seconds):
+    """写入 seconds 秒的模拟进度，返回写入耗时 (s)"""
+    now = [0.0]
+    chart.clock = lambda: now[0]
+    chart._origin = 0.0
+    volume = 0.0
+    started = time.perf_counter()
+    for i in range(int(seconds / SAMPLE_PERIOD)):
+        now[0] = i * SAMPLE_PERIOD
+        volume += SAMPLE_PERIOD * 0.01 * (1.5 + math.sin(i / 5000))
+        chart.add_sample(volume % 200)
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="每种情况重绘的次数")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    print(f"{'session':>10}  {'samples':>9}  {'memory KiB':>10}  {'append us':>9}  {'redraw ms':>9}")
+    for label, seconds in (("10 min", 600), ("10 h", 36000), ("10 days", 864000)):
+        chart = LiveChart()
+        chart.resize(800, 160)
+        elapsed = fill(chart, seconds)
+        chart.span = seconds
+        pixmap = QPixmap(chart.size())
+        chart.render(pixmap)
+        app.processEvents()
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            chart.render(pixmap)
+        redraw = (time.perf_counter() - started) / args.repeat * 1000
+        memory = (chart.volume.memory + chart.rate.memory) / 1024
+        samples = len(chart.volume)
+        print(f"{label:>10}  {samples:>9}  {memory:>10.0f}  {elapsed / samples * 1e6:>9.2f}  {redraw:>9.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
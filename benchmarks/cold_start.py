@@ -0,0 +1,112 @@
+"""冷启动基准：无界面命令行 (python -m srtp run) vs 主窗口 (延迟/立即构建次要面板)
+
+每种情况在新的解释器进程中运行若干次，取中位数。父进程传入启动前的单调时钟
+(Linux 上各进程共用 CLOCK_MONOTONIC)，因此时间包含解释器自身的启动。
+    cli      启动到一次注射 (--fast，默认 50 uL / 0.05 uL/s) 结束，同时确认没有加载 PyQt6
+             (NumPy 由计划校验在检查参数时才导入，与界面点击开始时相同)
+    gui      启动到主窗口第一次绘制，以及到次要面板 (设备信息、操作日志) 构建完成；
+             各阶段 (导入、构建、首次绘制、次要面板) 取自 MainWindow.startup
+
+    python -m benchmarks.cold_start [--repeats 5] [--volume 50] [--speed 0.05]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CLI = """
+import json, runpy, sys, time
+launched = float(sys.argv[1])
+sys.argv = ["srtp", "run", "--volume", sys.argv[2], "--speed", sys.argv[3], "--fast", "--quiet"]
+try:
+    runpy.run_module("srtp", run_name="__main__")
+except SystemExit as e:
+    code = e.code
+print(json.dumps({"total_ms": (time.monotonic() - launched) * 1000, "exit": code,
+                  "pyqt6": "PyQt6" in sys.modules, "numpy": "numpy" in sys.modules}), file=sys.stderr)
+"""
+
+GUI = """
+import json, sys, time
+launched = float(sys.argv[1])
+offset = time.monotonic() - time.perf_counter()
+defer = sys.argv[2] == "1"
+import ui
+from srtp.metrics import PhaseTimer
+startup = PhaseTimer(ui.STARTED)
+startup.mark("import")
+app = ui.QApplication(sys.argv[:1])
+window = ui.MainWindow(startup, defer_panels=defer)
+window.show()
+done = "panels" if defer else "first_paint"
+deadline = time.monotonic() + 30
+while done not in startup.phases and time.monotonic() < deadline:
+    app.processEvents()
+origin = (ui.STARTED + offset - launched) * 1000  # 解释器启动到开始导入 PyQt6
+print(json.dumps({"interpreter_ms": origin,
+                  "first_paint_ms": origin + startup.phases["first_paint"] * 1000,
+                  "total_ms": origin + startup.phases[done] * 1000,
+                  "phases_ms": {name: seconds * 1000 for name, seconds in startup.durations().items()}}),
+      file=sys.stderr)
+window.close()
+"""
+
+
+def probe(script, *args):
+    """在新进程中运行 script，返回它在 stderr 最后一行输出的 JSON"""
+    launched = time.monotonic()
+    process = subprocess.run([sys.executable, "-c", script, repr(launched), *map(str, args)],
+                             cwd=ROOT, capture_output=True, text=True, timeout=120,
+                             env={**os.environ, "QT_QPA_PLATFORM": os.environ.get("QT_QPA_PLATFORM", "offscreen")})
+    if process.returncode:
+        raise RuntimeError(process.stderr)
+    return json.loads(process.stderr.strip().splitlines()[-1])
+
+
+def median_of(samples, key):
+    return statistics.median(sample[key] for sample in samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5, help="每种情况的进程数")
+    parser.add_argument("--volume", type=float, default=50.0, help="命令行注射的目标量 (uL)")
+    parser.add_argument("--speed", type=float, default=0.05, help="命令行注射的速度 (uL/s)")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+    args = parser.parse_args(argv)
+
+    cli = [probe(CLI, args.volume, args.speed) for _ in range(args.repeats)]
+    gui = {defer: [probe(GUI, int(defer)) for _ in range(args.repeats)] for defer in (True, False)}
+    results = {
+        "cli": {"total_ms": median_of(cli, "total_ms"), "exit": cli[0]["exit"],
+                "loads_pyqt6": any(s["pyqt6"] for s in cli), "loads_numpy": any(s["numpy"] for s in cli)},
+    }
+    for defer, samples in gui.items():
+        results["gui_deferred" if defer else "gui_eager"] = {
+            "first_paint_ms": median_of(samples, "first_paint_ms"),
+            "total_ms": median_of(samples, "total_ms"),
+            "phases_ms": {name: statistics.median(s["phases_ms"][name] for s in samples)
+                          for name in samples[0]["phases_ms"]},
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return 0
+    c = results["cli"]
+    print(f"cli  {args.volume:g} uL @ {args.speed:g} uL/s --fast: {c['total_ms']:7.1f} ms to result "
+          f"(exit {c['exit']}, PyQt6 loaded: {c['loads_pyqt6']}, NumPy loaded: {c['loads_numpy']})")
+    for name in ("gui_deferred", "gui_eager"):
+        g = results[name]
+        phases = ", ".join(f"{phase} {ms:.1f}" for phase, ms in g["phases_ms"].items())
+        print(f"{name:<13}: {g['first_paint_ms']:7.1f} ms to first paint, {g['total_ms']:7.1f} ms to complete "
+              f"window  [{phases} ms]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
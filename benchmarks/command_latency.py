@@ -0,0 +1,112 @@
+"""命令确认延迟基准
+
+在 speed_input 的完整范围 (0.001 - 1.0 uL/s) 内启动模拟注射，
+在注射线程等待下一步时发出暂停/停止命令，记录从发出到注射线程确认的延迟。
+最后检查暂停确认后立即恢复 (注射线程可能还在退出) 的命令也都得到确认，
+以及多个线程同时开始同一台泵时只有一个成功，且非界面线程发出的开始交给界面线程启动注射线程。
+
+    python -m benchmarks.command_latency
+"""
+import statistics
+import sys
+import threading
+import time
+
+from srtp.clock import MonotonicClock
+from srtp.scheduler import StepPlanner
+from ui import DrugPumpSimulator, QApplication
+
+SPEEDS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0]
+REPEATS = 5
+RESUMES = 50
+STARTERS = 16
+
+
+def measure(speed, action):
+    """返回一次 暂停/停止 命令的确认延迟 (毫秒)"""
+    pump = DrugPumpSimulator()
+    started = pump.start_infusion(200, speed)
+    if not started.wait(5):
+        raise RuntimeError("注射线程未确认开始命令")
+    time.sleep(0.02)  # 让注射线程进入等待下一步的状态
+    command = pump.pause_infusion() if action == "pause" else pump.stop_infusion()
+    if not command.wait(5):
+        raise RuntimeError(f"注射线程未确认{action}命令")
+    pump.wait()
+    return command.latency * 1000
+
+
+def pause_resume(speed=0.5, cycles=RESUMES):
+    """暂停一确认就恢复，重复 cycles 次，返回 (得到确认的恢复次数, 各次恢复的确认延迟 ms)"""
+    pump = DrugPumpSimulator()
+    if not pump.start_infusion(200, speed).wait(5):
+        raise RuntimeError("注射线程未确认开始命令")
+    latencies = []
+    for _ in range(cycles):
+        time.sleep(0.01)
+        if not pump.pause_infusion().wait(5):
+            raise RuntimeError("注射线程未确认暂停命令")
+        command = pump.start_infusion(200, speed, is_resume=True)
+        if command and command.wait(1):
+            latencies.append(command.latency * 1000)
+    pump.stop_infusion()
+    pump.wait()
+    return len(latencies), latencies
+
+
+def concurrent_start(starters=STARTERS):
+    """starters 个线程同时开始同一台泵 (界面线程处理事件)，返回 (成功次数, 开始命令是否得到确认)"""
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    pump = DrugPumpSimulator()
+    barrier = threading.Barrier(starters)
+    commands = []
+
+    def starter():
+        barrier.wait()
+        command = pump.start_infusion(200, 0.5)
+        if command:
+            commands.append(command)
+
+    threads = [threading.Thread(target=starter) for _ in range(starters)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # 频繁切换线程，让检查和进入运行状态之间的竞争更容易出现
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    deadline = time.monotonic() + 5
+    while commands and not commands[0].wait(0) and time.monotonic() < deadline:
+        app.processEvents()  # 排队的启动请求在界面线程中执行
+        time.sleep(0.001)
+    acknowledged = bool(commands) and commands[0].wait(0)
+    pump.stop_infusion()
+    pump.wait()
+    return len(commands), acknowledged
+
+
+def main():
+    print(f"{'speed (uL/s)':>12} {'step (s)':>9} {'action':>6} {'median (ms)':>12} {'max (ms)':>9}")
+    worst = 0.0
+    planner, clock = StepPlanner(), MonotonicClock()  # 与模拟泵默认的步长选择相同
+    for speed in SPEEDS:
+        for action in ("pause", "stop"):
+            samples = [measure(speed, action) for _ in range(REPEATS)]
+            worst = max(worst, max(samples))
+            print(f"{speed:>12.3f} {planner.period(speed, clock):>9.3f} {action:>6} "
+                  f"{statistics.median(samples):>12.3f} {max(samples):>9.3f}")
+    print(f"worst-case command-to-acknowledge latency: {worst:.3f} ms")
+    acknowledged, latencies = pause_resume()
+    print(f"resume right after pause: {acknowledged}/{RESUMES} acknowledged, "
+          f"median {statistics.median(latencies) if latencies else float('nan'):.3f} ms")
+    assert acknowledged == RESUMES, "暂停后立即恢复的命令没有得到确认"
+    started, acknowledged = concurrent_start()
+    print(f"{STARTERS} threads starting one pump at once: {started} started, acknowledged: {acknowledged}")
+    assert started == 1 and acknowledged, "同时开始同一台泵时应当只有一个成功并得到确认"
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
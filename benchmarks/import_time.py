@@ -0,0 +1,51 @@
+"""导入耗时基准：纯 Python 核心 vs Qt 界面模块
+
+每种情况在新的解释器进程中导入若干次，取中位数；同时确认导入核心不会加载 PyQt6。
+
+    python -m benchmarks.import_time [--repeats 5]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ("srtp.engine", "import srtp.engine"),
+    ("srtp.aio", "import srtp.aio"),
+    ("srtp CLI", "import srtp.__main__"),
+    ("ui (PyQt6)", "import ui"),
+]
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+{statement}
+print(time.perf_counter() - started, "PyQt6" in sys.modules)
+"""
+
+
+def measure(statement):
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(statement=statement)],
+        cwd=ROOT, capture_output=True, text=True, check=True).stdout.split()
+    return float(output[0]), output[1] == "True"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5, help="每种情况的进程数")
+    args = parser.parse_args(argv)
+
+    print(f"{'module':<14} {'import (ms)':>12} {'loads PyQt6':>12}")
+    for name, statement in CASES:
+        samples = [measure(statement) for _ in range(args.repeats)]
+        median = statistics.median(seconds for seconds, _ in samples) * 1000
+        print(f"{name:<14} {median:>12.1f} {str(samples[0][1]):>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""注射日志写入开销基准
+
+1. 单独测量每条步进检查点的追加耗时 (不同落盘间隔)；
+2. 用虚拟时钟无界面排空 5000 uL 储药器，比较有无注射日志时每一步的耗时；
+3. 在主线程 (相当于界面线程) 中开始、暂停、恢复、停止、补药，检查主线程从不落盘 (fsync)，
+   且日志按顺序记录了全部状态变化。
+
+    python -m benchmarks.journal_overhead [--records 50000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from srtp.clock import VirtualClock
+from srtp.journal import (
+    REC_PAUSE, REC_REFILL, REC_RESUME, REC_START, REC_STEP, REC_STOP, InfusionJournal, replay)
+from ui import DrugPumpSimulator
+
+
+def append_cost(directory, sync_interval, records):
+    """返回 (每条追加耗时 us, fsync 次数)"""
+    journal = InfusionJournal(os.path.join(directory, f"append-{sync_interval}.journal"), sync_interval)
+    started = time.perf_counter()
+    for i in range(records):
+        journal.append(REC_STEP, i * 0.1, records * 0.1, 5000 - i * 0.1, 1.0)
+    journal.close()
+    return (time.perf_counter() - started) / records * 1e6, journal.syncs
+
+
+def drain_cost(journal):
+    """无界面排空储药器，返回每一步耗时 (us)"""
+    pump = DrugPumpSimulator(clock=VirtualClock(), threaded=False, progress_rate=None, journal=journal)
+    started = time.perf_counter()
+    pump.start_infusion(pump.remaining_medicine, 1.0)
+    return (time.perf_counter() - started) / pump.scheduler.ticks * 1e6
+
+
+class CommitThreads(InfusionJournal):
+    """记录在哪些线程中落盘"""
+
+    def __init__(self, *args, **kwargs):
+        self.threads = set()
+        super().__init__(*args, **kwargs)
+
+    def _commit(self):
+        self.threads.add(threading.current_thread().name)
+        super()._commit()
+
+
+def ui_thread_io(directory):
+    """在主线程中操作有注射日志的泵，返回 (落盘的线程名, 状态变化记录的类型序列)"""
+    path = os.path.join(directory, "ui.journal")
+    journal = CommitThreads(path)
+    pump = DrugPumpSimulator(journal=journal)  # 打开时写入初始储药量 (启动阶段，不计)
+    threading.current_thread().name = "ui"
+    for command in (lambda: pump.start_infusion(100, 0.5), pump.pause_infusion,
+                    lambda: pump.start_infusion(100, 0.5, is_resume=True), pump.pause_infusion):
+        if not command().wait(5):
+            raise RuntimeError("注射线程未确认命令")
+        time.sleep(0.05)
+    pump.wait()
+    pump.stop_infusion()  # 已暂停：直接停止
+    pump.refill()
+    time.sleep(0.05)  # 让写盘线程落盘 (否则由 close 落盘)
+    journal.close()
+    threading.current_thread().name = "MainThread"
+    kinds = [record.kind for record in replay(path).records if record.kind != REC_STEP]
+    return journal.threads, kinds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=50000, help="追加的检查点条数")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'sync interval (s)':>18} {'append (us)':>12} {'fsyncs':>7}")
+        for sync_interval in (1.0, 0.1, 0.01):
+            cost, syncs = append_cost(directory, sync_interval, args.records)
+            print(f"{sync_interval:>18} {cost:>12.2f} {syncs:>7}")
+
+        baseline = drain_cost(None)
+        path = os.path.join(directory, "drain.journal")
+        journal = InfusionJournal(path)
+        journaled = drain_cost(journal)
+        journal.close()
+
+        started = time.perf_counter()
+        state = replay(path)
+        replay_ms = (time.perf_counter() - started) * 1000
+
+    print(f"dosing step without journal: {baseline:.2f} us, with journal: {journaled:.2f} us "
+          f"(+{journaled - baseline:.2f} us per step)")
+    print(f"replayed {len(state.records)} records in {replay_ms:.1f} ms, "
+          f"restored reservoir: {state.remaining:.1f} uL ({state.status})")
+
+    with tempfile.TemporaryDirectory() as directory:
+        threads, kinds = ui_thread_io(directory)
+    print(f"start/pause/resume/stop/refill from the UI thread: fsync on {', '.join(sorted(threads))}")
+    assert "ui" not in threads, "界面线程在写注射日志时落盘"
+    assert kinds == [REC_REFILL, REC_START, REC_PAUSE, REC_RESUME, REC_PAUSE, REC_STOP, REC_REFILL], kinds
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
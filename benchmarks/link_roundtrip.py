@@ -0,0 +1,170 @@
+"""设备链路基准：各后端的往返延迟、流水线吞吐量、遥测批量，以及丢包下的重传
+
+    local    进程内直接调用 (没有链路，作为对照)
+    memory   PumpLink + DeviceEmulator，进程内内存管道
+    socket   同上，socketpair
+    pty      同上，伪终端 (最接近串口)
+最后在 socketpair 上按概率丢弃/损坏帧，流水线发送 暂停/恢复 循环，确认全部命令按顺序执行且没有重复执行；
+并检查主机重新连接 (新的 PumpLink 接到同一台设备) 后命令照常执行，而不是被当作重传应答旧的确认。
+
+    python -m benchmarks.link_roundtrip [--count 2000] [--drop 0.05] [--corrupt 0.02]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from srtp.engine import PumpEngine
+from srtp.link import ACK_OK, OP_NAMES, DeviceEmulator, LocalDevice, PumpLink
+from srtp.scheduler import StepPlanner
+from srtp.transport import LossyTransport, memory_pair, pty_pair, socket_pair
+
+PAIRS = {"memory": memory_pair, "socket": socket_pair, "pty": pty_pair}
+
+
+def fast_engine():
+    """每 5 ms 一步、每步都发出进度的泵，用来产生密集的遥测"""
+    return PumpEngine(progress_rate=None, planner=StepPlanner(update_period=0.005))
+
+
+class KeepOpen:
+    """主机端重启用：关闭链路时不关闭底层传输 (设备和线路都还在)"""
+
+    def __init__(self, inner):
+        self.inner = inner
+
+    def write(self, data):
+        self.inner.write(data)
+
+    def read(self, size=4096, timeout=None):
+        return self.inner.read(size, timeout)
+
+    def close(self):
+        pass
+
+
+def open_backend(name, drop=0.0, corrupt=0.0):
+    """返回 (主机端设备, 关闭函数, 模拟器或 None)"""
+    if name == "local":
+        device = LocalDevice(fast_engine())
+        return device, device.close, None
+    host, target = PAIRS[name]()
+    if drop or corrupt:
+        host = LossyTransport(host, drop, corrupt, seed=1)
+        target = LossyTransport(target, drop, corrupt, seed=2)
+    emulator = DeviceEmulator(target, fast_engine())
+    link = PumpLink(host, ack_timeout=0.02, retries=20)
+
+    def close():
+        link.close()
+        emulator.close()
+    return link, close, emulator
+
+
+def measure(name, count):
+    device, close, emulator = open_backend(name)
+    device.status().wait(2)
+
+    samples = []
+    for _ in range(count):
+        command = device.status()
+        command.wait(2)
+        samples.append(command.latency)
+    samples.sort()
+
+    started = time.perf_counter()
+    commands = [device.status() for _ in range(count * 5)]
+    for command in commands:
+        command.wait(5)
+    throughput = len(commands) / (time.perf_counter() - started)
+
+    records = []
+    device.add_listener(lambda t_ms, snapshot: records.append(t_ms))
+    device.start(1000, 1.0).wait(2)
+    time.sleep(1.0)
+    device.stop().wait(2)
+    frames = emulator.telemetry_frames if emulator is not None else len(records)
+    close()
+    return {
+        "rtt_median_us": statistics.median(samples) * 1e6,
+        "rtt_p99_us": samples[int(len(samples) * 0.99)] * 1e6,
+        "commands_per_s": throughput,
+        "telemetry_records": len(records),
+        "records_per_frame": len(records) / frames if frames else 0.0,
+    }
+
+
+def lossy(count, drop, corrupt):
+    """丢包/损坏下流水线发送 start、(pause、resume) x count、stop，返回统计"""
+    link, close, emulator = open_backend("socket", drop, corrupt)
+    started = time.perf_counter()
+    commands = [link.start(1000, 0.5)]
+    for _ in range(count):
+        commands += [link.pause(), link.resume()]
+    commands.append(link.stop())
+    for command in commands:
+        command.wait(10)
+    elapsed = time.perf_counter() - started
+    result = {
+        "commands": len(commands),
+        "ok": sum(command.status == ACK_OK for command in commands),
+        "elapsed_s": elapsed,
+        "executed": emulator.executed - emulator.resets,  # 不计连接时的 RESET
+        "retransmits": link.stats["retransmits"],
+        "duplicates": emulator.duplicates,
+        "reordered": emulator.reordered,
+        "crc_errors": link.crc_errors + emulator.crc_errors,
+        "timeouts": link.stats["timeouts"],
+    }
+    close()
+    return result
+
+
+def reconnect():
+    """同一台设备先后接入两条链路，各执行 start、stop，返回 [(操作, 结果), ...] 和模拟器"""
+    host, target = socket_pair()
+    emulator = DeviceEmulator(target, fast_engine())
+    results = []
+    for _ in range(2):
+        link = PumpLink(KeepOpen(host), ack_timeout=0.02, retries=20)
+        for command in (link.start(10, 0.5), link.stop()):
+            command.wait(5)
+            results.append((OP_NAMES[command.op], command.status))
+        link.close()
+    emulator.close()
+    host.close()
+    return results, emulator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000, help="往返测量的命令数 (吞吐量测量用 5 倍)")
+    parser.add_argument("--drop", type=float, default=0.05, help="丢包测试中每个数据块被丢弃的概率")
+    parser.add_argument("--corrupt", type=float, default=0.02, help="丢包测试中每个数据块被损坏的概率")
+    args = parser.parse_args(argv)
+
+    print(f"{'backend':>8} {'rtt median us':>14} {'rtt p99 us':>11} {'pipelined cmd/s':>16} "
+          f"{'telemetry rec/s':>16} {'rec/frame':>10}")
+    for name in ("local", "memory", "socket", "pty"):
+        r = measure(name, args.count)
+        print(f"{name:>8} {r['rtt_median_us']:>14.1f} {r['rtt_p99_us']:>11.1f} {r['commands_per_s']:>16,.0f} "
+              f"{r['telemetry_records']:>16} {r['records_per_frame']:>10.1f}")
+
+    r = lossy(args.count // 10, args.drop, args.corrupt)
+    print(f"lossy socketpair (drop {args.drop:.0%}, corrupt {args.corrupt:.0%}): "
+          f"{r['ok']}/{r['commands']} commands acknowledged OK in {r['elapsed_s']:.2f} s, "
+          f"executed {r['executed']} times")
+    print(f"  retransmits {r['retransmits']}, duplicate commands answered from cache {r['duplicates']}, "
+          f"held for in-order execution {r['reordered']}, CRC errors {r['crc_errors']}, timeouts {r['timeouts']}")
+
+    results, emulator = reconnect()
+    print(f"reconnect: {', '.join(f'{op} {status}' for op, status in results)} "
+          f"(sessions {emulator.resets}, executed {emulator.executed - emulator.resets}, "
+          f"answered from cache {emulator.duplicates})")
+    assert all(status == ACK_OK for _, status in results), "重新连接后的命令没有得到确认"
+    assert emulator.executed - emulator.resets == len(results) and emulator.duplicates == 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
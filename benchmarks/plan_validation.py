@@ -0,0 +1,107 @@
+"""计划校验基准：24 小时给药程序按 1 s 分辨率规划并检查全部安全规则
+
+对比 srtp.planning 的向量化实现与逐秒循环的纯 Python 实现。
+最后在虚拟时钟上每隔 2 小时开始一次 200 uL 注射，检查计入之前注射量后第 6 次 (超过每日上限) 被拒绝，
+且重新打开注射日志后恢复同样的 24 小时注射量。
+
+    python -m benchmarks.plan_validation [--resolution 1.0]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from srtp.clock import VirtualClock
+from srtp.engine import PumpEngine
+from srtp.journal import InfusionJournal
+from srtp.planning import DAY, HOUR, SafetyLimits, validate
+from srtp.protocol import Basal, Bolus, Lockout, Ramp, compile_protocol
+from srtp.validation import check_infusion
+
+
+def day_program():
+    """24 小时程序：夜间基础速率、三次推注加锁定间隔、白天渐变"""
+    segments = [Basal(0.002, 6 * HOUR)]
+    for _ in range(3):
+        segments += [Bolus(15, 300), Lockout(HOUR), Ramp(0.002, 0.006, 2 * HOUR, steps=24), Basal(0.004, HOUR)]
+    segments.append(Basal(0.002, DAY - sum(s.duration for s in segments)))
+    return compile_protocol(segments)
+
+
+def python_validate(timeline, remaining, capacity, limits, resolution):
+    """逐秒循环的参考实现，返回 (低药量时刻, 每小时峰值, 24 小时总量)"""
+    t, delivered = [], []
+    steps = int(timeline.duration / resolution)
+    for k in range(steps + 1):
+        t.append(min(k * resolution, timeline.duration))
+        delivered.append(timeline.volume_at(t[-1]))
+    low_at = next((x for x, d in zip(t, delivered) if remaining - d <= limits.low_fraction * capacity), None)
+    window = int(HOUR / resolution)
+    peak = max(delivered[i] - (delivered[i - window] if i >= window else 0.0) for i in range(len(t)))
+    return low_at, peak, delivered[-1]
+
+
+def daily_limit(volume=200.0, speed=0.1, spacing=2 * HOUR):
+    """每隔 spacing 秒检查并开始一次注射，直到被剂量上限拒绝；
+    返回 (开始的次数, 拒绝时的错误代码, 拒绝前 24 小时的注射量, 重新打开日志后的 24 小时注射量)"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "pump.journal")
+        clock = VirtualClock()
+        journal = InfusionJournal(path)
+        engine = PumpEngine(clock, progress_rate=None, journal=journal)
+        started = 0
+        while True:
+            check = check_infusion(volume, speed, engine.remaining_medicine, engine.volume,
+                                   delivered_today=engine.delivered_today,
+                                   delivered_last_hour=engine.delivered_last_hour)
+            if check.errors:
+                break
+            engine.start_infusion(check.volume, check.speed)  # 无界面：同步运行到完成
+            started += 1
+            clock.advance(spacing)
+        delivered = engine.delivered_today
+        journal.close()
+        journal = InfusionJournal(path)
+        restored = PumpEngine(VirtualClock(), progress_rate=None, journal=journal).delivered_today
+        journal.close()
+    return started, [error.code for error in check.errors], delivered, restored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resolution", type=float, default=1.0, help="规划分辨率 (s)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    timeline = day_program()
+    limits = SafetyLimits()
+    validate(timeline, 5000.0, 5000.0, limits, resolution=args.resolution)  # 预热
+
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        report = validate(timeline, 5000.0, 5000.0, limits, resolution=args.resolution)
+    vectorized_ms = (time.perf_counter() - started) / args.repeat * 1000
+
+    started = time.perf_counter()
+    low_at, peak, total = python_validate(timeline, 5000.0, 5000.0, limits, args.resolution)
+    python_ms = (time.perf_counter() - started) * 1000
+
+    print(f"program: {len(timeline)} breakpoints, {timeline.duration / HOUR:.1f} h, "
+          f"{timeline.total_volume:.2f} uL, {len(report.trajectory.t)} samples")
+    print(f"vectorized: {vectorized_ms:.2f} ms, pure Python loop: {python_ms:.1f} ms "
+          f"({python_ms / vectorized_ms:.0f}x)")
+    print(f"peak hourly: {report.peak_hourly:.3f} uL (loop {peak:.3f}), daily: {report.daily_total:.3f} uL "
+          f"(loop {total:.3f}), low reservoir at: {report.low_reservoir_at} (loop {low_at})")
+    print(f"violations: {[v.rule for v in report.violations] or 'none'}")
+
+    started, errors, delivered, restored = daily_limit()
+    print(f"200 uL every 2 h: {started} infusions started, then refused {errors} "
+          f"(delivered in 24 h: {delivered:.1f} uL, after reopening the journal: {restored:.1f} uL)")
+    assert started == 5 and errors == ["dose_limit"], "每日剂量上限没有计入之前的注射量"
+    assert restored == delivered, "重新打开注射日志后 24 小时注射量不一致"
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""给药程序基准：编译长程序的耗时，以及按时间查询应注射量 (二分查找 vs 逐段累加)
+
+    python -m benchmarks.protocol_lookup [--segments 100000]
+"""
+import argparse
+import random
+import sys
+import time
+
+from srtp.clock import VirtualClock
+from srtp.engine import PumpEngine
+from srtp.protocol import Basal, Bolus, Lockout, Ramp, compile_protocol
+
+
+def make_segments(count, seed=1):
+    """随机生成 count 段的程序 (基础速率、推注、渐变、锁定间隔交替)"""
+    rng = random.Random(seed)
+    segments = []
+    for _ in range(count // 4):
+        segments.append(Basal(rng.uniform(0.001, 0.01), rng.uniform(60, 600)))
+        segments.append(Bolus(rng.uniform(0.1, 1.0), rng.uniform(10, 60)))
+        segments.append(Lockout(rng.uniform(60, 300)))
+        segments.append(Ramp(rng.uniform(0.001, 0.01), rng.uniform(0.001, 0.01), 300, steps=4))
+    return segments
+
+
+def linear_volume_at(timeline, elapsed):
+    """逐段累加的查询方式 (O(n))"""
+    volume = 0.0
+    for i in range(len(timeline) - 1):
+        start, end = timeline.times[i], timeline.times[i + 1]
+        if elapsed <= start:
+            break
+        volume += timeline.rates[i] * (min(elapsed, end) - start)
+    return volume
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=100000, help="程序段数")
+    parser.add_argument("--queries", type=int, default=100000, help="二分查找的查询次数")
+    args = parser.parse_args(argv)
+
+    segments = make_segments(args.segments)
+    started = time.perf_counter()
+    timeline = compile_protocol(segments)
+    compile_ms = (time.perf_counter() - started) * 1000
+    print(f"compiled {len(segments)} segments into {len(timeline)} breakpoints "
+          f"({timeline.duration / 3600:.1f} h, {timeline.total_volume:.1f} uL) in {compile_ms:.1f} ms")
+
+    rng = random.Random(2)
+    instants = [rng.uniform(0, timeline.duration) for _ in range(args.queries)]
+    started = time.perf_counter()
+    for elapsed in instants:
+        timeline.volume_at(elapsed)
+    bisect_us = (time.perf_counter() - started) / args.queries * 1e6
+
+    elapsed = instants[0]
+    started = time.perf_counter()
+    expected = linear_volume_at(timeline, elapsed)
+    linear_us = (time.perf_counter() - started) * 1e6
+    print(f"volume_at: {bisect_us:.2f} us per query (bisect), {linear_us:,.0f} us (linear scan); "
+          f"agree: {abs(expected - timeline.volume_at(elapsed)) < 1e-6}")
+
+    program = compile_protocol(segments[:1000])  # 无界面执行前 1000 段
+    pump = PumpEngine(VirtualClock(), progress_rate=None)
+    started = time.perf_counter()
+    pump.start_protocol(program)
+    wall = time.perf_counter() - started
+    print(f"executed {program.duration / 3600:.1f} h program headless in {wall:.2f} s: "
+          f"delivered {pump.current_volume:.3f} / {program.total_volume:.3f} uL, "
+          f"{pump.scheduler.ticks} steps, state {pump.state.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
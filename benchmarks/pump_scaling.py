@@ -0,0 +1,77 @@
+"""多泵扩展性基准：1 到 256 台泵
+
+对比两种驱动方式在真实时间下运行 --seconds 秒 (每台泵 1.0 uL/s，即每秒 10 步)：
+    manager  PumpManager 单个调度线程 + 最小堆
+    threads  每台泵一个 QThread (改造前的方式)
+记录每一步的 CPU 耗时、平均/最大唤醒延迟和停止命令的确认延迟。
+
+    python -m benchmarks.pump_scaling [--seconds 2] [--max-pumps 256] [--no-threads]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from srtp.manager import PumpManager
+from ui import DrugPumpSimulator
+
+
+def run_case(count, seconds, mode):
+    manager = None
+    if mode == "manager":
+        manager = PumpManager()
+        manager.start()
+        pumps = [manager.add_pump(DrugPumpSimulator()) for _ in range(count)]
+    else:
+        pumps = [DrugPumpSimulator() for _ in range(count)]
+
+    cpu_started = time.process_time()
+    started = [pump.start_infusion(1000, 1.0) for pump in pumps]
+    for command in started:
+        command.wait(5)
+    time.sleep(seconds)
+    stops = [pump.stop_infusion() for pump in pumps]
+    for command in stops:
+        command.wait(5)
+    cpu = time.process_time() - cpu_started
+    if manager is not None:
+        manager.shutdown(5)
+    else:
+        for pump in pumps:
+            pump.wait()
+
+    ticks = sum(pump.rate_metrics["ticks"] for pump in pumps)
+    lateness = sum(pump.scheduler.total_lateness for pump in pumps)
+    return {
+        "cpu_per_step_us": cpu / ticks * 1e6 if ticks else 0.0,
+        "cpu_share": cpu / seconds,
+        "mean_lateness_ms": lateness / ticks * 1000 if ticks else 0.0,
+        "max_lateness_ms": max(pump.rate_metrics["max_lateness"] for pump in pumps) * 1000,
+        "stop_median_ms": statistics.median(command.latency for command in stops) * 1000,
+        "stop_max_ms": max(command.latency for command in stops) * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="每种情况运行的时间 (s)")
+    parser.add_argument("--max-pumps", type=int, default=256, help="最多的泵数")
+    parser.add_argument("--no-threads", action="store_true", help="不测每泵一线程的方式")
+    args = parser.parse_args(argv)
+
+    modes = ["manager"] if args.no_threads else ["manager", "threads"]
+    print(f"{'pumps':>5} {'mode':>8} {'cpu/step (us)':>14} {'cpu share':>10} "
+          f"{'late mean (ms)':>15} {'late max (ms)':>14} {'stop p50 (ms)':>14} {'stop max (ms)':>14}")
+    count = 1
+    while count <= args.max_pumps:
+        for mode in modes:
+            r = run_case(count, args.seconds, mode)
+            print(f"{count:>5} {mode:>8} {r['cpu_per_step_us']:>14.1f} {r['cpu_share']:>10.1%} "
+                  f"{r['mean_lateness_ms']:>15.3f} {r['max_lateness_ms']:>14.3f} "
+                  f"{r['stop_median_ms']:>14.3f} {r['stop_max_ms']:>14.3f}")
+        count *= 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""注射速率精度基准：旧的 "累加 + sleep" 循环 vs 基于截止时间的排期器
+
+两种实现同时运行同一剂量 (默认 1.0 uL/s 注射 200 uL，约 200 秒)，
+比较 已注射量 / 实际耗时 与设定速度的相对误差。
+
+    python -m benchmarks.rate_accuracy [--volume 200] [--speed 1.0]
+"""
+import argparse
+import sys
+import threading
+import time
+
+from ui import DrugPumpSimulator
+
+
+def legacy_loop(pump, volume, speed, result):
+    """重现改造前 DrugPumpSimulator.run 的计时方式"""
+    increment = 0.1
+    delay = increment / speed
+    current = 0.0
+    remaining = pump.remaining_medicine
+    started = time.monotonic()
+    while current < volume:
+        current += increment
+        if current > volume:
+            current = volume
+        remaining -= increment
+        pump.progress_updated.emit(current, volume, remaining)
+        time.sleep(delay)
+    result["elapsed"] = time.monotonic() - started
+    result["delivered"] = current
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--volume", type=float, default=200.0, help="注射量 (uL)")
+    parser.add_argument("--speed", type=float, default=1.0, help="注射速度 (uL/s)")
+    args = parser.parse_args(argv)
+
+    legacy_result = {}
+    legacy = threading.Thread(
+        target=legacy_loop, args=(DrugPumpSimulator(), args.volume, args.speed, legacy_result))
+
+    pump = DrugPumpSimulator()
+    legacy.start()
+    started = time.monotonic()
+    pump.start_infusion(args.volume, args.speed)
+    pump.wait()
+    scheduler_elapsed = time.monotonic() - started
+    legacy.join()
+
+    rows = [
+        ("legacy sleep loop", legacy_result["delivered"], legacy_result["elapsed"]),
+        ("deadline scheduler", pump.current_volume, scheduler_elapsed),
+    ]
+    print(f"target: {args.volume} uL at {args.speed} uL/s (ideal {args.volume / args.speed:.1f} s)")
+    print(f"{'engine':<20} {'elapsed (s)':>12} {'actual (uL/s)':>14} {'rate error':>11}")
+    for name, delivered, elapsed in rows:
+        actual = delivered / elapsed
+        print(f"{name:<20} {elapsed:>12.3f} {actual:>14.6f} {(actual - args.speed) / args.speed:>+11.4%}")
+    metrics = pump.rate_metrics
+    print(f"scheduler: {metrics['ticks']} ticks, {metrics['late_ticks']} late, "
+          f"max lateness {metrics['max_lateness'] * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""储药器预测基准：前缀和索引 vs 每次重新扫描整个队列
+
+队列中排入 n 次注射 (每 --refill-every 次之后一次计划补药)，比较：
+    update          每个进度点的耗时 (ns)
+    when_remaining  剩余药量降到 5% 的时刻：索引二分 vs 逐项扫描队列
+    can_fit         队尾能否再装下一次注射：索引 vs 逐项扫描队列
+最后在虚拟时钟上实际执行一个小队列 (中途暂停、调速)，比较预测的低药量时刻与实际发出警告的时刻。
+
+    python -m benchmarks.reservoir_forecast [--sizes 10,1000,100000] [--refill-every 20]
+"""
+import argparse
+import random
+import sys
+import time
+
+from srtp.clock import VirtualClock
+from srtp.engine import PumpEngine
+from srtp.forecast import ReservoirForecast
+
+CAPACITY = 5000.0
+
+
+def build(n, refill_every, seed=0):
+    """排好 n 次注射的预测，以及同一队列的 (注射量, 速度 / None 表示补药) 列表"""
+    rng = random.Random(seed)
+    forecast = ReservoirForecast(CAPACITY, clock=VirtualClock())
+    queue = []
+    for i in range(n):
+        volume, speed = round(rng.uniform(10.0, 400.0), 1), round(rng.uniform(0.01, 1.0), 3)
+        forecast.enqueue(volume, speed)
+        queue.append((volume, speed))
+        if refill_every and i % refill_every == refill_every - 1:
+            forecast.enqueue_refill()
+            queue.append((CAPACITY, None))
+    return forecast, queue
+
+
+def scan_when_remaining(queue, remaining, fraction):
+    """不用索引：从队首逐项累加，返回降到 fraction 的计划时间"""
+    target, t = fraction * CAPACITY, 0.0
+    for volume, speed in queue:
+        if speed is None:
+            remaining = volume
+            continue
+        if remaining - volume <= target:
+            return t + max(0.0, remaining - target) / speed
+        remaining -= volume
+        t += volume / speed
+    return None
+
+
+def scan_remaining_after(queue, remaining):
+    for volume, speed in queue:
+        remaining = volume if speed is None else remaining - volume
+    return remaining
+
+
+def per_call(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) / repeat
+
+
+def accuracy():
+    """实际执行一个小队列 (第一次注射中途暂停 600 s、调速)，返回 (预测的低药量时刻, 实际时刻)"""
+    clock = VirtualClock()
+    engine = PumpEngine(clock, progress_rate=None, capacity=1000.0)
+    forecast = engine.enable_forecast()
+    queue = [(300.0, 0.5), (400.0, 0.25), (280.0, 0.1)]
+    for volume, speed in queue:
+        forecast.enqueue(volume, speed)
+    seen = {}
+
+    def listener(name, *args):
+        if name == "progress_updated" and args[0] >= 100 and "paused" not in seen:
+            seen["paused"] = engine.pause_infusion()
+        elif name == "remaining_low_warning":
+            seen["low"] = clock.now()
+
+    engine.add_listener(listener)
+    engine.start_infusion(*queue[0])
+    clock.advance(600.0)
+    engine.set_speed(1.0)
+    predicted = forecast.when_remaining(0.05)
+    engine.start_infusion(queue[0][0], 1.0, is_resume=True)
+    for volume, speed in queue[1:]:
+        engine.start_infusion(volume, speed)
+    return predicted, seen.get("low")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000", help="逗号分隔的队列长度")
+    parser.add_argument("--refill-every", type=int, default=20, help="每多少次注射之后计划一次补药 (0 表示不补药)")
+    parser.add_argument("--repeat", type=int, default=2000, help="每项查询的重复次数")
+    args = parser.parse_args(argv)
+
+    print(f"{'queued':>8} {'update':>9} {'when (index)':>13} {'when (scan)':>12} "
+          f"{'fit (index)':>12} {'fit (scan)':>11}")
+    for n in map(int, args.sizes.split(",")):
+        forecast, queue = build(n, args.refill_every)
+        # 在第一次注射中间：每个进度点剩余药量减少 0.5 uL
+        forecast.start(*queue[0])
+        ticks = iter(range(10 ** 9))
+        update = per_call(lambda: forecast.update(CAPACITY - next(ticks) % 600 * 0.5, 0.0), args.repeat * 10)
+        when = per_call(lambda: forecast.when_remaining(0.05), args.repeat)
+        fit = per_call(lambda: forecast.can_fit(100.0), args.repeat)
+        repeat = max(1, args.repeat * 10 // n)
+        remaining = forecast.remaining
+        scan_when = per_call(lambda: scan_when_remaining(queue, remaining, 0.05), repeat)
+        scan_fit = per_call(lambda: scan_remaining_after(queue, remaining) >= 100.0, repeat)
+        print(f"{n:>8,} {update * 1e9:>6,.0f} ns {when * 1e6:>10.2f} us {scan_when * 1e6:>9.2f} us "
+              f"{fit * 1e6:>9.2f} us {scan_fit * 1e6:>8.2f} us")
+
+    predicted, actual = accuracy()
+    print(f"\n低药量时刻 (暂停 600 s 并调速后预测): 预测 {predicted:.3f} s, 实际 {actual:.3f} s, "
+          f"误差 {abs(predicted - actual):.3f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""控制接口负载测试：多个客户端在 JSON-RPC 接口上流水线发送命令
+
+每个客户端独占一台模拟泵 (PumpManager 驱动)，在一个连接上保持 --depth 个请求在途，
+循环发送 start -> status x N -> pause -> resume -> stop；另有一个连接订阅全部泵的事件通知。
+统计每秒完成的命令数和各方法的响应延迟，并检查幂等重试和需要确认的警告。
+
+    python -m benchmarks.rpc_load [--clients 8] [--depth 32] [--seconds 3] [--unix]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+from srtp.engine import PumpEngine
+from srtp.manager import PumpManager
+from srtp.rpc import CONFIRMATION_REQUIRED, RpcServer
+
+CYCLE = ["start"] + ["status"] * 6 + ["pause", "status", "resume", "status", "stop"]
+
+
+class Client:
+    """一个流水线客户端：按 id 匹配响应"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count(1)
+        self.pending = {}  # id -> (方法, 发送时间, Future)
+        self.notifications = 0
+        self._task = asyncio.create_task(self._read())
+
+    async def _read(self):
+        while line := await self.reader.readline():
+            message = json.loads(line)
+            if "id" not in message:
+                self.notifications += 1
+                continue
+            method, sent, future = self.pending.pop(message["id"])
+            future.set_result((method, time.perf_counter() - sent, message))
+
+    def send(self, method, **params):
+        request_id = next(self.ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = (method, time.perf_counter(), future)
+        self.writer.write(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method,
+                                      "params": params}).encode() + b"\n")
+        return future
+
+    async def call(self, method, **params):
+        return (await self.send(method, **params))[2]
+
+    async def close(self):
+        self.writer.close()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+async def connect(address):
+    if isinstance(address, str):
+        return Client(*await asyncio.open_unix_connection(address))
+    return Client(*await asyncio.open_connection("127.0.0.1", address))
+
+
+async def drive(client, pump_id, depth, deadline, latencies, errors):
+    """在一个连接上保持 depth 个请求在途，按 CYCLE 循环发送；start/pause 等按顺序生效"""
+    inflight = set()
+    for method in itertools.cycle(CYCLE):
+        if time.perf_counter() >= deadline:
+            break
+        params = {"pump": pump_id}
+        if method == "start":
+            params.update(volume=100, speed=0.05)
+        inflight.add(client.send(method, **params))
+        if len(inflight) >= depth:
+            done, inflight = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                record(future.result(), latencies, errors)
+    for method, latency, message in await asyncio.gather(*inflight):
+        record((method, latency, message), latencies, errors)
+
+
+def record(result, latencies, errors):
+    method, latency, message = result
+    if "error" in message:
+        errors[method] += 1
+    else:
+        latencies[method].append(latency)
+
+
+async def run(args):
+    manager = PumpManager()
+    manager.start()
+    pumps = {f"pump-{i:02d}": manager.add_pump(PumpEngine()) for i in range(args.clients)}
+    path = os.path.join(tempfile.mkdtemp(), "srtp.sock") if args.unix else None
+    server = RpcServer(pumps, port=0, path=path)
+    address = server.start()
+
+    clients = [await connect(address) for _ in range(args.clients)]
+    watcher = await connect(address)
+    await watcher.call("subscribe")
+
+    latencies, errors = defaultdict(list), defaultdict(int)
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    await asyncio.gather(*(drive(client, pump_id, args.depth, deadline, latencies, errors)
+                           for client, pump_id in zip(clients, pumps)))
+    elapsed = time.perf_counter() - started
+
+    # 幂等重试和需要确认的警告
+    probe = clients[0]
+    first = await probe.call("start", pump="pump-00", volume=20, speed=0.05, idempotency_key="run-1")
+    retry = await probe.call("start", pump="pump-00", volume=20, speed=0.05, idempotency_key="run-1")
+    await probe.call("stop", pump="pump-00")
+    confirm = await probe.call("start", pump="pump-00", volume=300, speed=0.05)
+    await asyncio.sleep(0.1)
+
+    for client in clients + [watcher]:
+        await client.close()
+    server.stop()
+    manager.shutdown(5)
+
+    total = sum(len(samples) for samples in latencies.values()) + sum(errors.values())
+    print(f"{args.clients} clients x {args.depth} pipelined requests over "
+          f"{'unix socket' if args.unix else 'localhost TCP'} for {elapsed:.1f} s")
+    print(f"throughput: {total / elapsed:,.0f} requests/s "
+          f"({sum(len(latencies[m]) for m in ('start', 'pause', 'resume', 'stop')) / elapsed:,.0f} "
+          f"device commands/s), {watcher.notifications} event notifications")
+    print(f"{'method':>8} {'count':>8} {'median ms':>10} {'p99 ms':>8} {'errors':>7}")
+    for method in ("status", "start", "pause", "resume", "stop"):
+        samples = sorted(latencies[method])
+        if samples:
+            p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+            print(f"{method:>8} {len(samples):>8} {statistics.median(samples) * 1000:>10.3f} "
+                  f"{p99 * 1000:>8.3f} {errors[method]:>7}")
+    same = first.get("result") == retry.get("result")
+    print(f"idempotent retry returned the first result: {same} (replayed {server.replayed})")
+    print(f"start 300 uL without confirm: error {confirm['error']['code']} "
+          f"{'(confirmation required)' if confirm['error']['code'] == CONFIRMATION_REQUIRED else ''} "
+          f"{[w['code'] for w in confirm['error'].get('data', [])]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=32, help="每个连接的在途请求数")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--unix", action="store_true", help="使用 Unix 套接字而不是 localhost TCP")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
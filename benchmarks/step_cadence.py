@@ -0,0 +1,54 @@
+"""步长选择基准：不同注射速度下每秒的唤醒次数和每步注射量
+
+旧实现固定每步 0.1uL：0.001 uL/s 时 100s 才更新一次，1.0 uL/s 时每秒唤醒 10 次。
+StepPlanner 按刷新周期和精度上限选择步长，每秒的唤醒次数与速度无关。
+
+    python -m benchmarks.step_cadence [--seconds 2] [--warp 100]
+"""
+import argparse
+import sys
+import time
+
+from srtp.clock import MonotonicClock, VirtualClock
+from srtp.engine import PumpEngine
+from srtp.manager import PumpManager
+
+SPEEDS = (0.001, 0.01, 0.1, 1.0)  # speed_input 的范围
+LEGACY_STEP = 0.1  # 旧实现每步的注射量 (uL)
+
+
+def measure(speed, seconds, clock):
+    """以 speed 注射 seconds 秒 (真实时间)，返回 (每秒唤醒次数, 每步平均注射量, 每秒 CPU 时间 ms)"""
+    manager = PumpManager(clock)
+    pump = PumpEngine(progress_rate=None)
+    manager.add_pump(pump)
+    manager.start()
+    cpu = time.process_time()
+    pump.start_infusion(1000, speed).wait(5)
+    time.sleep(seconds)
+    pump.stop_infusion().wait(5)
+    cpu = time.process_time() - cpu
+    manager.shutdown(5)
+    ticks = pump.scheduler.ticks
+    return ticks / seconds, pump.current_volume / max(ticks, 1), cpu * 1000 / seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="每种速度运行的真实时间 (s)")
+    parser.add_argument("--warp", type=float, default=100.0, help="加速仿真的倍数")
+    args = parser.parse_args(argv)
+
+    print(f"{'speed uL/s':>10}  {'clock':>8}  {'legacy wakeups/s':>16}  "
+          f"{'wakeups/s':>9}  {'uL/step':>8}  {'cpu ms/s':>8}")
+    for label, make_clock, factor in (("real", MonotonicClock, 1.0),
+                                      (f"x{args.warp:g}", lambda: VirtualClock(args.warp), args.warp)):
+        for speed in SPEEDS:
+            wakeups, step, cpu = measure(speed, args.seconds, make_clock())
+            legacy = speed * factor / LEGACY_STEP
+            print(f"{speed:>10.3f}  {label:>8}  {legacy:>16.2f}  {wakeups:>9.2f}  {step:>8.4f}  {cpu:>8.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
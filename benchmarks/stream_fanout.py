@@ -0,0 +1,144 @@
+"""遥测推送基准：一个推送服务向 100 个本机 SSE 客户端扇出泵状态
+
+另外连接一个从不读取的慢客户端，确认它只会丢帧，不会拖慢发布方 (泵线程)：快客户端连接之前，
+先让 --stall-pumps 台泵向它发布，直到发送缓冲 (服务端内核 + asyncio + 它的接收窗口) 塞满、队列开始丢帧；
+随后的扇出测量中它一直不读取。结束时检查丢帧只发生在慢客户端上。
+
+    python -m benchmarks.stream_fanout [--clients 100] [--pumps 10] [--rate 30] [--seconds 3] [--stall-pumps 50]
+"""
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+
+from srtp.engine import PumpSnapshot
+from srtp.state import PumpState
+from srtp.streaming import TelemetryServer
+
+MARKER = "marker"  # 测量扇出延迟用的泵编号
+
+
+def publisher(server, pumps, rate, seconds, costs, prefix="pump"):
+    """模拟 pumps 台泵各以 rate Hz 发布进度，记录每次 publish 的耗时"""
+    period = 1.0 / rate
+    deadline = time.monotonic()
+    end = deadline + seconds
+    step = 0
+    while deadline < end:
+        step += 1
+        for i in range(pumps):
+            snapshot = PumpSnapshot(PumpState.RUNNING, step * 0.01, 100.0, 5000.0 - step * 0.01, 0.1, True)
+            started = time.perf_counter()
+            server.publish(f"{prefix}-{i:02d}", snapshot)
+            costs.append(time.perf_counter() - started)
+        deadline += period
+        time.sleep(max(0.0, deadline - time.monotonic()))
+
+
+async def client(port, stats, marker_seen):
+    """读取 SSE 流，统计帧数；收到标记帧时记录到达时间"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    frames = 0
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.startswith(b"data: "):
+                frames += 1
+                stats["frames"] = frames
+                if b'"pump":"marker"' in line:
+                    frame = json.loads(line[6:])
+                    if frame["d"].get("current") == 1.0:
+                        marker_seen.append(time.perf_counter())
+    finally:
+        writer.close()
+
+
+async def stall(server, args):
+    """只有慢客户端连接时以 --stall-pumps 台泵发布，直到它开始丢帧 (最多 --stall-timeout 秒)，返回用时"""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    while server.stats()["dropped"] == 0 and time.perf_counter() - started < args.stall_timeout:
+        await loop.run_in_executor(None, publisher, server, args.stall_pumps, args.rate, 0.5, [], "stall")
+    return time.perf_counter() - started
+
+
+async def run(args):
+    server = TelemetryServer(port=0, queue_size=args.queue)
+    port = server.start()
+    server.publish(MARKER, PumpSnapshot(PumpState.IDLE, 0.0, 0.0, 5000.0, 0.0, False))
+
+    slow = socket.socket()  # 从不读取的慢客户端：连接前缩小接收缓冲，接收窗口才会真的变小
+    slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1024)
+    slow.connect(("127.0.0.1", port))
+    slow.sendall(b"GET /events HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    while server.stats()["clients"] < 1:
+        await asyncio.sleep(0.01)
+    stalled_for = await stall(server, args)
+
+    stats = [{"frames": 0} for _ in range(args.clients)]
+    marker_seen = []
+    tasks = [asyncio.create_task(client(port, stats[i], marker_seen)) for i in range(args.clients)]
+    while server.stats()["clients"] < args.clients + 1:
+        await asyncio.sleep(0.01)
+
+    costs = []
+    thread = threading.Thread(target=publisher, args=(server, args.pumps, args.rate, args.seconds, costs))
+    started = time.perf_counter()
+    thread.start()
+    while thread.is_alive():
+        await asyncio.sleep(0.05)
+    elapsed = time.perf_counter() - started
+
+    await asyncio.sleep(0.2)  # 让客户端读完积压
+    marker_sent = time.perf_counter()
+    server.publish(MARKER, PumpSnapshot(PumpState.RUNNING, 1.0, 1.0, 4999.0, 0.1, True))
+    while len(marker_seen) < args.clients and time.perf_counter() - marker_sent < 5:
+        await asyncio.sleep(0.001)
+    latencies = sorted((seen - marker_sent) * 1000 for seen in marker_seen)
+
+    summary = server.stats()
+    server.stop()
+    slow.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    received = [s["frames"] for s in stats]
+    print(f"{args.clients} clients + 1 stalled client, {args.pumps} pumps x {args.rate:g} Hz for {elapsed:.1f} s")
+    print(f"publish(): median {statistics.median(costs) * 1e6:.1f} us, max {max(costs) * 1e6:.1f} us "
+          f"({len(costs)} calls on the pump thread)")
+    print(f"frames per client: min {min(received)}, median {statistics.median(received):.0f}, "
+          f"total {sum(received)} ({sum(received) / elapsed:,.0f} frames/s)")
+    slowest, *others = summary["dropped_by_client"]
+    print(f"dropped intermediate frames: stalled client {slowest} (overflowed after {stalled_for:.1f} s "
+          f"of {args.stall_pumps} pumps), other clients {sum(others)}")
+    if latencies:
+        print(f"fan-out latency to {len(latencies)} clients: median {statistics.median(latencies):.2f} ms, "
+              f"max {latencies[-1]:.2f} ms")
+    assert slowest > 0, "慢客户端没有丢帧：发送缓冲没有塞满，丢帧路径没有被执行"
+    assert not any(others), f"读取正常的客户端丢了帧: {sum(others)}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--pumps", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=30.0, help="每台泵的发布频率 (Hz)")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--queue", type=int, default=64, help="每个客户端的队列上限")
+    parser.add_argument("--stall-pumps", type=int, default=50, help="塞满慢客户端时发布的泵数")
+    parser.add_argument("--stall-timeout", type=float, default=20.0, help="塞满慢客户端最多用多少秒")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""基准测试套件：一次运行全部关键指标，结果写成 JSON，并可与保存的基线比较
+
+    throughput  虚拟时钟下各速度 (0.001 - 1.0 uL/s) 每秒推进的步数和速率误差
+    accuracy    真实时钟下各速度运行 --seconds 秒的速率误差和最大唤醒延迟
+    latency     注射中发出暂停/停止命令到注射线程确认的延迟
+    ui          offscreen 平台上 MainWindow.update_progress 和 log_message 的单次耗时
+    startup     新进程从启动到主窗口第一次绘制的时间
+    scaling     PumpManager 驱动 1/16/64 台泵时每步的 CPU 耗时、唤醒延迟和停止延迟
+
+    python -m benchmarks.suite --output results.json              # 运行并保存
+    python -m benchmarks.suite --baseline results.json            # 运行并与基线比较，有退化时返回 1
+    python -m benchmarks.suite --compare new.json --baseline old.json   # 只比较两个已有结果
+    python -m benchmarks.suite --only ui,startup --quick
+
+比较时每个指标按自己的方向 (越小越好/越大越好) 计算相对变化，变差超过 --threshold
+(默认 25%，单核机器上的计时噪声较大) 且绝对变化超过该指标的噪声下限时记为退化。
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from srtp.clock import VirtualClock  # noqa: E402
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SPEEDS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0]
+QUICK_SPEEDS = [0.001, 0.01, 0.1, 1.0]
+
+# 指标名前缀 -> (单位, 方向, 噪声下限)；方向 "lower" 表示越小越好
+UNITS = {
+    "throughput.steps_per_s": ("steps/s", "higher", 0.0),
+    "throughput.rate_error": ("ratio", "lower", 1e-6),
+    "accuracy.rate_error": ("ratio", "lower", 1e-3),
+    "accuracy.max_lateness_ms": ("ms", "lower", 2.0),
+    "latency.pause_ms": ("ms", "lower", 0.5),
+    "latency.stop_ms": ("ms", "lower", 0.5),
+    "ui.update_progress_us": ("us", "lower", 5.0),
+    "ui.log_message_us": ("us", "lower", 5.0),
+    "startup.first_paint_ms": ("ms", "lower", 20.0),
+    "startup.import_ms": ("ms", "lower", 20.0),
+    "scaling.cpu_per_step_us": ("us", "lower", 5.0),
+    "scaling.mean_lateness_ms": ("ms", "lower", 0.5),
+    "scaling.stop_max_ms": ("ms", "lower", 1.0),
+}
+
+# 在新进程中测量启动到第一次绘制：父进程传入启动前的单调时钟 (Linux 上各进程共用 CLOCK_MONOTONIC)
+FIRST_PAINT = """
+import sys, time
+launched = float(sys.argv[1])
+from PyQt6.QtCore import QEvent, QObject
+from PyQt6.QtWidgets import QApplication
+app = QApplication(sys.argv[:1])
+import ui
+imported = time.monotonic()
+
+class FirstPaint(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            print(f"{(imported - launched) * 1000} {(time.monotonic() - launched) * 1000}", flush=True)
+            app.exit(0)
+        return False
+
+window = ui.MainWindow()
+watcher = FirstPaint()
+window.installEventFilter(watcher)
+window.show()
+app.exec()
+window.close()
+"""
+
+
+def metric(results, name, key, value):
+    results[f"{name}@{key}" if key is not None else name] = value
+
+
+def bench_throughput(args, results):
+    from ui import DrugPumpSimulator
+
+    for speed in args.speeds:
+        best = 0.0
+        for _ in range(args.repeat):
+            pump = DrugPumpSimulator(clock=VirtualClock(), threaded=False, progress_rate=None)
+            started = time.perf_counter()
+            pump.start_infusion(pump.remaining_medicine, speed)  # 排空储药器 (每步 0.5 uL，共 10000 步)
+            elapsed = time.perf_counter() - started
+            best = max(best, pump.rate_metrics["ticks"] / elapsed)
+        metric(results, "throughput.steps_per_s", speed, best)
+        metric(results, "throughput.rate_error", speed, abs(pump.rate_metrics["rate_error"]))
+
+
+def bench_accuracy(args, results):
+    from ui import DrugPumpSimulator
+
+    for speed in args.speeds:
+        pump = DrugPumpSimulator()
+        pump.start_infusion(1000, speed).wait(5)
+        time.sleep(args.seconds)
+        pump.stop_infusion().wait(5)
+        pump.wait()
+        metric(results, "accuracy.rate_error", speed, abs(pump.rate_metrics["rate_error"]))
+        metric(results, "accuracy.max_lateness_ms", speed, pump.rate_metrics["max_lateness"] * 1000)
+
+
+def bench_latency(args, results):
+    from benchmarks.command_latency import measure
+
+    for action in ("pause", "stop"):
+        samples = [measure(speed, action) for speed in args.speeds for _ in range(args.repeat)]
+        metric(results, f"latency.{action}_ms", "median", statistics.median(samples))
+        metric(results, f"latency.{action}_ms", "max", max(samples))
+
+
+def bench_ui(args, results):
+    from PyQt6.QtWidgets import QApplication
+
+    from benchmarks.ui_update import drive
+    from ui import MainWindow
+
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+    window = MainWindow()
+    window.show()
+    app.processEvents()
+    metric(results, "ui.update_progress_us", None, drive(app, window.update_progress, args.ticks))
+
+    count = args.ticks // 4
+    started = time.perf_counter()
+    for i in range(count):
+        window.log_message(f"[遥测] 基准日志 {i}")
+        if i % 100 == 99:
+            window.flush_log()  # 日志定时器每帧批量刷新一次
+            app.processEvents()
+    window.flush_log()
+    app.processEvents()
+    metric(results, "ui.log_message_us", None, (time.perf_counter() - started) / count * 1e6)
+    window.close()
+
+
+def bench_startup(args, results):
+    paints, imports = [], []
+    for _ in range(args.repeat):
+        launched = time.monotonic()
+        output = subprocess.run([sys.executable, "-c", FIRST_PAINT, repr(launched)], cwd=REPO,
+                                capture_output=True, text=True, timeout=60, check=True).stdout
+        imported, painted = map(float, output.split())
+        imports.append(imported)
+        paints.append(painted)
+    metric(results, "startup.import_ms", None, min(imports))
+    metric(results, "startup.first_paint_ms", None, min(paints))
+
+
+def bench_scaling(args, results):
+    from benchmarks.pump_scaling import run_case
+
+    for count in (1, 16) if args.quick else (1, 16, 64):
+        r = run_case(count, args.seconds, "manager")
+        metric(results, "scaling.cpu_per_step_us", count, r["cpu_per_step_us"])
+        metric(results, "scaling.mean_lateness_ms", count, r["mean_lateness_ms"])
+        metric(results, "scaling.stop_max_ms", count, r["stop_max_ms"])
+
+
+CASES = {
+    "throughput": bench_throughput,
+    "accuracy": bench_accuracy,
+    "latency": bench_latency,
+    "ui": bench_ui,
+    "startup": bench_startup,
+    "scaling": bench_scaling,
+}
+
+
+def describe(name):
+    """指标名 -> (单位, 方向, 噪声下限)"""
+    return UNITS[name.split("@", 1)[0]]
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(current, baseline, threshold):
+    """逐项比较，返回 (行列表, 退化的指标数)"""
+    rows, regressions = [], 0
+    for name, value in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        old = baseline["results"][name]
+        unit, better, floor = describe(name)
+        if old:
+            change = (value - old) / old
+        else:  # 基线为 0 (例如速率误差)：超过噪声下限即视为无穷大的变化
+            change = math.copysign(math.inf, value - old) if abs(value - old) > floor else 0.0
+        worse = change if better == "lower" else -change
+        status = "ok"
+        if worse > threshold and abs(value - old) > floor:
+            status = "REGRESSION"
+            regressions += 1
+        elif worse < -threshold and abs(value - old) > floor:
+            status = "improved"
+        rows.append((name, old, value, unit, change, status))
+    return rows, regressions
+
+
+def print_comparison(rows, regressions, threshold):
+    print(f"{'metric':<36} {'baseline':>12} {'current':>12} {'unit':>8} {'change':>9}  status")
+    for name, old, value, unit, change, status in rows:
+        print(f"{name:<36} {old:>12.4g} {value:>12.4g} {unit:>8} {change:>+9.1%}  {status}")
+    print(f"{regressions} regression(s) beyond {threshold:.0%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", help=f"逗号分隔的测试项 ({','.join(CASES)})")
+    parser.add_argument("--quick", action="store_true", help="减少速度档位、重复次数和运行时间")
+    parser.add_argument("--repeat", type=int, help="每项的重复次数 (默认 3，--quick 时 1)")
+    parser.add_argument("--seconds", type=float, help="真实时间测试每种情况的时长 (默认 1.0，--quick 时 0.5)")
+    parser.add_argument("--ticks", type=int, default=5000, help="界面测试的进度更新次数")
+    parser.add_argument("--output", help="结果 JSON 的保存路径")
+    parser.add_argument("--baseline", help="用于比较的基线结果 JSON")
+    parser.add_argument("--compare", help="不运行，只把这个结果 JSON 与 --baseline 比较")
+    parser.add_argument("--threshold", type=float, default=0.25, help="判定退化的相对变化")
+    args = parser.parse_args(argv)
+    args.speeds = QUICK_SPEEDS if args.quick else SPEEDS
+    args.repeat = args.repeat or (1 if args.quick else 3)
+    args.seconds = args.seconds or (0.5 if args.quick else 1.0)
+
+    if args.compare:
+        if not args.baseline:
+            parser.error("--compare 需要同时给出 --baseline")
+        with open(args.compare, encoding="utf-8") as f:
+            current = json.load(f)
+    else:
+        selected = args.only.split(",") if args.only else list(CASES)
+        unknown = set(selected) - set(CASES)
+        if unknown:
+            parser.error(f"未知的测试项: {', '.join(sorted(unknown))}")
+        current = {"environment": environment(), "quick": args.quick, "results": {}, "durations_s": {}}
+        for name in selected:
+            started = time.perf_counter()
+            CASES[name](args, current["results"])
+            current["durations_s"][name] = time.perf_counter() - started
+            print(f"{name}: done in {current['durations_s'][name]:.1f} s", file=sys.stderr)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(current, f, indent=2, ensure_ascii=False)
+        if not args.baseline:
+            for name, value in current["results"].items():
+                unit, better, _ = describe(name)
+                print(f"{name:<36} {value:>12.4g} {unit:>8}  ({better} is better)")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows, regressions = compare(current, baseline, args.threshold)
+        print_comparison(rows, regressions, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+"""加速仿真基准：用虚拟时钟在无界面模式下排空整个 5000 uL 储药器
+
+不创建 QApplication，也不调用 time.sleep。
+
+    python -m benchmarks.time_warp [--speed 0.01]
+"""
+import argparse
+import sys
+import time
+
+from srtp.clock import VirtualClock
+from ui import DrugPumpSimulator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--speed", type=float, default=0.01, help="注射速度 (uL/s)")
+    args = parser.parse_args(argv)
+
+    clock = VirtualClock()
+    pump = DrugPumpSimulator(clock=clock, threaded=False, progress_rate=None)
+    events = []
+    progress = [0]
+    pump.progress_updated.connect(lambda *_: progress.__setitem__(0, progress[0] + 1))
+    pump.remaining_low_warning.connect(lambda: events.append(f"low@{pump.remaining_medicine:.1f}"))
+    pump.infusion_finished.connect(lambda: events.append("finished"))
+    pump.infusion_stopped.connect(lambda v: events.append(f"stopped@{v:.1f}"))
+    pump.infusion_paused.connect(lambda v: events.append(f"paused@{v:.1f}"))
+
+    started = time.perf_counter()
+    pump.start_infusion(pump.remaining_medicine, args.speed)
+    wall = time.perf_counter() - started
+
+    simulated = clock.now()
+    print(f"drained {pump.current_volume:.1f} uL at {args.speed} uL/s: "
+          f"{simulated / 3600:.1f} h simulated in {wall:.3f} s wall "
+          f"({simulated / wall:,.0f}x real time)")
+    print(f"progress_updated: {progress[0]}, events: {', '.join(events)}")
+    print(f"rejected restart on empty reservoir: {pump.start_infusion(1, args.speed) is False}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
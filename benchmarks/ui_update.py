@@ -0,0 +1,76 @@
+"""界面热路径微基准：每次进度更新的界面耗时 (改造前 vs 改造后)
+
+改造前的实现每次进度更新都对药量指示灯调用 setStyleSheet；
+改造后指示灯只在颜色区间变化时才通过动态属性重新套用预先写好的样式。
+使用 offscreen 平台，无需显示器。
+
+    python -m benchmarks.ui_update [--ticks 20000]
+"""
+import argparse
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from ui import MainWindow  # noqa: E402
+
+
+def legacy_update_progress(window, current_vol, target_vol, remaining_med):
+    """改造前的 MainWindow.update_progress"""
+    percent = (current_vol / target_vol) * 100 if target_vol > 0 else 0
+    window.progress_bar.setValue(int(percent))
+    window.current_vol_label.setText(f"{current_vol:.1f}")
+    window.target_vol_label.setText(f"{target_vol:.1f}")
+    window.remaining_vol_label.setText(f"{remaining_med:.1f}")
+    med_percent = (remaining_med / 5000) * 100
+    if med_percent < 5:
+        window.medicine_status_indicator.setStyleSheet("background-color: red; border-radius: 10px;")
+    elif med_percent < 20:
+        window.medicine_status_indicator.setStyleSheet("background-color: orange; border-radius: 10px;")
+    else:
+        window.medicine_status_indicator.setStyleSheet("background-color: green; border-radius: 10px;")
+
+
+def drive(app, update, ticks):
+    """模拟一次从满储药器开始的注射，返回每次更新的平均耗时 (微秒)"""
+    target = ticks * 0.1
+    started = time.perf_counter()
+    for i in range(1, ticks + 1):
+        current = i * 0.1
+        update(current, target, 5000 - current)
+        if i % 100 == 0:
+            app.processEvents()  # 让重绘等延迟工作也计入耗时
+    app.processEvents()
+    return (time.perf_counter() - started) / ticks * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ticks", type=int, default=20000, help="进度更新次数")
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    legacy_window = MainWindow()
+    legacy_window.show()
+    legacy = drive(app, lambda *snapshot: legacy_update_progress(legacy_window, *snapshot), args.ticks)
+    legacy_window.close()
+
+    window = MainWindow()
+    window.show()
+    current = drive(app, window.update_progress, args.ticks)
+    window.close()
+
+    print(f"{args.ticks} progress updates")
+    print(f"{'implementation':<28} {'per tick (us)':>14}")
+    print(f"{'setStyleSheet every tick':<28} {legacy:>14.1f}")
+    print(f"{'cached indicator state':<28} {current:>14.1f}")
+    print(f"speedup: {legacy / current:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
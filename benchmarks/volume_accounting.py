@@ -0,0 +1,59 @@
+"""剂量记账基准：排空整个 5000 uL 储药器后，已注射量与剩余药量之和是否仍等于装药量
+
+旧实现用浮点数每步 += 0.1 / -= 0.1，且最后一步被目标量截断时剩余药量仍减去整步；
+PumpEngine 以整数纳升记账。
+
+    python -m benchmarks.volume_accounting [--target 7.77]
+"""
+import argparse
+import sys
+
+from srtp.clock import VirtualClock
+from srtp.engine import PumpEngine
+
+
+def legacy_accounting(capacity, target):
+    """旧实现的记账方式：重复 target 大小的任务直到储药量不足，返回 (已注射总量, 剩余药量)"""
+    remaining = capacity
+    delivered = 0.0
+    while target <= remaining:
+        current = 0.0
+        while current < target:
+            increment = 0.1
+            current += increment
+            if current > target:
+                current = target
+            remaining -= increment
+        delivered += current
+    return delivered, remaining
+
+
+def engine_accounting(capacity, target, speed):
+    """PumpEngine 在加速仿真下重复同样的任务，返回 (已注射总量, 剩余药量)"""
+    pump = PumpEngine(VirtualClock(), progress_rate=None)
+    pump.refill(capacity)
+    delivered = 0.0
+    while target <= pump.remaining_medicine:
+        pump.start_infusion(target, speed)
+        delivered += pump.current_volume
+    return delivered, pump.remaining_medicine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", type=float, default=7.77, help="每次任务的目标量 (uL)")
+    parser.add_argument("--speed", type=float, default=0.0137, help="注射速度 (uL/s)")
+    args = parser.parse_args(argv)
+
+    capacity = 5000.0
+    print(f"{'':<10} {'delivered uL':>14} {'remaining uL':>14} {'drift uL':>12}")
+    for label, (delivered, remaining) in (
+            ("legacy", legacy_accounting(capacity, args.target)),
+            ("engine", engine_accounting(capacity, args.target, args.speed))):
+        drift = round(capacity - (delivered + remaining), 6) + 0.0  # 去掉 -0.0
+        print(f"{label:<10} {delivered:>14.4f} {remaining:>14.4f} {drift:>12.6f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""帕金森给药装置控制软件的核心组件 (不依赖 PyQt6)"""
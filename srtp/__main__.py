@@ -0,0 +1,143 @@
+"""无界面命令行：不导入 PyQt6，直接驱动模拟泵
+
+    python -m srtp run --volume 50 --speed 0.05                 # 真实时间注射，Ctrl+C 停止
+    python -m srtp run --volume 50 --speed 0.05 --warp 100      # 100 倍加速
+    python -m srtp run --volume 500 --speed 0.5 --fast --confirm --json
+    python -m srtp sweep --count 10000 --output sweep.npz       # 批量场景验证 (srtp.sweep)
+
+run 使用与界面相同的参数检查 (srtp.validation)：参数无效时退出码为 2；有需要确认的警告时
+必须带 --confirm，否则列出警告并退出 (退出码 3)。注射完成退出码为 0，被拒绝为 1，被中断 (停止) 为 130。
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+
+from srtp.clock import VirtualClock
+from srtp.engine import PumpEngine
+from srtp.journal import InfusionJournal
+from srtp.validation import check_infusion
+
+EXIT_REFUSED = 1
+EXIT_INVALID = 2
+EXIT_UNCONFIRMED = 3
+EXIT_INTERRUPTED = 130
+
+
+def run(args):
+    clock = VirtualClock(None if args.fast else args.warp) if (args.fast or args.warp) else None
+    journal = InfusionJournal(args.journal) if args.journal else None
+    engine = PumpEngine(clock, progress_rate=args.progress_rate, journal=journal, capacity=args.capacity)
+    if args.remaining is not None:
+        engine.refill(args.remaining)
+
+    # 之前的注射量来自注射日志 (--journal)，没有日志时只检查这一次注射
+    check = check_infusion(args.volume, args.speed, engine.remaining_medicine, engine.volume,
+                           delivered_today=engine.delivered_today, delivered_last_hour=engine.delivered_last_hour)
+    if check.errors:
+        for error in check.errors:
+            print(f"{error.title}: {error.text}", file=sys.stderr)
+        return EXIT_INVALID
+    if check.warnings and not args.confirm:
+        for warning in check.warnings:
+            print(f"{warning.title}: {warning.text}", file=sys.stderr)
+        print("以上警告需要确认，确认后加 --confirm 重新运行", file=sys.stderr)
+        return EXIT_UNCONFIRMED
+
+    ended = threading.Event()
+    outcome = {}
+    started = time.monotonic()
+
+    def emit(record):
+        if args.json:
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+        elif record["event"] == "log_message":
+            print(record["message"], flush=True)
+        elif record["event"] == "progress_updated" and not args.quiet:
+            print(f"  {record['current']:.3f} / {record['target']:.3f} uL, 剩余药量 {record['remaining']:.1f} uL",
+                  flush=True)
+
+    def listener(name, *args_):
+        record = {"t": round(time.monotonic() - started, 6), "event": name}
+        if name == "progress_updated":
+            record.update(current=args_[0], target=args_[1], remaining=args_[2])
+        elif name == "log_message":
+            record["message"] = args_[0]
+        elif name == "state_changed":
+            record.update(old=args_[0].value, new=args_[1].value)
+        elif name == "infusion_rejected":
+            record.update(title=args_[0], text=args_[1])
+        elif name == "rate_measured":
+            record.update(target_rate=args_[0], actual_rate=args_[1])
+        elif name in ("infusion_stopped", "infusion_paused"):
+            record["volume"] = args_[0]
+        if name == "log_message" and args.quiet:
+            return
+        emit(record)
+        if name in ("infusion_finished", "infusion_stopped", "infusion_paused"):
+            outcome["end"] = name
+            ended.set()
+
+    engine.add_listener(listener)
+    # 注射过程在后台线程中运行，主线程等待结束并处理 Ctrl+C
+    workers = []
+
+    def runner():
+        worker = threading.Thread(target=engine.run, name="infusion", daemon=True)
+        workers.append(worker)
+        worker.start()
+
+    engine.runner = runner
+    if not engine.start_infusion(check.volume, check.speed):
+        return EXIT_REFUSED
+    try:
+        while not ended.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        engine.stop_infusion()
+        ended.wait(5)
+    # 结束事件之后注射线程还要写最后一条日志 ([完成] / [停止])，等它退出再汇总和关闭日志
+    for worker in workers:
+        worker.join(5)
+    if journal is not None:
+        journal.close()
+    metrics = engine.rate_metrics
+    if not args.json:
+        print(f"结果: {outcome.get('end')}, 已注射 {engine.current_volume:.3f} uL, "
+              f"剩余药量 {engine.remaining_medicine:.1f} uL, "
+              f"实际速率 {metrics.get('actual_rate', 0.0):.6f} uL/s, 耗时 {time.monotonic() - started:.2f} s")
+    return 0 if outcome.get("end") == "infusion_finished" else EXIT_INTERRUPTED
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m srtp", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="无界面运行一次注射")
+    run_parser.add_argument("--volume", required=True, help="目标注射量 (uL)")
+    run_parser.add_argument("--speed", type=float, required=True, help="注射速度 (uL/s)")
+    run_parser.add_argument("--capacity", type=float, default=5000.0, help="储药器容量 (uL)")
+    run_parser.add_argument("--remaining", type=float, help="开始前把储药器装到该药量 (uL)，默认满容量")
+    run_parser.add_argument("--confirm", action="store_true", help="确认全部警告 (注射量过大、速度过快、违反计划规则)")
+    speed = run_parser.add_mutually_exclusive_group()
+    speed.add_argument("--warp", type=float, help="按该倍数加速的虚拟时钟")
+    speed.add_argument("--fast", action="store_true", help="不等待，尽可能快地仿真")
+    run_parser.add_argument("--journal", help="注射日志文件 (崩溃后可恢复)")
+    run_parser.add_argument("--progress-rate", type=float, default=2.0, help="进度输出的最高频率 (Hz)")
+    run_parser.add_argument("--quiet", action="store_true", help="不输出进度和日志，只输出结果")
+    run_parser.add_argument("--json", action="store_true", help="每个事件输出一行 JSON")
+
+    commands.add_parser("sweep", help="批量场景验证 (参数见 python -m srtp sweep -h)", add_help=False)
+
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["sweep"]:
+        from srtp.sweep import main as sweep_main
+
+        return sweep_main(argv[1:])
+    args = parser.parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""给药泵的 asyncio 接口 (不依赖 PyQt6)
+
+    pump = AsyncPump()
+    events = pump.events()            # 立即订阅，不会漏掉之后的事件
+    await pump.start(50, 0.05)
+    async for event in events:        # PumpEvent(name, args, snapshot)
+        if event.name in ("infusion_finished", "infusion_stopped"):
+            break
+
+AsyncPump 在事件循环中用一个任务驱动 PumpEngine：按截止时间等待下一步，
+控制命令会立即唤醒该任务，不需要额外的线程。
+"""
+import asyncio
+from collections import namedtuple
+
+from srtp.engine import PumpEngine
+
+# 一条事件：name 为 PumpEngine 的事件名，args 为事件参数，snapshot 为事件发生后的泵状态
+PumpEvent = namedtuple("PumpEvent", "name args snapshot")
+
+
+class InfusionRejected(Exception):
+    """开始注射被拒绝 (药量不足、注射已在进行中等)"""
+
+
+class EventStream:
+    """一个事件订阅：异步迭代得到 PumpEvent"""
+
+    def __init__(self, pump):
+        self._pump = pump
+        self._queue = asyncio.Queue()
+
+    def _put(self, event):
+        self._queue.put_nowait(event)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._queue.get()
+
+    def close(self):
+        """取消订阅"""
+        self._pump._streams.discard(self)
+
+
+class AsyncPump:
+    """PumpEngine 的 asyncio 适配器"""
+
+    def __init__(self, engine=None, **engine_options):
+        """engine: 已有的 PumpEngine；不提供时用 engine_options 新建一个"""
+        self.engine = engine or PumpEngine(**engine_options)
+        self.engine.runner = self._launch
+        self.engine.add_listener(self._on_event)
+        self._streams = set()
+        self._task = None
+        self._wakeup = None  # 命令到达时唤醒驱动任务
+        self._rejection = None
+
+    def events(self):
+        """订阅之后的全部事件"""
+        stream = EventStream(self)
+        self._streams.add(stream)
+        return stream
+
+    def snapshot(self):
+        return self.engine.snapshot()
+
+    async def start(self, volume, speed):
+        """开始新的注射任务，返回开始后的状态快照"""
+        return await self._begin(self.engine.start_infusion(volume, speed))
+
+    async def start_protocol(self, protocol):
+        """按给药程序 (程序段列表或 Timeline) 开始注射，返回开始后的状态快照"""
+        return await self._begin(self.engine.start_protocol(protocol))
+
+    async def resume(self):
+        """恢复暂停的注射任务"""
+        engine = self.engine
+        return await self._begin(engine.start_infusion(engine.target_volume, engine.infusion_speed, is_resume=True))
+
+    async def pause(self):
+        """暂停注射，等到暂停生效后返回状态快照"""
+        return await self._finish_run(self.engine.pause_infusion())
+
+    async def stop(self):
+        """停止注射，等到停止生效后返回状态快照"""
+        return await self._finish_run(self.engine.stop_infusion())
+
+    async def set_speed(self, speed):
+        """修改注射速度 (注射中立即按新速度重新排期)"""
+        await self._acknowledged(self.engine.set_speed(speed))
+        return self.engine.snapshot()
+
+    async def wait(self):
+        """等待当前运行结束 (暂停/停止/完成)"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+        return self.engine.snapshot()
+
+    async def _begin(self, command):
+        if not command:
+            title, text = self._rejection or ("无法开始注射", "注射已在进行中")
+            self._rejection = None
+            raise InfusionRejected(f"{title}: {text}")
+        await self._acknowledged(command)
+        return self.engine.snapshot()
+
+    async def _finish_run(self, command):
+        await self._acknowledged(command)
+        return await self.wait()
+
+    async def _acknowledged(self, command):
+        """唤醒驱动任务并等到命令被确认"""
+        if command is None:
+            return
+        if self._wakeup is not None:
+            self._wakeup.set()
+        while not command.wait(0) and self._task is not None and not self._task.done():
+            await asyncio.sleep(0)
+
+    def _on_event(self, name, *args):
+        if name == "infusion_rejected":
+            self._rejection = args
+        event = PumpEvent(name, args, self.engine.snapshot())
+        for stream in tuple(self._streams):
+            stream._put(event)
+
+    def _launch(self):
+        """PumpEngine.start_infusion 的 runner：在当前事件循环中创建驱动任务"""
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._drive())
+
+    async def _sleep_until(self, deadline):
+        """等到截止时间，或被命令提前唤醒"""
+        clock = self.engine.scheduler.clock
+        if clock.virtual and clock.factor is None:
+            clock.advance_to(deadline)  # 尽可能快的虚拟时钟：直接跳到截止时间
+            await asyncio.sleep(0)
+            return
+        timeout = deadline - clock.now()
+        if clock.virtual:
+            timeout /= clock.factor
+        if timeout <= 0:
+            return
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _drive(self):
+        """驱动一次运行，直到暂停/停止/完成"""
+        engine = self.engine
+        clock = engine.scheduler.clock
+        engine.begin_run()
+        engine.drain_commands()  # 确认开始/恢复命令
+        while True:
+            if not (engine.should_stop or engine.should_pause):
+                await self._sleep_until(engine.next_step_at)
+                engine.drain_commands()
+                if not (engine.should_stop or engine.should_pause) and clock.now() < engine.next_step_at:
+                    continue  # 被调速等命令提前唤醒，继续等待
+            if not engine.advance():
+                return
@@ -0,0 +1,146 @@
+"""非模态告警：优先级队列、去重合并和审计记录 (不依赖 PyQt6)
+
+每条告警有一个 key (例如 ("remaining_low", 泵编号))：同一个 key 的告警在被确认之前只保留一条，
+再次发出时合并 (次数加一、更新内容，级别只升不降)，因此多台泵、反复触发的告警不会堆积。
+界面只显示优先级最高的一条 (同级别按先后)，操作者确认后显示下一条；
+发出、合并、确认、自动解除都写入审计记录。整个过程不阻塞事件循环。
+
+AlertManager 只在一个线程 (界面线程) 中使用。
+"""
+import enum
+import heapq
+import itertools
+import time
+from collections import deque, namedtuple
+
+
+class AlertLevel(enum.IntEnum):
+    """告警级别 (数值越小越优先)"""
+
+    CRITICAL = 0
+    WARNING = 1
+    INFO = 2
+
+
+LEVEL_TEXT = {AlertLevel.CRITICAL: "严重", AlertLevel.WARNING: "警告", AlertLevel.INFO: "提示"}
+
+# 一条审计记录：action 为 raised / coalesced / acknowledged / resolved
+AuditRecord = namedtuple("AuditRecord", "timestamp action key level title text count by")
+
+
+class Alert:
+    """一条待确认的告警"""
+
+    __slots__ = ("key", "level", "title", "text", "source", "action", "raised_at", "updated_at", "count", "_order")
+
+    def __init__(self, key, level, title, text, source, action, now):
+        self.key = key
+        self.level = level
+        self.title = title
+        self.text = text
+        self.source = source  # 来源 (泵编号等)
+        self.action = action  # 可选的 (按钮文字, 回调)，例如 "确认开始"
+        self.raised_at = now
+        self.updated_at = now
+        self.count = 1  # 合并的次数
+        self._order = None  # 当前有效的堆条目序号
+
+    def __repr__(self):
+        return f"Alert({self.key!r}, {self.level.name}, {self.title!r}, count={self.count})"
+
+
+class AlertManager:
+    """按优先级排列、按 key 去重的告警队列"""
+
+    def __init__(self, audit=None, history=500, clock=time.time):
+        """audit: 每条审计记录的回调 audit(AuditRecord)，例如写入操作日志；history: 内存中保留的审计记录数"""
+        self.audit = audit
+        self.clock = clock
+        self.history = deque(maxlen=history)  # 审计记录 (由旧到新)
+        self._active = {}  # key -> Alert
+        self._heap = []  # (级别, 序号, key)，过期条目在取堆顶时丢弃
+        self._counter = itertools.count()
+        self._listeners = []
+        self.raised = 0  # 发出的告警数 (不含合并)
+        self.coalesced = 0  # 被合并的重复告警数
+
+    def __len__(self):
+        return len(self._active)
+
+    def __contains__(self, key):
+        return key in self._active
+
+    def add_listener(self, listener):
+        """告警队列变化时调用 listener()"""
+        self._listeners.append(listener)
+
+    def raise_alert(self, key, level, title, text, source=None, action=None):
+        """发出一条告警；同一个 key 尚未确认时合并到已有的告警，返回该 Alert"""
+        now = self.clock()
+        alert = self._active.get(key)
+        if alert is None:
+            alert = self._active[key] = Alert(key, level, title, text, source, action, now)
+            self.raised += 1
+            self._push(alert)
+            self._record("raised", alert)
+        else:
+            alert.count += 1
+            alert.title, alert.text, alert.updated_at = title, text, now
+            if action is not None:
+                alert.action = action
+            if level < alert.level:
+                alert.level = level  # 只升级，不降级
+                self._push(alert)
+            self.coalesced += 1
+            self._record("coalesced", alert)
+        self._changed()
+        return alert
+
+    def top(self):
+        """优先级最高的告警，没有时返回 None"""
+        heap = self._heap
+        while heap:
+            level, order, key = heap[0]
+            alert = self._active.get(key)
+            if alert is not None and alert._order == order:
+                return alert
+            heapq.heappop(heap)  # 已确认或已升级的旧条目
+        return None
+
+    def pending(self):
+        """全部待确认的告警 (按优先级)"""
+        return sorted(self._active.values(), key=lambda alert: (alert.level, alert.raised_at))
+
+    def acknowledge(self, key=None, by="操作员", run_action=False):
+        """确认一条告警 (默认为堆顶)；run_action 为 True 时执行它的动作，返回被确认的 Alert"""
+        alert = self.top() if key is None else self._active.get(key)
+        if alert is None:
+            return None
+        del self._active[alert.key]
+        self._record("acknowledged", alert, by)
+        self._changed()
+        if run_action and alert.action is not None:
+            alert.action[1]()
+        return alert
+
+    def resolve(self, key):
+        """告警条件已经消失 (例如补药后)：不需要确认，直接移除"""
+        alert = self._active.pop(key, None)
+        if alert is not None:
+            self._record("resolved", alert, "系统")
+            self._changed()
+        return alert
+
+    def _push(self, alert):
+        alert._order = next(self._counter)
+        heapq.heappush(self._heap, (alert.level, alert._order, alert.key))
+
+    def _record(self, action, alert, by=None):
+        record = AuditRecord(self.clock(), action, alert.key, alert.level, alert.title, alert.text, alert.count, by)
+        self.history.append(record)
+        if self.audit is not None:
+            self.audit(record)
+
+    def _changed(self):
+        for listener in self._listeners:
+            listener()
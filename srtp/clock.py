@@ -0,0 +1,65 @@
+"""注射计时用的时钟
+
+MonotonicClock 使用真实的单调时钟；VirtualClock 用于无界面的加速仿真：
+按给定倍数加速真实时间，或 (factor=None) 完全不等待、直接跳到下一步的截止时间。
+两者都通过命令通道等待，因此暂停/停止命令总能立即唤醒注射线程，且从不调用 time.sleep。
+"""
+import math
+import time
+
+
+class MonotonicClock:
+    """真实时间 (time.monotonic)"""
+
+    virtual = False
+
+    def now(self):
+        return time.monotonic()
+
+    def wait(self, channel, deadline):
+        """在命令通道上等待到截止时间 (math.inf 表示一直等)，返回期间收到的命令"""
+        if deadline == math.inf:
+            return channel.wait(None)
+        return channel.wait(deadline - time.monotonic())
+
+
+class VirtualClock:
+    """虚拟时间：factor 为加速倍数，None 表示尽可能快地运行"""
+
+    virtual = True
+
+    def __init__(self, factor=None, start=0.0):
+        if factor is not None and factor <= 0:
+            raise ValueError("加速倍数必须大于0")
+        self.factor = factor
+        self._virtual_origin = start  # 虚拟时间起点 (s)
+        self._real_origin = time.monotonic()  # 对应的真实时间
+        self._now = start  # 尽可能快模式下的当前虚拟时间
+
+    def now(self):
+        if self.factor is None:
+            return self._now
+        return self._virtual_origin + (time.monotonic() - self._real_origin) * self.factor
+
+    def advance(self, seconds):
+        """手动推进虚拟时间 (仅用于尽可能快模式)"""
+        self.advance_to(self.now() + seconds)
+
+    def advance_to(self, deadline):
+        """把虚拟时间推进到 deadline (不会倒退)"""
+        if self.factor is None:
+            self._now = max(self._now, deadline)
+        else:
+            self._virtual_origin = max(self.now(), deadline)
+            self._real_origin = time.monotonic()
+
+    def wait(self, channel, deadline):
+        """等待到虚拟截止时间：加速模式按比例缩短真实等待，尽可能快模式直接跳到截止时间"""
+        if deadline == math.inf:
+            return channel.wait(None if self.factor is not None else 0)
+        if self.factor is not None:
+            return channel.wait((deadline - self.now()) / self.factor)
+        commands = channel.wait(0)
+        if not commands:
+            self.advance_to(deadline)
+        return commands
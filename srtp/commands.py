@@ -0,0 +1,86 @@
+"""泵控制命令通道
+
+UI 线程通过 CommandChannel 向注射线程投递 开始/暂停/恢复/停止/调速 命令，
+注射线程在等待下一步的期间阻塞在条件变量上，命令一到立即被唤醒，
+因此响应延迟与注射速度无关。
+"""
+import threading
+import time
+from collections import deque
+
+# 命令类型
+CMD_START = "start"
+CMD_PAUSE = "pause"
+CMD_RESUME = "resume"
+CMD_STOP = "stop"
+CMD_SET_SPEED = "set_speed"
+
+
+class PumpCommand:
+    """一条控制命令，记录发出时间与被注射线程确认的时间"""
+
+    __slots__ = ("kind", "value", "source", "issued_at", "acked_at", "_done")
+
+    def __init__(self, kind, value=None, source=None):
+        self.kind = kind
+        self.value = value
+        self.source = source  # 发出命令的泵 (多台泵共用一个通道时用于分发)
+        self.issued_at = time.perf_counter()
+        self.acked_at = None
+        self._done = threading.Event()
+
+    def acknowledge(self):
+        """由注射线程调用，表示命令已被处理"""
+        self.acked_at = time.perf_counter()
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """等待命令被确认，超时返回 False"""
+        return self._done.wait(timeout)
+
+    @property
+    def latency(self):
+        """命令从发出到确认的耗时 (秒)，尚未确认时为 None"""
+        if self.acked_at is None:
+            return None
+        return self.acked_at - self.issued_at
+
+    def __repr__(self):
+        return f"PumpCommand({self.kind!r}, {self.value!r})"
+
+
+class CommandChannel:
+    """线程安全的命令队列，消费者可带超时等待"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = deque()
+
+    def post(self, kind, value=None, source=None):
+        """投递一条命令并唤醒等待中的注射线程"""
+        command = PumpCommand(kind, value, source)
+        with self._cond:
+            self._pending.append(command)
+            self._cond.notify()
+        return command
+
+    def wait(self, timeout):
+        """最多等待 timeout 秒 (None 表示一直等)，返回期间收到的全部命令 (可能为空列表)"""
+        if timeout is not None and timeout <= 0 and not self._pending:
+            return []  # 不等待且没有命令时无需加锁 (加速仿真的热路径)
+        with self._cond:
+            if not self._pending and (timeout is None or timeout > 0):
+                self._cond.wait(timeout)
+            commands = list(self._pending)
+            self._pending.clear()
+        return commands
+
+    def clear(self, source=None):
+        """丢弃尚未处理的命令 (新任务开始前调用)；指定 source 时只丢弃该泵的命令"""
+        with self._cond:
+            if source is None:
+                self._pending.clear()
+            else:
+                kept = [command for command in self._pending if command.source is not source]
+                self._pending.clear()
+                self._pending.extend(kept)
@@ -0,0 +1,526 @@
+"""给药泵核心逻辑 (纯 Python，不依赖 PyQt6)
+
+PumpEngine 负责储药量检查、低药量警告、暂停/恢复/停止、速率排期和注射日志，
+状态变化通过事件回调 listener(name, *args) 通知外部：
+    progress_updated(当前已注射量, 总目标量, 剩余药量)  按最高频率合并后发出
+    infusion_finished()                 注射完成
+    infusion_stopped(已注射量)           注射停止
+    infusion_paused(已注射量)            注射暂停
+    state_changed(旧状态, 新状态)         状态改变 (srtp.state.PumpState，显示文字由界面层决定)
+    log_message(日志消息)                记录日志
+    remaining_low_warning()             剩余药量不足警告
+    rate_measured(目标速率, 实际速率)     本次运行的速率统计
+    infusion_rejected(标题, 说明)         开始注射被拒绝 (药量不足等)
+除了恒定速率的 start_infusion，还可以用 start_protocol 执行多段给药程序 (srtp.protocol)。
+enable_forecast 开启储药器预测 (srtp.forecast)：按排队的注射预测何时降到某个剩余比例、能否再装下一次注射。
+Qt 界面通过 ui.DrugPumpSimulator 把这些事件转发为信号，asyncio 程序使用 srtp.aio.AsyncPump。
+
+驱动方式 (三选一)：
+    runner     由外部提供的启动函数 (例如 QThread.start)，在其线程中调用 run()
+    manager    交给 PumpManager 的调度线程推进 (attach)
+    都没有      start_infusion 在调用线程中同步运行到暂停/停止/完成 (无界面仿真)
+"""
+import threading
+import time
+from collections import namedtuple
+
+from srtp.commands import (
+    CommandChannel, CMD_START, CMD_PAUSE, CMD_RESUME, CMD_STOP, CMD_SET_SPEED
+)
+from srtp.forecast import ReservoirForecast
+from srtp.journal import (
+    REC_START, REC_STEP, REC_PAUSE, REC_STOP, REC_FINISH, REC_REFILL, REC_RESUME, deliveries
+)
+from srtp.protocol import Timeline, compile_protocol
+from srtp.scheduler import InfusionScheduler
+from srtp.state import TRANSITIONS, InvalidTransition, PumpState
+from srtp.telemetry import ProgressCoalescer
+from srtp.volume import DAY, HOUR, DeliveryWindow, VolumeLedger, to_nl, to_ul
+
+# 引擎发出的全部事件名
+ENGINE_EVENTS = (
+    "progress_updated", "infusion_finished", "infusion_stopped", "infusion_paused",
+    "state_changed", "log_message", "remaining_low_warning", "rate_measured", "infusion_rejected",
+)
+
+# 某一时刻的泵状态 (剂量单位 uL)，由引擎在每次修改后整体发布，任何线程都可以直接读取
+PumpSnapshot = namedtuple("PumpSnapshot", "state current target remaining speed is_running")
+
+
+class PumpEngine:
+    """一台模拟给药泵的状态机"""
+
+    def __init__(self, clock=None, progress_rate=30.0, journal=None, listener=None, planner=None, metrics=None,
+                 capacity=5000.0):
+        """clock: 计时用的时钟 (默认真实单调时钟，可传入 VirtualClock 加速仿真)
+        progress_rate: progress_updated 事件的最高发出频率 (Hz)，None 表示每一步都发出
+        journal: 可选的 InfusionJournal，记录注射过程并在启动时恢复储药量和中断的注射
+        listener: 事件回调 listener(name, *args)，也可以之后用 add_listener 添加
+        planner: 选择步长周期的 StepPlanner (默认每 0.2s 刷新一次，每步不超过 0.5uL)
+        metrics: 可选的 srtp.metrics.Metrics，记录热路径的耗时分布 (运行中也可以直接设置 engine.metrics)
+        capacity: 储药器容量 (uL)，开始时装满"""
+        self._listeners = [listener] if listener is not None else []
+        self._ledger = VolumeLedger(to_nl(capacity))  # 剂量账本 (nL)，默认 5.0mL = 5000uL
+        self._delivered = DeliveryWindow()  # 最近 24 小时各段运行的注射量 (nL)，用于剂量上限检查
+        self._run_from = None  # 本段运行开始时的已注射量 (nL)，没有在运行时为 None
+        self.infusion_speed = 0.0  # 注射速度 (uL/s)
+        self.is_running = False  # 是否正在注射
+        self.should_stop = False  # 是否收到停止指令
+        self.should_pause = False  # 是否收到暂停指令
+        self.state = PumpState.IDLE  # 当前状态 (只通过 _transition 修改)
+        self._state_lock = threading.Lock()  # 保证状态的检查和修改是原子的 (界面线程和注射线程都会转换状态)
+        self.paused_volume = 0.0  # 暂停时的已注射量
+        self.timeline = None  # 正在执行的给药程序 (None 表示恒定速率注射)
+        self.protocol_position = 0.0  # 给药程序已执行的程序时间 (s)，暂停后从这里恢复
+        self.low_warning_emitted = False  # 标记是否已经发出低药量警告
+        self._commands = CommandChannel()  # 控制命令通道 (控制方 -> 运行线程)
+        self.manager = None  # 由 PumpManager 驱动时不使用自己的线程
+        self.runner = None  # 启动后台运行的函数 (例如 QThread.start)，为 None 时同步运行
+        self.scheduler = InfusionScheduler(clock, planner)  # 基于单调时钟的排期器 (步长由 planner 选择)
+        self._next_step_at = 0.0  # 下一步注射的截止时间 (单调时钟)
+        self.rate_metrics = {}  # 最近一次运行的速率统计
+        self.telemetry = ProgressCoalescer(self._emit_progress, progress_rate)  # 合并限频的进度遥测
+        self.journal = journal  # 崩溃后可恢复的注射日志
+        self._run_record = None  # 运行开始时要写入日志的记录 (REC_START / REC_RESUME)，由注射线程写入
+        self.metrics = metrics  # 性能指标 (None 表示不记录)
+        self.forecast = None  # 储药器预测 (enable_forecast 开启)
+        self._snapshot = None  # 最近发布的状态快照
+        self._publish()
+        if journal is not None:
+            self._restore_from_journal()
+
+    @property
+    def current_volume(self):
+        """本次任务的已注射量 (uL)"""
+        return to_ul(self._ledger.current)
+
+    @property
+    def target_volume(self):
+        """本次任务的目标给药量 (uL)"""
+        return to_ul(self._ledger.target)
+
+    def delivered_within(self, seconds):
+        """最近 seconds 秒 (不超过 24 小时) 内的注射量 (uL)，包括正在进行的这段运行"""
+        total = self._delivered.total(self.scheduler.clock.now(), seconds)
+        run_from = self._run_from
+        if run_from is not None:
+            total += self._ledger.current - run_from
+        return to_ul(total)
+
+    @property
+    def delivered_today(self):
+        """最近 24 小时 (滚动) 的注射量 (uL)"""
+        return self.delivered_within(DAY)
+
+    @property
+    def delivered_last_hour(self):
+        """最近 1 小时的注射量 (uL)"""
+        return self.delivered_within(HOUR)
+
+    def _close_segment(self):
+        """一段运行结束 (注射线程)：把它的注射量计入滚动窗口"""
+        if self._run_from is not None:
+            self._delivered.add(self.scheduler.clock.now(), self._ledger.current - self._run_from)
+            self._run_from = None
+
+    @property
+    def remaining_medicine(self):
+        """设备剩余药量 (uL)"""
+        return to_ul(self._ledger.remaining)
+
+    @property
+    def volume(self):
+        """设备容量 (uL)"""
+        return to_ul(self._ledger.capacity)
+
+    def add_listener(self, listener):
+        """添加事件回调 listener(name, *args)"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        self._listeners.remove(listener)
+
+    def _emit(self, name, *args):
+        if self.metrics is not None:
+            self.metrics.inc("events_total")
+        for listener in self._listeners:
+            listener(name, *args)
+
+    def _emit_progress(self, current, target, remaining):
+        metrics = self.metrics
+        if metrics is None:
+            self._emit("progress_updated", current, target, remaining)
+            return
+        started = time.perf_counter()
+        self._emit("progress_updated", current, target, remaining)
+        metrics.observe("emit_seconds", time.perf_counter() - started)
+
+    def _transition_locked(self, new):
+        """按转换表检查并进入新状态 (调用方持有 _state_lock)，返回旧状态；不合法时抛出 InvalidTransition"""
+        old = self.state
+        if new not in TRANSITIONS[old]:
+            raise InvalidTransition(old, new)
+        self.state = new
+        self._publish()
+        return old
+
+    def _transition(self, new):
+        """进入新状态并发出 state_changed 事件；不合法时抛出 InvalidTransition"""
+        with self._state_lock:
+            old = self._transition_locked(new)
+        self._emit("state_changed", old, new)
+
+    def _publish(self):
+        """发布新的状态快照 (只由修改状态的一方调用；整体替换引用，读取方不需要加锁)"""
+        ledger = self._ledger
+        self._snapshot = PumpSnapshot(self.state, to_ul(ledger.current), to_ul(ledger.target),
+                                      to_ul(ledger.remaining), self.infusion_speed, self.is_running)
+
+    def snapshot(self):
+        """最近发布的不可变状态快照 (任何线程都可以调用)"""
+        return self._snapshot
+
+    def _restore_from_journal(self):
+        """按日志回放结果恢复储药量和最近 24 小时的注射量；中断的注射一律恢复为暂停状态，由用户决定是否继续"""
+        state = self.journal.state
+        if not state.records:
+            self._journal(REC_REFILL)  # 新日志：记录初始储药量
+            return
+        now, wall = self.scheduler.clock.now(), time.time()
+        for stamp, amount in deliveries(state.records):
+            if wall - stamp < DAY:
+                self._delivered.add(now - (wall - stamp), to_nl(amount))
+        ledger = self._ledger
+        ledger.load(to_nl(state.remaining))
+        self.low_warning_emitted = ledger.remaining * 20 <= ledger.capacity
+        if state.status != "idle":
+            ledger.target = to_nl(state.target)
+            ledger.current = to_nl(state.current)
+            self.paused_volume = state.current
+            self.infusion_speed = state.speed
+        self._publish()
+        if state.status != "idle":
+            self._transition(PumpState.PAUSED)
+            if state.status == "running":
+                self._journal(REC_PAUSE)
+
+    def attach(self, manager):
+        """交给 PumpManager 的调度线程驱动 (由 PumpManager.add_pump 调用)"""
+        self.manager = manager
+        self._commands = manager.channel
+        self.scheduler.clock = manager.clock
+        if self.forecast is not None:
+            self.forecast.clock = manager.clock
+
+    def _journal(self, kind, wait=True):
+        """向注射日志追加一条当前状态的记录；wait=False 时不在调用线程中落盘 (界面线程调用时)"""
+        if self.journal is not None:
+            self.journal.append(kind, self.current_volume, self.target_volume,
+                                self.remaining_medicine, self.infusion_speed, wait=wait)
+
+    def refill(self, volume=None):
+        """补充药物到 volume (默认满容量)，注射中不能补药"""
+        if self.is_running:
+            self._emit("log_message", "警告：注射中无法补充药物！")
+            return False
+        self._ledger.load(self._ledger.capacity if volume is None else to_nl(volume))
+        self.low_warning_emitted = False
+        self._publish()
+        if self.forecast is not None:
+            self.forecast.refill(self.remaining_medicine)
+        self._journal(REC_REFILL, wait=False)
+        self._emit("log_message", f"[补药] 设备剩余药量: {self.remaining_medicine:.1f} uL")
+        return True
+
+    def enable_forecast(self):
+        """开启储药器预测，返回 srtp.forecast.ReservoirForecast (已开启时直接返回)。
+        用它的 enqueue / enqueue_refill 排队之后的注射和补药，开始注射时与队首相同的一项会被取出"""
+        if self.forecast is None:
+            forecast = ReservoirForecast(self.volume, self.remaining_medicine, self.scheduler.clock)
+            if self.state in (PumpState.RUNNING, PumpState.PAUSED) and self.infusion_speed > 0:
+                # 进行中的任务 (包括从日志恢复的) 按当前速率估计剩余部分
+                forecast.start(self.target_volume - self.current_volume, self.infusion_speed)
+            self.forecast = forecast
+        return self.forecast
+
+    def set_speed(self, speed):
+        """设置注射速度 (注射中会立即唤醒注射线程按新速度重新排期)"""
+        if self.is_running and self.timeline is not None:
+            self._emit("log_message", "警告：给药程序执行中，速率由程序决定！")
+            return None
+        self.infusion_speed = speed
+        self._publish()
+        if self.is_running:
+            return self._commands.post(CMD_SET_SPEED, speed, self)
+        if self.forecast is not None and self.timeline is None:
+            self.forecast.set_rate(speed)  # 暂停中调速：恢复后按新速度注射
+        return None
+
+    def start_protocol(self, protocol):
+        """按给药程序 (程序段列表或编译好的 Timeline) 开始注射，成功时返回开始命令，失败返回 False。
+        开始前检查整个程序的总剂量不超过剩余药量；暂停后用 start_infusion(..., is_resume=True) 从原位置继续"""
+        timeline = protocol if isinstance(protocol, Timeline) else compile_protocol(protocol)
+        return self.start_infusion(timeline.total_volume, timeline.max_rate, timeline=timeline)
+
+    def _start_refusal(self, volume, is_resume):
+        """不能开始 (或恢复) 注射的原因 (日志, (拒绝标题, 说明) 或 None)，可以开始时返回 None (调用方持有 _state_lock)"""
+        if self.is_running:
+            return "警告：注射已在进行中！", None
+        # 检查剩余药量
+        if self._ledger.remaining <= 0:
+            return "错误：设备中药量已耗尽！", ("药量不足", "设备中药量已耗尽，无法开始注射！")
+        # 检查剩余药量是否足够 (新任务需要检查整个目标量)
+        if not is_resume and to_nl(volume) > self._ledger.remaining:
+            return (f"错误：剩余药量不足（剩余:{self.remaining_medicine}uL, 需要:{volume}uL）",
+                    ("药量不足", f"剩余药量不足！\n剩余药量: {self.remaining_medicine:.1f}uL\n需要药量: {volume:.1f}uL"))
+        if is_resume and self.state is not PumpState.PAUSED:
+            return "警告：没有可以恢复的注射任务！", None
+        return None
+
+    def start_infusion(self, volume, speed, is_resume=False, timeline=None):
+        """启动模拟注射过程，成功时返回投递的开始/恢复命令，失败返回 False
+        timeline: 新任务按给药程序执行 (由 start_protocol 传入)
+        检查和进入运行状态在 _state_lock 中完成：界面和远程控制同时开始时只有一方成功"""
+        with self._state_lock:
+            refusal = self._start_refusal(volume, is_resume)
+            if refusal is None:
+                if is_resume:
+                    self._ledger.target = to_nl(volume)
+                    if self.forecast is not None and self.timeline is None:
+                        self.forecast.set_rate(speed)
+                else:
+                    self._ledger.begin(to_nl(volume))  # 新任务重置已注射量
+                    self.timeline = timeline
+                    self.protocol_position = 0.0
+                    self.low_warning_emitted = False  # 新任务开始时重置警告标记
+                    if self.forecast is not None:
+                        self.forecast.start(volume, speed, timeline)
+                self.infusion_speed = speed
+                self._commands.clear(self)  # 丢弃上一次任务遗留的命令
+                command = self._commands.post(CMD_RESUME if is_resume else CMD_START, speed, self)
+                self._run_record = REC_RESUME if is_resume else REC_START  # 注射线程确认命令前写入日志
+                self.is_running = True
+                self.should_stop = False
+                self.should_pause = False
+                old = self._transition_locked(PumpState.RUNNING)
+        if refusal is not None:
+            message, rejection = refusal
+            self._emit("log_message", message)
+            if rejection is not None:
+                self._emit("infusion_rejected", *rejection)
+            return False
+        self._emit("state_changed", old, PumpState.RUNNING)
+
+        if is_resume:
+            self._emit("log_message",
+                       f"[恢复] 继续注射: 目标剂量: {self.target_volume} uL, 速度: {self.infusion_speed} uL/s")
+        elif timeline is not None:
+            self._emit("log_message",
+                       f"[开始] 给药程序: {len(timeline) - 1} 段, 总剂量: {timeline.total_volume:.3f} uL, "
+                       f"时长: {timeline.duration:.0f} s")
+        else:
+            self._emit("log_message", f"[开始] 目标剂量: {self.target_volume} uL, 速度: {self.infusion_speed} uL/s")
+
+        if self.manager is not None:
+            pass  # 开始命令已发往多泵控制器，由它的调度线程推进
+        elif self.runner is not None:
+            self.runner()  # 启动后台运行 (会调用 run() 方法)
+        else:
+            self.run()  # 无界面仿真：在当前线程中运行到暂停/停止/完成
+        return command
+
+    def pause_infusion(self):
+        """暂停模拟注射过程，返回投递的命令 (可用于等待确认)"""
+        if not self.is_running:
+            return None
+        try:
+            self._transition(PumpState.PAUSED)
+        except InvalidTransition:
+            return None  # 正在停止，或运行刚刚结束
+        command = self._commands.post(CMD_PAUSE, source=self)
+        self._emit("log_message", "[用户操作] 暂停注射")
+        return command
+
+    def stop_infusion(self):
+        """停止模拟注射过程，返回投递的命令 (可用于等待确认)；已暂停的注射直接停止，返回 None"""
+        with self._state_lock:
+            # 运行中 (包括暂停命令尚未生效) 交给注射线程停止；已暂停的注射没有线程在跑，直接停止
+            new = PumpState.STOPPING if self.is_running else PumpState.STOPPED
+            try:
+                old = self._transition_locked(new)
+            except InvalidTransition:
+                return None
+        self._emit("state_changed", old, new)
+        self._emit("log_message", "[用户操作] 停止注射")
+        if new is PumpState.STOPPED:
+            if self.forecast is not None:
+                self.forecast.finish()
+            self._journal(REC_STOP, wait=False)  # 没有注射线程：交给日志的写盘线程，不阻塞调用方 (界面线程)
+            self._emit("infusion_stopped", self.current_volume)
+            self._emit("log_message", f"[停止] 已注射: {self.current_volume:.1f} uL")
+            return None
+        return self._commands.post(CMD_STOP, source=self)
+
+    def _apply_command(self, command):
+        """在注射线程中执行一条控制命令并确认"""
+        if command.kind == CMD_STOP:
+            self.should_stop = True
+        elif command.kind == CMD_PAUSE:
+            self.should_pause = True
+        elif command.kind == CMD_SET_SPEED:
+            # 以当前时刻为新速度段的起点重新排期
+            self.infusion_speed = command.value
+            self.scheduler.set_rate(command.value)
+            self._next_step_at = self.scheduler.next_deadline()
+            if self.forecast is not None:
+                self.forecast.set_rate(command.value)
+        if self.metrics is not None:
+            self.metrics.inc("commands_total")
+        command.acknowledge()
+
+    def drain_commands(self):
+        """不等待，立即执行已收到的全部命令"""
+        for command in self._commands.wait(0):
+            self._apply_command(command)
+
+    def _wait_for_next_step(self):
+        """等待到下一步的截止时间，期间收到的命令会立即被处理"""
+        clock = self.scheduler.clock
+        while not (self.should_stop or self.should_pause):
+            commands = clock.wait(self._commands, self._next_step_at)
+            if not commands and clock.now() >= self._next_step_at:
+                return
+            for command in commands:
+                self._apply_command(command)
+
+    def _report_rate(self):
+        """记录并发出本次运行的速率统计"""
+        self.rate_metrics = self.scheduler.metrics()
+        self._emit("rate_measured", self.rate_metrics["target_rate"], self.rate_metrics["actual_rate"])
+
+    def begin_run(self):
+        """开始 (或恢复后继续) 一次运行：先把开始/恢复记录落盘 (之后才确认命令)，
+        再从当前已注射量 (给药程序从暂停时的程序时间) 起排期第一步"""
+        record, self._run_record = self._run_record, None
+        if record is not None:
+            self._journal(record)
+        self._run_from = self._ledger.current
+        if self.timeline is not None:
+            self.scheduler.begin_protocol(self.timeline, self.protocol_position)
+        else:
+            self.scheduler.begin(self.current_volume, self.target_volume, self.infusion_speed)
+        self._next_step_at = self.scheduler.next_deadline()
+
+    def advance(self):
+        """到达截止时间 (或收到暂停/停止命令) 后推进一步。
+        返回 True 表示本次运行继续，下一步的截止时间为 next_step_at；返回 False 表示已暂停/停止/完成"""
+        if self.should_pause:
+            self._close_segment()  # 在允许恢复 (is_running = False) 之前
+            with self._state_lock:
+                # 暂停命令生效前用户又要求停止：按停止结束本次运行
+                self.should_stop = self.state is PumpState.STOPPING
+                if not self.should_stop:
+                    self.is_running = False
+                    self._publish()
+            if not self.should_stop:
+                self._pause_run()
+                return False
+
+        if not self.should_stop:
+            metrics = self.metrics
+            if metrics is None:
+                self._step()
+            else:
+                self._measured_step(metrics)
+
+        if self.should_stop or self._ledger.current >= self._ledger.target:
+            self._end_run()
+            return False
+        self._next_step_at = self.scheduler.next_deadline()
+        return True
+
+    @property
+    def next_step_at(self):
+        """下一步的截止时间 (计时时钟)"""
+        return self._next_step_at
+
+    def _measured_step(self, metrics):
+        """带计时的 _step：醒来的延迟、一步的耗时、步数和被合并的进度快照数"""
+        metrics.observe("wakeup_lateness_seconds", max(0.0, self.scheduler.clock.now() - self._next_step_at))
+        merged = self.telemetry.merged
+        started = time.perf_counter()
+        self._step()
+        metrics.observe("step_seconds", time.perf_counter() - started)
+        metrics.inc("steps_total")
+        metrics.inc("updates_dropped_total", self.telemetry.merged - merged)
+
+    def _step(self):
+        """按时钟计算应注射量 (醒来晚了会在这一步自动补齐)"""
+        ledger = self._ledger
+        # 已注射量和剩余药量增减同一个整数 (nL)，最后一步被目标量或剩余药量截断时也一样
+        ledger.advance_to(to_nl(self.scheduler.tick()))
+        self._publish()
+        self._journal(REC_STEP)  # 步进检查点 (分组提交，不会每步落盘)
+
+        if ledger.remaining == 0 and ledger.current < ledger.target:
+            self._emit("log_message", "错误：设备中药量已耗尽，注射中止！")
+            self.should_stop = True
+
+        # 检查剩余药量是否低于5% 且 尚未发出警告
+        if ledger.remaining * 20 <= ledger.capacity and not self.low_warning_emitted:  # 5% of volume
+            self.telemetry.flush()  # 警告前先送达之前合并的进度
+            self._emit("remaining_low_warning")
+            self.low_warning_emitted = True  # 标记已发出警告
+
+        # 通过遥测更新进度 (按最高频率合并后发出事件)
+        snapshot = self._snapshot
+        self.telemetry.publish(snapshot.current, snapshot.target, snapshot.remaining)
+        forecast = self.forecast
+        if forecast is not None:
+            forecast.update(snapshot.remaining)
+
+    def _pause_run(self):
+        """暂停处理"""
+        self.paused_volume = self.current_volume
+        if self.timeline is not None:
+            self.protocol_position = self.scheduler.position()
+        self._journal(REC_PAUSE)
+        if self.forecast is not None:
+            self.forecast.halt()
+        self.telemetry.flush()
+        self._report_rate()
+        self._emit("infusion_paused", self.current_volume)
+
+    def _end_run(self):
+        """注射结束处理 (停止或完成)"""
+        new = PumpState.STOPPED if self.should_stop else PumpState.FINISHED
+        self._close_segment()  # 在允许重新开始 (is_running = False) 之前
+        with self._state_lock:
+            self.is_running = False
+            old = self._transition_locked(new)
+        if self.forecast is not None:
+            self.forecast.finish()
+        self.telemetry.flush()
+        self._report_rate()
+        self._journal(REC_STOP if self.should_stop else REC_FINISH)
+        self._emit("state_changed", old, new)
+        if self.should_stop:
+            self._emit("infusion_stopped", self.current_volume)
+            self._emit("log_message", f"[停止] 已注射: {self.current_volume:.1f} uL")
+        else:
+            self._emit("infusion_finished")
+            self._emit("log_message",
+                       f"[完成] 已注射: {self.current_volume:.1f} uL, "
+                       f"实际速率: {self.rate_metrics['actual_rate']:.4f} uL/s "
+                       f"(误差 {self.rate_metrics['rate_error'] * 100:+.3f}%)")
+
+    def run(self):
+        """阻塞运行到暂停/停止/完成 (在 runner 启动的线程中，或无界面仿真时在调用线程中)"""
+        self.begin_run()
+
+        self.drain_commands()  # 确认开始/恢复命令
+
+        # 阻塞等待到下一步的截止时间，但暂停/停止命令会立即唤醒
+        self._wait_for_next_step()
+        while self.advance():
+            self._wait_for_next_step()
@@ -0,0 +1,238 @@
+"""储药器预测：按已排队的注射预测何时降到某个剩余比例、新的注射能否装下 (不依赖 PyQt6)
+
+排队的注射 (恒定速率或给药程序) 和计划补药首尾相接，排成一条"计划时间"上的分段线性出药曲线。
+索引保存各段边界的计划时间和累计出药量 (前缀和，整数纳升)，排队只在末尾追加：
+    update          每个进度点 O(1)：按剩余药量的减少推进当前位置
+    when_remaining  剩余药量降到容量某个比例的时刻：在前缀和上二分，O(log n) (每个待执行的计划补药多一次比较)
+    can_fit         队列执行完 (包括计划补药) 后能否再装下一次注射，O(log r)，r 为计划补药数
+暂停和空闲时整个队列顺延。开始一次未排队的注射或调速时按剩余的队列重建索引 (O(n)，不在进度热路径上)。
+给药程序中速率为 0 的段按暂停估计 (这期间预测时刻随时间顺延)。
+
+update 只由注射线程调用且不加锁；排队、补药和查询加锁，可以在任何线程中调用。
+"""
+import math
+import threading
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+
+from srtp.clock import MonotonicClock
+from srtp.volume import NL_PER_UL, to_nl, to_ul
+
+INFUSION = "infusion"
+REFILL = "refill"
+
+# 队列中的一项：start/end 为它在索引中的累计出药量位置 (nL)，segments 为 ((时长 s, 注射量 nL), ...)，
+# level 为计划补药装到的药量 (nL，注射为 None)
+QueueItem = namedtuple("QueueItem", "kind start end segments level")
+
+
+def _segments(volume, speed, timeline=None):
+    """恒定速率注射或给药程序 -> ((时长, 注射量 nL), ...)"""
+    if timeline is not None:
+        times, volumes = timeline.times, timeline.volumes
+        return tuple((times[i + 1] - times[i], to_nl(volumes[i + 1]) - to_nl(volumes[i]))
+                     for i in range(len(times) - 1))
+    if speed <= 0:
+        raise ValueError("注射速度必须大于0")
+    return ((volume / speed, to_nl(volume)),)
+
+
+class ReservoirForecast:
+    """一台泵的储药器预测"""
+
+    def __init__(self, capacity=5000.0, remaining=None, clock=None):
+        """capacity: 储药器容量 (uL)；remaining: 当前剩余药量 (默认满容量)；clock: 预测时刻所用的时钟"""
+        self.capacity = to_nl(capacity)
+        self.clock = clock or MonotonicClock()
+        self._lock = threading.Lock()
+        # (当前位置的累计出药量 nL, 当前剩余药量 nL, 最近一次进度的时刻；None 表示没有在注射，队列随时间顺延)
+        self._anchor = (0, self.capacity if remaining is None else to_nl(remaining), None)
+        self._rebuild([])
+
+    def _rebuild(self, items):
+        """以当前位置为起点，按 items 重新建立索引 (O(n))"""
+        self._times = [0.0]  # 各段边界的计划时间 (s)
+        self._cum = [0]  # 各段边界的累计出药量 (nL)，单调不减
+        self._rates = []  # 各段的速率 (nL/s)
+        self._refill_at = []  # 计划补药的位置 (累计出药量 nL)
+        self._refill_to = []  # 计划补药装到的药量 (nL)
+        self._next_refill = 0  # 第一个尚未执行的计划补药
+        self._items = []
+        self._next = 0  # 第一个尚未开始的队列项
+        self._active = None  # 正在执行的注射
+        _, level, _ = self._anchor
+        self._anchor = (0, level, None)
+        for item in items:
+            self._append(item.kind, item.segments, item.level)
+
+    def _append(self, kind, segments, level=None):
+        times, cum, rates = self._times, self._cum, self._rates
+        start = cum[-1]
+        if kind == REFILL:
+            self._refill_at.append(start)
+            self._refill_to.append(level)
+        for duration, volume in segments:
+            times.append(times[-1] + duration)
+            rates.append(volume / duration if duration > 0 else float("inf"))
+            cum.append(cum[-1] + volume)
+        item = QueueItem(kind, start, cum[-1], segments, level)
+        self._items.append(item)
+        return item
+
+    def _schedule_time(self, position):
+        """累计出药量第一次到达 position 的计划时间 (O(log n))"""
+        cum = self._cum
+        j = bisect_left(cum, position)
+        if j == 0:
+            return self._times[0]
+        if j == len(cum):
+            return self._times[-1]
+        return self._times[j - 1] + (position - cum[j - 1]) / self._rates[j - 1]
+
+    def _time_at(self, position, now):
+        """累计出药量到达 position 的时钟时刻：正在注射时从最近一次进度起算，否则从现在起算"""
+        current, _, stamp = self._anchor
+        base = now if stamp is None else stamp
+        return base + self._schedule_time(position) - self._schedule_time(current)
+
+    # ------------------------------------------------------------------
+    # 排队
+    # ------------------------------------------------------------------
+    def enqueue(self, volume, speed):
+        """在队列末尾追加一次恒定速率注射，返回预计完成的时钟时刻"""
+        return self._enqueue(INFUSION, _segments(volume, speed))
+
+    def enqueue_protocol(self, timeline):
+        """在队列末尾追加一个给药程序 (srtp.protocol.Timeline)，返回预计完成的时钟时刻"""
+        return self._enqueue(INFUSION, _segments(None, None, timeline))
+
+    def enqueue_refill(self, volume=None):
+        """在队列末尾追加一次计划补药 (装到 volume，默认满容量)，返回预计执行的时钟时刻"""
+        return self._enqueue(REFILL, (), self.capacity if volume is None else to_nl(volume))
+
+    def _enqueue(self, kind, segments, level=None):
+        now = self.clock.now()
+        with self._lock:
+            item = self._append(kind, segments, level)
+            return self._time_at(item.end, now)
+
+    # ------------------------------------------------------------------
+    # 泵的实际进展 (由 PumpEngine 调用)
+    # ------------------------------------------------------------------
+    def start(self, volume, speed, timeline=None):
+        """开始一次新注射：与队首的注射相同时直接从队列中取出 (跳过排在它前面、没有执行的计划补药)，
+        否则把它插到队首并重建索引"""
+        segments = _segments(volume, speed, timeline)
+        with self._lock:
+            items, i = self._items, self._next
+            while i < len(items) and items[i].kind == REFILL:
+                i += 1
+            if i < len(items) and items[i].segments == segments:
+                _, level, _ = self._anchor
+                self._anchor = (items[i].start, level, None)
+                self._next_refill = bisect_right(self._refill_at, items[i].start, self._next_refill)
+                self._active, self._next = items[i], i + 1
+                return
+            self._rebuild([QueueItem(INFUSION, 0, 0, segments, None)] + items[self._next:])
+            self._active, self._next = self._items[0], 1
+
+    def update(self, remaining, now=None):
+        """进度点 (O(1))：剩余药量减少了多少，当前位置就前进多少"""
+        position, level, _ = self._anchor
+        remaining = to_nl(remaining)
+        if remaining < level:
+            position = min(position + level - remaining, self._cum[-1])
+        self._anchor = (position, remaining, self.clock.now() if now is None else now)
+
+    def set_rate(self, speed):
+        """恒定速率注射调速 (包括暂停后以新速度恢复)：剩余部分按新速率重新排期，速率没变时什么也不做"""
+        with self._lock:
+            active = self._active
+            position, level, _ = self._anchor
+            if active is None or active.end <= position or len(active.segments) != 1:
+                return
+            duration, volume = active.segments[0]
+            if math.isclose(volume / duration, speed * NL_PER_UL, rel_tol=1e-9):
+                return
+            left = active.end - position
+            self._rebuild([QueueItem(INFUSION, 0, 0, _segments(to_ul(left), speed), None)]
+                          + self._items[self._next:])
+            self._active, self._next = self._items[0], 1
+
+    def halt(self):
+        """暂停：之后整个队列随时间顺延"""
+        position, level, _ = self._anchor
+        self._anchor = (position, level, None)
+
+    def finish(self):
+        """本次注射结束 (完成或停止)：没有注射的部分不再计入，当前位置移到它的末尾"""
+        with self._lock:
+            position, level, _ = self._anchor
+            if self._active is not None:
+                position = max(position, self._active.end)
+                self._active = None
+            self._anchor = (position, level, None)
+
+    def refill(self, remaining):
+        """实际补药到 remaining (uL)：队首正好是计划补药时视为已执行"""
+        with self._lock:
+            position, _, stamp = self._anchor
+            self._anchor = (position, to_nl(remaining), stamp)
+            items = self._items
+            if self._active is None and self._next < len(items) and items[self._next].kind == REFILL:
+                self._next += 1
+                self._next_refill = bisect_right(self._refill_at, position, self._next_refill)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    @property
+    def remaining(self):
+        """最近一次知道的剩余药量 (uL)"""
+        return to_ul(self._anchor[1])
+
+    @property
+    def queued(self):
+        """尚未开始的队列项数"""
+        return len(self._items) - self._next
+
+    def when_remaining(self, fraction, now=None):
+        """按队列执行，剩余药量降到容量的 fraction (0 表示耗尽) 的时钟时刻；
+        已经不高于时返回 now，队列执行完也不会降到时返回 None"""
+        now = self.clock.now() if now is None else now
+        target = round(fraction * self.capacity)
+        with self._lock:
+            position, level, _ = self._anchor
+            refill_at, refill_to = self._refill_at, self._refill_to
+            k = bisect_left(refill_at, position, self._next_refill)  # 经过了却没有执行的计划补药不算
+            start, loaded = position, level
+            while True:
+                end = refill_at[k] if k < len(refill_at) else self._cum[-1]
+                crossing = start + loaded - target
+                if crossing <= start:
+                    return now if start == position else self._time_at(start, now)
+                if crossing <= end:
+                    return self._time_at(crossing, now)
+                if k == len(refill_at):
+                    return None
+                start, loaded = refill_at[k], refill_to[k]
+                k += 1
+
+    def time_until(self, fraction, now=None):
+        """距剩余药量降到容量的 fraction 还有多少秒 (不会降到时为 None)"""
+        now = self.clock.now() if now is None else now
+        at = self.when_remaining(fraction, now)
+        return None if at is None else max(0.0, at - now)
+
+    def remaining_after(self):
+        """队列全部执行完后的剩余药量 (uL)，负数表示中途耗尽 (缺少的量)"""
+        with self._lock:
+            position, level, _ = self._anchor
+            k = len(self._refill_at) - 1
+            if k >= self._next_refill and self._refill_at[k] >= position:
+                position, level = self._refill_at[k], self._refill_to[k]
+            return to_ul(level - (self._cum[-1] - position))
+
+    def can_fit(self, volume, reserve=0.0):
+        """排在队列末尾的 volume uL 注射能否装下，且之后至少还剩容量的 reserve (例如 0.05)"""
+        return to_nl(self.remaining_after()) - to_nl(volume) >= round(reserve * self.capacity)
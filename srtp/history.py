@@ -0,0 +1,106 @@
+"""固定内存的多分辨率历史记录 (用于实时曲线)
+
+每一层是一个按时间分桶的环形缓冲：第 k 层的桶宽为 base_period × factor^k 秒，
+每个桶只保存该时间段内的最小值、最大值和最后一个值 (min/max 抽取)，
+因此尖峰不会在粗分辨率层中被抹掉。新样本同时写入所有层 (O(层数))，
+每层最多保留 capacity 个桶，总内存与会话时长无关。
+
+绘制时按可见时间跨度和像素宽度选择桶宽最接近一个像素的层，
+所以无论会话是 10 分钟还是 10 天，每次重绘处理的桶数都不超过 capacity。
+"""
+import math
+from array import array
+from collections import namedtuple
+
+# 查询结果：各桶的起点时间、最小值、最大值 (按时间顺序)
+HistorySlice = namedtuple("HistorySlice", "t vmin vmax width")
+
+
+class _Level:
+    """一层环形缓冲"""
+
+    __slots__ = ("width", "t", "vmin", "vmax", "last", "head", "count", "bucket")
+
+    def __init__(self, width, capacity):
+        self.width = width  # 桶宽 (s)
+        self.t = array("d", bytes(8 * capacity))  # 桶起点时间
+        self.vmin = array("d", bytes(8 * capacity))
+        self.vmax = array("d", bytes(8 * capacity))
+        self.last = array("d", bytes(8 * capacity))
+        self.head = -1  # 最新桶的下标
+        self.count = 0  # 已使用的桶数
+        self.bucket = None  # 最新桶的序号 floor(t / width)
+
+    def add(self, t, value):
+        bucket = math.floor(t / self.width)
+        if bucket == self.bucket:
+            i = self.head
+            if value < self.vmin[i]:
+                self.vmin[i] = value
+            elif value > self.vmax[i]:
+                self.vmax[i] = value
+            self.last[i] = value
+            return
+        self.bucket = bucket
+        capacity = len(self.t)
+        self.head = i = (self.head + 1) % capacity
+        if self.count < capacity:
+            self.count += 1
+        self.t[i] = bucket * self.width
+        self.vmin[i] = self.vmax[i] = self.last[i] = value
+
+
+class DecimatedHistory:
+    """一个数值序列的多分辨率历史"""
+
+    def __init__(self, base_period=0.1, factor=4, levels=10, capacity=2048):
+        """base_period: 最细一层的桶宽 (s)；factor: 相邻两层桶宽的倍数；
+        levels: 层数；capacity: 每层的桶数 (默认最粗一层可覆盖约 600 天)"""
+        self.capacity = capacity
+        self._levels = [_Level(base_period * factor ** k, capacity) for k in range(levels)]
+        self.samples = 0  # 已写入的样本数
+        self.latest = None  # 最新样本 (t, value)
+
+    def __len__(self):
+        return self.samples
+
+    @property
+    def memory(self):
+        """缓冲区占用的字节数 (固定)"""
+        return sum(4 * level.t.itemsize * len(level.t) for level in self._levels)
+
+    def append(self, t, value):
+        """写入一个样本 (t 需单调不减)"""
+        for level in self._levels:
+            level.add(t, value)
+        self.samples += 1
+        self.latest = (t, value)
+
+    def level_for(self, span, pixels):
+        """跨度 span 秒、宽 pixels 像素时使用的层：桶宽不小于一个像素对应的时间，且能覆盖整个跨度"""
+        per_pixel = span / max(pixels, 1)
+        for k, level in enumerate(self._levels):
+            if level.width >= per_pixel and level.width * self.capacity >= span:
+                return k
+        return len(self._levels) - 1
+
+    def query(self, start, end, pixels):
+        """取 [start, end] 时间段内的桶 (按像素宽度选择分辨率)，返回 HistorySlice"""
+        level = self._levels[self.level_for(end - start, pixels)]
+        t, vmin, vmax = [], [], []
+        capacity = len(level.t)
+        # 从最新的桶往前找，早于 start 的桶之前都不用再看
+        for n in range(level.count):
+            i = (level.head - n) % capacity
+            bucket_start = level.t[i]
+            if bucket_start + level.width < start:
+                break
+            if bucket_start > end:
+                continue
+            t.append(bucket_start)
+            vmin.append(level.vmin[i])
+            vmax.append(level.vmax[i])
+        t.reverse()
+        vmin.reverse()
+        vmax.reverse()
+        return HistorySlice(t, vmin, vmax, level.width)
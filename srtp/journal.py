@@ -0,0 +1,209 @@
+"""只追加、可在崩溃后恢复的注射日志 (二进制，定长记录)
+
+文件格式：8 字节文件头 MAGIC，之后是定长记录 RECORD：
+    类型(B) 序号(I) 时间戳(d) 已注射量(d) 目标量(d) 剩余药量(d) 速度(d) CRC32(I)
+CRC 覆盖记录的其余字节，回放时遇到第一条不完整或校验失败的记录即停止
+(崩溃时最后一次写入可能只写了一半)，写入端打开文件时会把这段尾巴截掉。
+
+写入采用分组提交：步进检查点先缓存在内存，距上次落盘超过 sync_interval 秒时
+一次性 write + fsync；开始/恢复/暂停/停止/完成/补药 这些状态变化总是立即落盘。
+注射线程追加时自己落盘 (确认命令之前记录已经写入磁盘)；界面线程以 wait=False 追加，
+只放入缓存，由日志自己的写盘线程落盘，界面线程不会阻塞在磁盘上。
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+MAGIC = b"SRTPJNL1"
+RECORD = struct.Struct("<B3xIdddddI")
+_BODY = struct.Struct("<B3xIddddd")  # 不含 CRC 的部分
+
+# 记录类型
+REC_START = 1
+REC_STEP = 2
+REC_PAUSE = 3
+REC_STOP = 4
+REC_FINISH = 5
+REC_REFILL = 6
+REC_RESUME = 7
+
+_LIFECYCLE = frozenset((REC_START, REC_PAUSE, REC_STOP, REC_FINISH, REC_REFILL, REC_RESUME))
+
+# 一条解码后的记录
+JournalRecord = namedtuple("JournalRecord", "kind seq timestamp current target remaining speed")
+
+# 回放结果：status 为 "idle" (没有未完成的注射)、"running" (注射中断) 或 "paused"
+JournalState = namedtuple(
+    "JournalState", "remaining current target speed status records valid_bytes")
+
+
+def _iter_records(buffer, size):
+    """逐条解码，遇到不完整或 CRC 错误的记录停止；返回 (记录列表, 有效字节数)"""
+    records = []
+    offset = len(MAGIC)
+    if size < offset or buffer[:offset] != MAGIC:
+        return records, 0
+    while offset + RECORD.size <= size:
+        fields = RECORD.unpack_from(buffer, offset)
+        if zlib.crc32(buffer[offset:offset + _BODY.size]) != fields[-1]:
+            break
+        records.append(JournalRecord(*fields[:-1]))
+        offset += RECORD.size
+    return records, offset
+
+
+def replay(path, capacity=5000.0):
+    """通过内存映射读取日志并重建设备状态；文件不存在时返回满储药器的空闲状态"""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    if size == 0:
+        return JournalState(capacity, 0.0, 0.0, 0.0, "idle", [], 0)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        records, valid_bytes = _iter_records(buffer, size)
+
+    remaining, current, target, speed, status = capacity, 0.0, 0.0, 0.0, "idle"
+    for record in records:
+        remaining = record.remaining
+        if record.kind == REC_REFILL or record.kind in (REC_STOP, REC_FINISH):
+            current, target, speed, status = 0.0, 0.0, 0.0, "idle"
+        else:
+            current, target, speed = record.current, record.target, record.speed
+            status = "paused" if record.kind == REC_PAUSE else "running"
+    return JournalState(remaining, current, target, speed, status, records, valid_bytes)
+
+
+def deliveries(records):
+    """按记录还原各段运行 (开始/恢复到暂停/停止/完成) 的注射量，返回 [(结束时的时间戳, 注射量 uL), ...]；
+    最后一段没有结束记录 (崩溃) 时按最后一条记录计"""
+    segments = []
+    start = last = None
+    for record in records:
+        if record.kind in (REC_START, REC_RESUME):
+            start = record.current
+        elif start is not None:
+            last = record
+            if record.kind in (REC_PAUSE, REC_STOP, REC_FINISH):
+                segments.append((record.timestamp, record.current - start))
+                start = last = None
+    if start is not None and last is not None:
+        segments.append((last.timestamp, last.current - start))
+    return segments
+
+
+class InfusionJournal:
+    """注射日志写入端 (线程安全)"""
+
+    def __init__(self, path, sync_interval=1.0, clock=time.monotonic, compact_above=100000):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.sync_interval = sync_interval  # 步进检查点的最长落盘间隔 (s)，0 表示每条都落盘
+        self._clock = clock
+        self._lock = threading.Lock()  # 保护缓存和序号 (只做内存操作)
+        self._io_lock = threading.Lock()  # 串行化 write + fsync，保证记录按追加顺序写入
+        self._buffer = bytearray()  # 尚未写入的记录
+        self._wakeup = threading.Condition(self._lock)
+        self._due = False  # 写盘线程有记录要落盘
+        self._writer = None  # 写盘线程 (第一次以 wait=False 追加时启动)
+        self._last_sync = clock()
+        self.state = replay(path)
+        if len(self.state.records) > compact_above:
+            self._compact()
+        self._seq = self.state.records[-1].seq + 1 if self.state.records else 0
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if self.state.valid_bytes == 0:
+            # 新文件或文件头损坏：重新写文件头
+            os.ftruncate(self._fd, 0)
+            os.write(self._fd, MAGIC)
+            os.fsync(self._fd)
+        else:
+            # 截掉崩溃时写了一半的尾部记录
+            os.ftruncate(self._fd, self.state.valid_bytes)
+        os.lseek(self._fd, 0, os.SEEK_END)
+        self.appended = 0  # 本次打开后追加的记录数
+        self.syncs = 0  # 落盘 (fsync) 次数
+
+    def _compact(self):
+        """日志过长时用一条等价的记录重写文件 (先写临时文件再原子替换)"""
+        state = self.state
+        kind = {"idle": REC_REFILL, "paused": REC_PAUSE}.get(state.status, REC_STEP)
+        body = _BODY.pack(kind, 0, time.time(), state.current, state.target, state.remaining, state.speed)
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC + body + struct.pack("<I", zlib.crc32(body)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self.state = replay(self.path)
+
+    def append(self, kind, current, target, remaining, speed, wait=True):
+        """追加一条记录；状态变化或到达落盘间隔时 write + fsync。
+        wait=False 时不在调用线程中落盘，而是交给写盘线程 (界面线程使用)"""
+        with self._lock:
+            if self._fd is None:
+                return
+            body = _BODY.pack(kind, self._seq, time.time(), current, target, remaining, speed)
+            self._buffer += body
+            self._buffer += struct.pack("<I", zlib.crc32(body))
+            self._seq += 1
+            self.appended += 1
+            due = kind in _LIFECYCLE or self._clock() - self._last_sync >= self.sync_interval
+            if due and not wait:
+                self._due = True
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="InfusionJournal", daemon=True)
+                    self._writer.start()
+                self._wakeup.notify()
+        if due and wait:
+            self._commit()
+
+    def sync(self):
+        """立即落盘缓存中的记录"""
+        self._commit()
+
+    def _commit(self):
+        """把缓存中的记录 write + fsync (不持有 _lock，追加不会等待磁盘)"""
+        with self._io_lock:
+            with self._lock:
+                data, fd = bytes(self._buffer), self._fd
+                self._buffer.clear()
+                self._last_sync = self._clock()
+            if data and fd is not None:
+                os.write(fd, data)
+                os.fsync(fd)
+                self.syncs += 1
+
+    def _write_loop(self):
+        """写盘线程：替界面线程落盘"""
+        while True:
+            with self._lock:
+                while not self._due and self._fd is not None:
+                    self._wakeup.wait()
+                if self._fd is None:
+                    return
+                self._due = False
+            self._commit()
+
+    def close(self):
+        with self._io_lock:
+            with self._lock:
+                if self._fd is None:
+                    return
+                data, fd = bytes(self._buffer), self._fd
+                self._buffer.clear()
+                self._fd = None
+                self._wakeup.notify()
+            if data:
+                os.write(fd, data)
+                os.fsync(fd)
+                self.syncs += 1
+            os.close(fd)
+        if self._writer is not None:
+            self._writer.join()
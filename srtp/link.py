@@ -0,0 +1,555 @@
+"""主机与给药泵之间的链路协议 (二进制帧)
+
+帧格式 (小端)：
+    A5 5A | 类型 u8 | 序号 u16 | 载荷长度 u16 | 载荷 | CRC-16/CCITT u16 (覆盖 类型 .. 载荷)
+帧类型：
+    COMMAND    主机 -> 设备：操作码 u8 + 参数 (剂量 nL、速度 nL/s，u32)
+    ACK        设备 -> 主机：与命令同序号；操作码 u8、结果 u8 + 执行后的状态记录
+    TELEMETRY  设备 -> 主机：自己的序号；记录数 u8 + 若干条状态记录 (一个周期内的全部进度合并为一帧)
+
+主机端 PumpLink 可以连续发出多条命令而不等待确认 (最多 window 条在途)，每条命令返回
+LinkCommand，确认到达时完成；超时未确认的命令按原序号重发，设备对重复的序号直接重发
+缓存的确认而不再执行，因此重传不会让命令执行两次。设备严格按序号顺序执行命令：
+前面的命令丢失时，后面先到的命令先缓存，等重传补齐后再依次执行 (连接时主机先发 RESET 对齐序号，
+RESET 带一个随机的会话号：重新连接的主机总是开始新会话，同一会话重传的 RESET 仍按重复命令应答)。
+CRC 错误或丢失的字节由解码器重新同步。
+
+后端：
+    LocalDevice      进程内直接调用 PumpEngine (不经过链路，作为对照)
+    PumpLink + DeviceEmulator   经过 srtp.transport 的字节流 (内存管道、socketpair、pty)
+两者提供相同的接口：status/start/pause/resume/stop/set_speed、add_listener、snapshot、close。
+"""
+import binascii
+import random
+import struct
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from srtp.engine import PumpEngine, PumpSnapshot
+from srtp.manager import PumpManager
+from srtp.state import PumpState
+from srtp.transport import TransportClosed
+from srtp.volume import to_nl, to_ul
+
+SYNC = b"\xa5\x5a"
+HEADER = struct.Struct("<2sBHH")  # 同步字, 帧类型, 序号, 载荷长度
+CRC = struct.Struct("<H")
+MAX_PAYLOAD = 4096
+
+# 帧类型
+FRAME_COMMAND = 1
+FRAME_ACK = 2
+FRAME_TELEMETRY = 3
+
+# 操作码
+OP_STATUS = 0
+OP_START = 1
+OP_PAUSE = 2
+OP_RESUME = 3
+OP_STOP = 4
+OP_SET_SPEED = 5
+OP_RESET = 0xFF  # 主机连接时发送 (带会话号)：新会话的设备清空确认缓存，从该序号开始按顺序执行
+OP_NAMES = {OP_STATUS: "status", OP_START: "start", OP_PAUSE: "pause", OP_RESUME: "resume",
+            OP_STOP: "stop", OP_SET_SPEED: "set_speed", OP_RESET: "reset"}
+
+# 命令结果 (TIMEOUT 只在主机端产生：重传次数用完仍未确认)
+ACK_OK = 0
+ACK_REFUSED = 1
+ACK_BAD_REQUEST = 2
+ACK_TIMEOUT = 255
+
+# 状态记录：设备时间 (ms)、状态、标志 (bit0 = 运行中)、已注射量、目标量、剩余药量 (nL)、速度 (nL/s)
+RECORD = struct.Struct("<IBBIIII")
+ACK_HEAD = struct.Struct("<BB")  # 操作码, 结果
+MAX_RECORDS = 128  # 每个遥测帧最多的记录数
+STATES = tuple(PumpState)
+
+# 一个解码出的帧
+Frame = namedtuple("Frame", "kind seq payload")
+
+
+def encode_frame(kind, seq, payload=b""):
+    """编码一个帧"""
+    body = HEADER.pack(SYNC, kind, seq, len(payload)) + payload
+    return body + CRC.pack(binascii.crc_hqx(body[2:], 0xFFFF))
+
+
+class FrameDecoder:
+    """从字节流中切出帧：CRC 错误或长度无效时跳过一个字节重新寻找同步字"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.crc_errors = 0  # CRC 校验失败的帧数
+        self.skipped = 0  # 重新同步时丢弃的字节数
+
+    def feed(self, data):
+        """送入新收到的字节，返回其中完整的帧列表"""
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        while True:
+            start = buffer.find(SYNC)
+            if start < 0:
+                keep = 1 if buffer[-1:] == SYNC[:1] else 0  # 同步字可能被拆在两次读取之间
+                self.skipped += len(buffer) - keep
+                del buffer[:len(buffer) - keep]
+                break
+            if start:
+                self.skipped += start
+                del buffer[:start]
+            if len(buffer) < HEADER.size:
+                break
+            _, kind, seq, length = HEADER.unpack_from(buffer)
+            if length > MAX_PAYLOAD:
+                self.skipped += 1
+                del buffer[:1]
+                continue
+            end = HEADER.size + length + CRC.size
+            if len(buffer) < end:
+                break
+            (crc,) = CRC.unpack_from(buffer, end - CRC.size)
+            if crc != binascii.crc_hqx(buffer[2:end - CRC.size], 0xFFFF):
+                self.crc_errors += 1
+                self.skipped += 1
+                del buffer[:1]
+                continue
+            frames.append(Frame(kind, seq, bytes(buffer[HEADER.size:end - CRC.size])))
+            del buffer[:end]
+        return frames
+
+
+def pack_record(snapshot, t_ms):
+    """PumpSnapshot -> 状态记录"""
+    return RECORD.pack(t_ms & 0xFFFFFFFF, STATES.index(snapshot.state), 1 if snapshot.is_running else 0,
+                       to_nl(snapshot.current), to_nl(snapshot.target), to_nl(snapshot.remaining),
+                       to_nl(snapshot.speed))
+
+
+def unpack_record(payload, offset=0):
+    """状态记录 -> (设备时间 ms, PumpSnapshot)"""
+    t_ms, state, flags, current, target, remaining, speed = RECORD.unpack_from(payload, offset)
+    return t_ms, PumpSnapshot(STATES[state], to_ul(current), to_ul(target), to_ul(remaining),
+                              to_ul(speed), bool(flags & 1))
+
+
+def encode_command(op, volume=None, speed=None):
+    """命令载荷 (剂量 uL、速度 uL/s 按整数 nL 传输)"""
+    if op == OP_START:
+        return struct.pack("<BII", op, to_nl(volume), to_nl(speed))
+    if op == OP_SET_SPEED:
+        return struct.pack("<BI", op, to_nl(speed))
+    if op == OP_RESET:
+        return struct.pack("<BI", op, random.getrandbits(32))  # 会话号
+    return struct.pack("<B", op)
+
+
+def execute(engine, payload):
+    """在设备上执行一条命令载荷，返回 (操作码, 结果)"""
+    op = payload[0] if payload else -1
+    try:
+        if op in (OP_STATUS, OP_RESET):
+            return op, ACK_OK
+        if op == OP_START:
+            _, volume, speed = struct.unpack("<BII", payload)
+            if volume == 0 or speed == 0:
+                return op, ACK_BAD_REQUEST
+            return op, ACK_OK if engine.start_infusion(to_ul(volume), to_ul(speed)) else ACK_REFUSED
+        if op == OP_PAUSE:
+            return op, ACK_OK if engine.pause_infusion() is not None else ACK_REFUSED
+        if op == OP_RESUME:
+            if engine.state is not PumpState.PAUSED:
+                return op, ACK_REFUSED
+            command = engine.start_infusion(engine.target_volume, engine.infusion_speed, is_resume=True)
+            return op, ACK_OK if command else ACK_REFUSED
+        if op == OP_STOP:
+            if engine.state not in (PumpState.RUNNING, PumpState.PAUSED):
+                return op, ACK_REFUSED
+            engine.stop_infusion()
+            return op, ACK_OK
+        if op == OP_SET_SPEED:
+            (_, speed) = struct.unpack("<BI", payload)
+            if speed == 0 or engine.is_running and engine.timeline is not None:
+                return op, ACK_REFUSED
+            engine.set_speed(to_ul(speed))
+            return op, ACK_OK
+    except struct.error:
+        pass  # 载荷长度与操作码不符
+    return op, ACK_BAD_REQUEST
+
+
+class LinkCommand:
+    """一条已发出的命令，设备确认 (或重传次数用完) 后完成"""
+
+    __slots__ = ("op", "seq", "frame", "issued_at", "acked_at", "status", "snapshot",
+                 "attempts", "deadline", "_done")
+
+    def __init__(self, op, seq, frame):
+        self.op = op
+        self.seq = seq
+        self.frame = frame  # 已编码的帧 (重传时原样发送)
+        self.issued_at = time.perf_counter()
+        self.acked_at = None
+        self.status = None  # ACK_OK / ACK_REFUSED / ACK_BAD_REQUEST / ACK_TIMEOUT
+        self.snapshot = None  # 设备执行命令后的状态
+        self.attempts = 1  # 发送次数
+        self.deadline = 0.0  # 等待确认的截止时间
+        self._done = threading.Event()
+
+    def complete(self, status, snapshot=None):
+        self.acked_at = time.perf_counter()
+        self.status = status
+        self.snapshot = snapshot
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """等待确认，超时返回 False"""
+        return self._done.wait(timeout)
+
+    @property
+    def ok(self):
+        return self.status == ACK_OK
+
+    @property
+    def latency(self):
+        """从第一次发出到确认的耗时 (秒)，尚未确认时为 None"""
+        if self.acked_at is None:
+            return None
+        return self.acked_at - self.issued_at
+
+    def __repr__(self):
+        return f"LinkCommand({OP_NAMES.get(self.op, self.op)!r}, seq={self.seq}, status={self.status})"
+
+
+class _Commands:
+    """status/start/... 便捷方法 (两种后端共用)"""
+
+    def status(self):
+        return self.send(OP_STATUS)
+
+    def start(self, volume, speed):
+        return self.send(OP_START, volume, speed)
+
+    def pause(self):
+        return self.send(OP_PAUSE)
+
+    def resume(self):
+        return self.send(OP_RESUME)
+
+    def stop(self):
+        return self.send(OP_STOP)
+
+    def set_speed(self, speed):
+        return self.send(OP_SET_SPEED, speed=speed)
+
+
+class PumpLink(_Commands):
+    """主机端链路：流水线发送命令，异步确认，超时重传，接收批量遥测"""
+
+    def __init__(self, transport, ack_timeout=0.1, retries=5, window=32):
+        """ack_timeout: 等待确认的时间 (s)，超时后重传；retries: 最多重传次数；window: 最多在途命令数"""
+        self.transport = transport
+        self.ack_timeout = ack_timeout
+        self.retries = retries
+        self.window = window
+        self.snapshot = None  # 最近收到的设备状态
+        self._decoder = FrameDecoder()
+        self._seq = 0
+        self._pending = {}  # 序号 -> LinkCommand
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._listeners = []
+        self._telemetry_seq = None
+        self._closed = False
+        self.stats = {"sent": 0, "retransmits": 0, "timeouts": 0, "late_acks": 0,
+                      "telemetry_frames": 0, "telemetry_records": 0, "telemetry_lost": 0}
+        self._thread = threading.Thread(target=self._run, name="PumpLink", daemon=True)
+        self._thread.start()
+        self.send(OP_RESET)  # 不等待确认：之后的命令排在它后面按顺序执行
+
+    def add_listener(self, listener):
+        """遥测回调 listener(设备时间 ms, PumpSnapshot)，在链路线程中调用"""
+        self._listeners.append(listener)
+
+    def send(self, op, volume=None, speed=None):
+        """发出一条命令 (在途命令达到 window 时等待)，返回 LinkCommand"""
+        payload = encode_command(op, volume, speed)
+        with self._cond:
+            while len(self._pending) >= self.window and not self._closed:
+                self._cond.wait()
+            if self._closed:
+                raise TransportClosed("链路已关闭")
+            seq = self._seq
+            self._seq = (seq + 1) & 0xFFFF
+            command = LinkCommand(op, seq, encode_frame(FRAME_COMMAND, seq, payload))
+            command.deadline = time.monotonic() + self.ack_timeout
+            self._pending[seq] = command
+            self.stats["sent"] += 1
+        self._write(command.frame)
+        return command
+
+    def _write(self, data):
+        with self._write_lock:
+            try:
+                self.transport.write(data)
+            except TransportClosed:
+                pass  # 由链路线程发现并结束在途命令
+
+    def close(self):
+        """关闭链路，尚未确认的命令以 ACK_TIMEOUT 结束"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(2.0)
+        self.transport.close()
+        self._fail_pending()
+
+    @property
+    def crc_errors(self):
+        return self._decoder.crc_errors
+
+    def _fail_pending(self):
+        with self._cond:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            self._cond.notify_all()
+        for command in pending:
+            command.complete(ACK_TIMEOUT)
+
+    def _run(self):
+        """链路线程：读取并分发帧，按截止时间重传未确认的命令"""
+        try:
+            while not self._closed:
+                with self._cond:
+                    deadlines = [command.deadline for command in self._pending.values()]
+                timeout = self.ack_timeout if not deadlines else max(0.0, min(deadlines) - time.monotonic())
+                data = self.transport.read(4096, min(timeout, 0.05))
+                if data:
+                    for frame in self._decoder.feed(data):
+                        if frame.kind == FRAME_ACK:
+                            self._on_ack(frame)
+                        elif frame.kind == FRAME_TELEMETRY:
+                            self._on_telemetry(frame)
+                self._retransmit()
+        except TransportClosed:
+            pass
+        self._fail_pending()
+
+    def _on_ack(self, frame):
+        with self._cond:
+            command = self._pending.pop(frame.seq, None)
+            self._cond.notify()
+        if command is None:
+            self.stats["late_acks"] += 1  # 重传后两个确认都到了
+            return
+        op, status = ACK_HEAD.unpack_from(frame.payload)
+        _, snapshot = unpack_record(frame.payload, ACK_HEAD.size)
+        self.snapshot = snapshot
+        command.complete(status, snapshot)
+
+    def _on_telemetry(self, frame):
+        if self._telemetry_seq is not None:
+            self.stats["telemetry_lost"] += (frame.seq - self._telemetry_seq - 1) & 0xFFFF
+        self._telemetry_seq = frame.seq
+        count = frame.payload[0]
+        self.stats["telemetry_frames"] += 1
+        self.stats["telemetry_records"] += count
+        for i in range(count):
+            t_ms, snapshot = unpack_record(frame.payload, 1 + i * RECORD.size)
+            self.snapshot = snapshot
+            for listener in self._listeners:
+                listener(t_ms, snapshot)
+
+    def _retransmit(self):
+        now = time.monotonic()
+        resend, expired = [], []
+        with self._cond:
+            for seq, command in list(self._pending.items()):
+                if command.deadline > now:
+                    continue
+                if command.attempts > self.retries:
+                    del self._pending[seq]
+                    expired.append(command)
+                else:
+                    command.attempts += 1
+                    command.deadline = now + self.ack_timeout
+                    resend.append(command)
+            if expired:
+                self._cond.notify_all()
+        for command in resend:
+            self.stats["retransmits"] += 1
+            self._write(command.frame)
+        for command in expired:
+            self.stats["timeouts"] += 1
+            command.complete(ACK_TIMEOUT)
+
+
+class _Device:
+    """设备端：用自己的 PumpManager 驱动一台 PumpEngine，按顺序执行命令载荷"""
+
+    SETTLE_TIMEOUT = 5.0  # 暂停/停止后等待本次运行结束的上限 (s)
+
+    def __init__(self, engine=None):
+        self.manager = PumpManager()
+        self.engine = self.manager.add_pump(engine or PumpEngine())
+        self.engine.add_listener(self._on_event)
+        self._origin = time.monotonic()
+        self._run_ended = threading.Event()
+        self.manager.start()
+
+    def _now_ms(self):
+        return int((time.monotonic() - self._origin) * 1000)
+
+    def _on_event(self, name, *args):
+        if name in ("infusion_paused", "infusion_stopped", "infusion_finished"):
+            self._run_ended.set()
+        if name in ("progress_updated", "state_changed"):
+            self._on_progress(self._now_ms(), self.engine.snapshot())
+
+    def _on_progress(self, t_ms, snapshot):
+        pass
+
+    def _run_command(self, payload):
+        """执行一条命令；暂停/停止要等注射线程真正结束本次运行，之后的命令 (如恢复、重新开始) 才不会被拒绝"""
+        self._run_ended.clear()
+        op, status = execute(self.engine, payload)
+        if status == ACK_OK and op in (OP_PAUSE, OP_STOP) and self.engine.is_running:
+            self._run_ended.wait(self.SETTLE_TIMEOUT)
+        return op, status
+
+
+class DeviceEmulator(_Device):
+    """链路另一端的模拟设备：解码命令帧交给 PumpEngine 执行并确认，按周期批量发送遥测"""
+
+    ACK_CACHE = 1024  # 记住最近多少条命令的确认 (用于应答重传)
+
+    def __init__(self, transport, engine=None, telemetry_period=0.05):
+        """engine: 尚未接入控制器的 PumpEngine (默认新建)，由模拟器自己的 PumpManager 驱动
+        telemetry_period: 遥测帧的发送周期 (s)，期间的全部进度合并为一帧"""
+        self.transport = transport
+        self.telemetry_period = telemetry_period
+        self._decoder = FrameDecoder()
+        self._acks = OrderedDict()  # 序号 -> (命令载荷, 确认帧)
+        self._next_seq = None  # 下一条要执行的命令序号
+        self._early = {}  # 序号 -> 先于前面的命令到达的命令帧
+        self._session = None  # 当前会话的 RESET 载荷
+        self._batch = []
+        self._batch_lock = threading.Lock()
+        self._telemetry_seq = 0
+        self._closed = False
+        self.executed = 0  # 执行的命令数 (包括 RESET)
+        self.resets = 0  # 开始的会话数
+        self.duplicates = 0  # 收到重传、直接重发确认的命令数
+        self.reordered = 0  # 等待前面的命令重传补齐后才执行的命令数
+        self.telemetry_frames = 0
+        super().__init__(engine)
+        self._thread = threading.Thread(target=self._run, name="DeviceEmulator", daemon=True)
+        self._thread.start()
+
+    def _on_progress(self, t_ms, snapshot):
+        record = pack_record(snapshot, t_ms)
+        with self._batch_lock:
+            self._batch.append(record)
+
+    def close(self):
+        self._closed = True
+        self._thread.join(2.0)
+        self.manager.shutdown(2.0)
+        self.transport.close()
+
+    @property
+    def crc_errors(self):
+        return self._decoder.crc_errors
+
+    def _run(self):
+        next_flush = time.monotonic() + self.telemetry_period
+        try:
+            while not self._closed:
+                data = self.transport.read(4096, max(0.0, min(next_flush - time.monotonic(), 0.05)))
+                if data:
+                    for frame in self._decoder.feed(data):
+                        if frame.kind == FRAME_COMMAND:
+                            self._on_command(frame)
+                now = time.monotonic()
+                if now >= next_flush:
+                    self._flush_telemetry()
+                    next_flush = now + self.telemetry_period
+        except TransportClosed:
+            pass
+
+    def _on_command(self, frame):
+        if frame.payload[:1] == bytes([OP_RESET]) and frame.payload != self._session:
+            # 新会话 (主机重新连接)：序号从头开始，旧会话的确认不能再拿来应答
+            self._session = frame.payload
+            self.resets += 1
+            self._acks.clear()
+            self._early.clear()
+            self._next_seq = frame.seq
+        cached = self._acks.get(frame.seq)
+        if cached is not None and cached[0] == frame.payload:
+            self.duplicates += 1  # 确认丢失后主机重传：不再执行，重发原确认
+            self.transport.write(cached[1])
+            return
+        if self._next_seq is None:
+            self._next_seq = frame.seq  # 主机没有发送 RESET：从收到的第一条开始
+        ahead = (frame.seq - self._next_seq) & 0xFFFF
+        if ahead == 0:
+            self._execute(frame)
+            while self._next_seq in self._early:
+                self.reordered += 1
+                self._execute(self._early.pop(self._next_seq))
+        elif ahead < self.ACK_CACHE:
+            self._early[frame.seq] = frame  # 前面还有命令没到，等它重传
+        # 否则是确认缓存之外的旧命令，忽略
+
+    def _execute(self, frame):
+        op, status = self._run_command(frame.payload)
+        self.executed += 1
+        self._next_seq = (frame.seq + 1) & 0xFFFF
+        ack = encode_frame(FRAME_ACK, frame.seq,
+                           ACK_HEAD.pack(op & 0xFF, status) + pack_record(self.engine.snapshot(), self._now_ms()))
+        self._acks[frame.seq] = (frame.payload, ack)
+        if len(self._acks) > self.ACK_CACHE:
+            self._acks.popitem(last=False)
+        self.transport.write(ack)
+
+    def _flush_telemetry(self):
+        with self._batch_lock:
+            batch, self._batch = self._batch, []
+        for start in range(0, len(batch), MAX_RECORDS):
+            records = batch[start:start + MAX_RECORDS]
+            payload = bytes([len(records)]) + b"".join(records)
+            self.transport.write(encode_frame(FRAME_TELEMETRY, self._telemetry_seq, payload))
+            self._telemetry_seq = (self._telemetry_seq + 1) & 0xFFFF
+            self.telemetry_frames += 1
+
+
+class LocalDevice(_Device, _Commands):
+    """进程内后端：直接调用 PumpEngine，接口与 PumpLink 相同 (作为链路开销的对照)"""
+
+    def __init__(self, engine=None):
+        self._listeners = []
+        self._seq = 0
+        super().__init__(engine)
+
+    @property
+    def snapshot(self):
+        return self.engine.snapshot()
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def _on_progress(self, t_ms, snapshot):
+        for listener in self._listeners:
+            listener(t_ms, snapshot)
+
+    def send(self, op, volume=None, speed=None):
+        payload = encode_command(op, volume, speed)
+        command = LinkCommand(op, self._seq, payload)
+        self._seq = (self._seq + 1) & 0xFFFF
+        _, status = self._run_command(payload)
+        command.complete(status, self.engine.snapshot())
+        return command
+
+    def close(self):
+        self.manager.shutdown(2.0)
@@ -0,0 +1,116 @@
+"""多泵控制器：一个调度线程驱动任意多台泵
+
+每台泵不再各占一个线程，而是把 "下一步的截止时间" 放进一个最小堆；
+调度线程在共享的命令通道上等待到堆顶的截止时间，
+到时推进对应的泵，收到命令则立即分发给发出命令的泵。
+每一步的开销是 O(log n)，与泵的数量基本无关。
+
+被管理的泵需要提供：
+    begin_run()       开始/恢复一次运行并排期第一步
+    advance()         推进一步，返回 False 表示本次运行已结束
+    next_step_at      下一步的截止时间
+    _apply_command()  在调度线程中执行一条命令 (暂停/停止/调速) 并确认
+"""
+import heapq
+import itertools
+import math
+import threading
+
+from srtp.clock import MonotonicClock
+from srtp.commands import CMD_RESUME, CMD_START, CommandChannel
+
+CMD_SHUTDOWN = "shutdown"  # 仅供 PumpManager 内部使用
+
+
+class PumpManager:
+    """用一个基于最小堆的调度线程驱动多台泵"""
+
+    def __init__(self, clock=None):
+        self.clock = clock or MonotonicClock()
+        self.channel = CommandChannel()  # 所有被管理的泵共用的命令通道
+        self.pumps = []
+        self._heap = []  # (截止时间, 序号, 泵)
+        self._counter = itertools.count()
+        self._generation = {}  # 泵 -> 当前有效排期条目的序号 (重新排期后旧条目作废)
+        self._thread = None
+        self.steps = 0  # 已推进的总步数
+        self.commands = 0  # 已处理的命令数
+
+    def add_pump(self, pump):
+        """接管一台泵：之后它的命令都发往本控制器"""
+        pump.attach(self)
+        self.pumps.append(pump)
+        return pump
+
+    def start(self):
+        """启动调度线程"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run, name="PumpManager", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout=None):
+        """结束调度线程 (不会停止正在进行的注射的记录，只是不再推进)"""
+        if self._thread is None:
+            return
+        self.channel.post(CMD_SHUTDOWN)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def active_count(self):
+        """正在排期中的泵数量"""
+        return len(self._generation)
+
+    def _schedule(self, pump):
+        seq = next(self._counter)
+        self._generation[pump] = seq
+        heapq.heappush(self._heap, (pump.next_step_at, seq, pump))
+
+    def _unschedule(self, pump):
+        self._generation.pop(pump, None)
+
+    def _handle(self, command):
+        """分发一条命令；返回 False 表示收到结束指令"""
+        if command.kind == CMD_SHUTDOWN:
+            command.acknowledge()
+            return False
+        pump = command.source
+        self.commands += 1
+        if command.kind in (CMD_START, CMD_RESUME):
+            pump.begin_run()
+            command.acknowledge()
+            self._schedule(pump)
+            return True
+        if pump not in self._generation:
+            command.acknowledge()  # 本次运行已经结束 (例如暂停后又收到停止)，命令不再生效
+            return True
+        pump._apply_command(command)
+        if pump.should_stop or pump.should_pause:
+            # 暂停/停止立即生效，不等到下一步
+            pump.advance()
+            self._unschedule(pump)
+        elif pump in self._generation:
+            self._schedule(pump)  # 调速后按新的截止时间重新排期
+        return True
+
+    def run(self):
+        """调度循环 (在调度线程中运行；无界面仿真时也可在当前线程直接调用)"""
+        heap = self._heap
+        while True:
+            deadline = heap[0][0] if heap else math.inf
+            for command in self.clock.wait(self.channel, deadline):
+                if not self._handle(command):
+                    return
+            if not heap and deadline == math.inf and self.clock.virtual and self.clock.factor is None:
+                return  # 尽可能快的虚拟时钟下没有待办事项：仿真结束
+
+            now = self.clock.now()
+            while heap and heap[0][0] <= now:
+                _, seq, pump = heapq.heappop(heap)
+                if self._generation.get(pump) != seq:
+                    continue  # 已被重新排期或已结束
+                self.steps += 1
+                if pump.advance():
+                    self._schedule(pump)
+                else:
+                    self._unschedule(pump)
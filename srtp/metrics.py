@@ -0,0 +1,262 @@
+"""注射循环的性能指标：固定分桶直方图、计数器和可随时开关的采样分析器 (不依赖 PyQt6)
+
+PumpEngine.metrics 为 None (默认) 时热路径上只多一次属性检查；设置为 Metrics 后记录：
+    wakeup_lateness_seconds  每一步实际醒来时间比截止时间晚多少
+    step_seconds             一步的耗时 (记账、日志检查点、送达进度)
+    emit_seconds             送达一次进度的耗时 (Qt 信号发射或其他监听者)
+    slot_seconds             界面线程处理一次进度 (update_progress) 的耗时
+    steps_total / events_total / updates_dropped_total / commands_total
+多台泵可以共用一个 Metrics。快照可导出为 JSON 或 Prometheus 文本格式，
+write() 先写临时文件再替换，供 node_exporter 的 textfile collector 等直接读取。
+PhaseTimer 记录启动各阶段 (导入、构建、首次绘制……) 的时间点。
+
+计数不加锁：多个线程同时记录同一个指标时可能极少量丢失，对统计没有影响。
+"""
+import bisect
+import json
+import math
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+# 直方图分桶上限 (s)，覆盖 1 us ~ 1 s，最后一个桶为 +Inf
+LATENCY_BUCKETS = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0,
+)
+
+HISTOGRAMS = {
+    "wakeup_lateness_seconds": "注射步实际醒来时间晚于截止时间的量",
+    "step_seconds": "推进一步的耗时",
+    "emit_seconds": "送达一次进度的耗时",
+    "slot_seconds": "界面线程处理一次进度的耗时",
+}
+COUNTERS = {
+    "steps_total": "推进的注射步数",
+    "events_total": "发出的引擎事件数",
+    "updates_dropped_total": "被合并而未送达的进度快照数",
+    "commands_total": "执行的暂停/停止/调速命令数",
+}
+
+
+class Histogram:
+    """固定分桶直方图：observe 是一次二分查找加几次加法"""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "max")
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)  # 最后一个为 +Inf 桶
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q):
+        """按分桶估计分位数 (返回所在桶的上限，+Inf 桶返回最大值)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        cumulative, seen = [], 0
+        for bound, count in zip(self.bounds + (math.inf,), self.counts):
+            seen += count
+            cumulative.append(["+Inf" if bound == math.inf else bound, seen])
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,  # [上限, 累计次数]
+        }
+
+
+class SamplingProfiler:
+    """采样分析器：后台线程每隔 interval 秒记录一次各线程的调用栈 (sys._current_frames)
+
+    只在开启期间占用一个线程，被采样的线程没有任何额外开销。结果为折叠调用栈计数，
+    collapsed() 的输出可以直接交给 flamegraph.pl / speedscope 生成火焰图。"""
+
+    def __init__(self, interval=0.005, thread_ids=None, max_depth=64):
+        self.interval = interval
+        self.thread_ids = thread_ids  # 只采样这些线程 (None 表示除自己以外的全部线程)
+        self.max_depth = max_depth
+        self.stacks = Counter()  # "外层;...;内层" -> 样本数
+        self.samples = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def top(self, n=10):
+        """样本最多的 n 个函数 (按栈顶，即函数自身耗时)"""
+        leaves = Counter()
+        for stack, count in list(self.stacks.items()):  # 采样线程可能同时在写入
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return leaves.most_common(n)
+
+    def collapsed(self):
+        """折叠调用栈文本，每行 "栈 样本数" """
+        # 先取快照：采样线程可能同时在写入
+        stacks = sorted(list(self.stacks.items()), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+
+class PhaseTimer:
+    """启动阶段计时：mark(阶段) 记录从 origin (perf_counter) 起到该阶段结束的时间，每个阶段只记录第一次"""
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases = {}  # 阶段 -> 距 origin 的秒数 (按记录顺序)
+
+    def mark(self, phase):
+        if phase not in self.phases:
+            self.phases[phase] = time.perf_counter() - self.origin
+        return self.phases[phase]
+
+    def durations(self):
+        """各阶段自身的耗时 (s)：与上一阶段结束时间的差"""
+        durations, previous = {}, 0.0
+        for phase, at in self.phases.items():
+            durations[phase] = at - previous
+            previous = at
+        return durations
+
+    def format(self, names=None):
+        """例如 "导入 120.0 ms, 构建 35.2 ms (累计 155.2 ms)" ，names 为阶段的显示名称"""
+        names = names or {}
+        parts = [f"{names.get(phase, phase)} {seconds * 1000:.1f} ms" for phase, seconds in self.durations().items()]
+        total = max(self.phases.values(), default=0.0)
+        return f"{', '.join(parts)} (累计 {total * 1000:.1f} ms)"
+
+
+class Metrics:
+    """一组直方图和计数器，外加可选的采样分析器"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.histograms = {name: Histogram(buckets) for name in HISTOGRAMS}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.profiler = None
+        self.started_at = time.time()
+
+    def observe(self, name, value):
+        self.histograms[name].observe(value)
+
+    def inc(self, name, amount=1):
+        self.counters[name] += amount
+
+    def start_profiler(self, interval=0.005, thread_ids=None):
+        """开启采样分析 (运行中也可以调用)；已开启时只调整采样间隔"""
+        if self.profiler is None:
+            self.profiler = SamplingProfiler(interval, thread_ids)
+        self.profiler.interval = interval
+        self.profiler.start()
+        return self.profiler
+
+    def stop_profiler(self):
+        """关闭采样分析，保留已采集的样本"""
+        if self.profiler is not None:
+            self.profiler.stop()
+        return self.profiler
+
+    def snapshot(self):
+        """全部指标的快照 (可直接 JSON 序列化)"""
+        profiler = self.profiler
+        return {
+            "timestamp": time.time(),
+            "uptime_s": time.time() - self.started_at,
+            "counters": dict(self.counters),
+            "histograms": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+            "profile": None if profiler is None else {
+                "running": profiler.running,
+                "interval_s": profiler.interval,
+                "samples": profiler.samples,
+                "top": profiler.top(),
+            },
+        }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), ensure_ascii=False)
+
+    def to_prometheus(self, prefix="srtp_"):
+        """Prometheus 文本格式 (version 0.0.4)"""
+        lines = []
+        for name, text in COUNTERS.items():
+            lines += [f"# HELP {prefix}{name} {text}", f"# TYPE {prefix}{name} counter",
+                      f"{prefix}{name} {self.counters[name]}"]
+        for name, text in HISTOGRAMS.items():
+            histogram = self.histograms[name]
+            lines += [f"# HELP {prefix}{name} {text}", f"# TYPE {prefix}{name} histogram"]
+            seen = 0
+            for bound, count in zip(histogram.bounds + (math.inf,), histogram.counts):
+                seen += count
+                le = "+Inf" if bound == math.inf else repr(bound)
+                lines.append(f'{prefix}{name}_bucket{{le="{le}"}} {seen}')
+            lines += [f"{prefix}{name}_sum {histogram.sum!r}", f"{prefix}{name}_count {histogram.count}"]
+        profiler = self.profiler
+        if profiler is not None:
+            lines += [f"# HELP {prefix}profile_samples_total 采样分析器的样本数",
+                      f"# TYPE {prefix}profile_samples_total counter",
+                      f"{prefix}profile_samples_total {profiler.samples}"]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """写出快照：.json 为 JSON，其他为 Prometheus 文本 (先写临时文件再替换，读取方不会看到半个文件)"""
+        text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temp = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.chmod(temp, 0o644)  # mkstemp 建的文件只有自己可读，抓取方 (例如 node_exporter) 读不到
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
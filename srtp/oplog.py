@@ -0,0 +1,126 @@
+"""操作日志：有界内存环形缓冲 + 按帧批量送往界面 + 后台线程写入滚动文件
+
+界面线程调用 OperationLog.record() 只做内存操作 (追加到环形缓冲、放入写盘队列)，
+真正的磁盘 I/O 由 logging.handlers.QueueListener 的后台线程通过 RotatingFileHandler 完成，
+因此界面线程永远不会阻塞在磁盘上。
+"""
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import time
+from collections import deque, namedtuple
+
+# 一条结构化日志记录；current/target/remaining 为记录时的剂量 (uL)
+OperationRecord = namedtuple(
+    "OperationRecord", "timestamp level pump_id event message current target remaining")
+
+# 日志消息前缀 -> 事件类型
+_EVENT_PREFIXES = (
+    ("[开始]", "start"),
+    ("[恢复]", "resume"),
+    ("[停止]", "stop"),
+    ("[完成]", "finish"),
+    ("[用户操作]", "user"),
+    ("[遥测]", "telemetry"),
+    ("[告警]", "alert"),
+)
+
+
+def classify(message):
+    """根据消息内容推断 (级别, 事件类型)"""
+    if message.startswith("错误") or "错误：" in message:
+        level = "ERROR"
+    elif message.startswith("警告") or "警告：" in message:
+        level = "WARNING"
+    else:
+        level = "INFO"
+    for prefix, event in _EVENT_PREFIXES:
+        if message.startswith(prefix):
+            return level, event
+    return level, "message"
+
+
+def format_line(record):
+    """界面上显示的一行日志"""
+    return f"[{time.strftime('%H:%M:%S', time.localtime(record.timestamp))}] {record.message}"
+
+
+class _JsonFormatter(logging.Formatter):
+    """把 OperationRecord 格式化为一行 JSON"""
+
+    def format(self, log_record):
+        record = log_record.operation
+        fields = record._asdict()
+        fields["time"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.timestamp))
+        return json.dumps(fields, ensure_ascii=False)
+
+
+class FileSink:
+    """后台线程写入的滚动日志文件 (每行一条 JSON 记录)"""
+
+    def __init__(self, path, max_bytes=1024 * 1024, backup_count=5):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        handler.setFormatter(_JsonFormatter())
+        self.path = path
+        self._queue = queue.SimpleQueue()
+        self._handler = handler
+        self._listener = logging.handlers.QueueListener(self._queue, handler)
+        self._listener.start()
+
+    def submit(self, record):
+        """放入写盘队列，不阻塞"""
+        log_record = logging.LogRecord(
+            "srtp.oplog", getattr(logging, record.level), __file__, 0, record.message, None, None)
+        log_record.operation = record
+        self._queue.put_nowait(log_record)
+
+    def close(self):
+        """写完队列中剩余的记录并关闭文件"""
+        self._listener.stop()
+        self._handler.close()
+
+
+class OperationLog:
+    """有界的操作日志：环形缓冲保存最近 capacity 条记录，新记录按批取出供界面显示"""
+
+    def __init__(self, capacity=1000, pump_id="", sink=None):
+        self.capacity = capacity
+        self.pump_id = pump_id
+        self.sink = sink  # 可选的持久化输出 (FileSink)
+        self._records = deque(maxlen=capacity)  # 最近的记录
+        self._unrendered = deque(maxlen=capacity)  # 尚未送往界面的记录
+        self.total = 0  # 累计记录数
+
+    def record(self, message, current=None, target=None, remaining=None, level=None, event=None):
+        """追加一条记录，返回 OperationRecord"""
+        inferred_level, inferred_event = classify(message)
+        record = OperationRecord(
+            time.time(), level or inferred_level, self.pump_id, event or inferred_event,
+            message, current, target, remaining)
+        self._records.append(record)
+        self._unrendered.append(record)
+        self.total += 1
+        if self.sink is not None:
+            self.sink.submit(record)
+        return record
+
+    def take_batch(self):
+        """取出自上次调用以来的新记录 (最多 capacity 条)"""
+        batch = list(self._unrendered)
+        self._unrendered.clear()
+        return batch
+
+    def records(self):
+        """环形缓冲中的全部记录 (由旧到新)"""
+        return list(self._records)
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
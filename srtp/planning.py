@@ -0,0 +1,93 @@
+"""注射计划的向量化规划和安全校验 (需要 NumPy)
+
+开始注射前按给定分辨率一次性计算整个计划的轨迹 (已注射量、剩余药量、速率数组)，
+再在整条轨迹上检查各项安全规则：
+    reservoir     计划总量超过剩余药量
+    hourly_cap    任意一小时内的注射量 (加上开始前一小时内已注射的量) 超过每小时上限
+    daily_limit   任意 24 小时内的注射量 (加上开始前 24 小时内已注射的量) 超过每日上限
+并给出剩余药量低于低药量阈值的时刻。同一组数组也用于界面上的计划预览。
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from srtp.protocol import Basal, compile_protocol
+from srtp.volume import DAY, HOUR
+
+# 安全限值 (默认值仅用于仿真)：低药量阈值占容量的比例、每小时上限 (uL)、每日上限 (uL)
+SafetyLimits = namedtuple("SafetyLimits", "low_fraction hourly_cap daily_limit", defaults=(0.05, 360.0, 1000.0))
+
+# 规划出的轨迹：t 为相对开始的时间 (s)，其余为对应时刻的已注射量、剩余药量 (uL) 和速率 (uL/s)
+Trajectory = namedtuple("Trajectory", "t delivered remaining rate")
+
+# 违反的安全规则：rule 为规则名，at 为首次违反的时刻 (s)，value 为实际值，limit 为限值
+Violation = namedtuple("Violation", "rule at value limit")
+
+# 校验结果：low_reservoir_at 为剩余药量降到低药量阈值的时刻 (不会降到时为 None)
+PlanReport = namedtuple("PlanReport", "trajectory low_reservoir_at peak_hourly daily_total violations")
+
+
+def constant_rate(volume, speed):
+    """恒定速率注射 volume uL 的给药程序时间线"""
+    return compile_protocol([Basal(speed, volume / speed)])
+
+
+def plan(timeline, remaining, resolution=1.0):
+    """按 resolution 秒的分辨率计算给药程序的完整轨迹 (一次向量化计算，不逐点循环)"""
+    times = np.frombuffer(timeline.times, dtype=np.float64)
+    rates = np.frombuffer(timeline.rates, dtype=np.float64)
+    volumes = np.frombuffer(timeline.volumes, dtype=np.float64)
+    t = np.arange(0.0, timeline.duration, resolution)
+    t = np.append(t, timeline.duration)
+    index = np.searchsorted(times, t, side="right") - 1
+    np.clip(index, 0, len(times) - 1, out=index)
+    rate = rates[index]
+    delivered = np.minimum(volumes[index] + rate * (t - times[index]), volumes[-1])
+    return Trajectory(t, delivered, remaining - delivered, rate)
+
+
+def _window_totals(t, delivered, window):
+    """以每个采样点结尾的 window 秒内的注射量"""
+    before = np.interp(t - window, t, delivered, left=0.0)
+    return delivered - before
+
+
+def _crossing_time(t, values, level):
+    """values 首次降到 level 及以下的时刻 (相邻采样点之间线性插值)，不会降到时为 None"""
+    below = values <= level
+    if not below.any():
+        return None
+    i = int(np.argmax(below))
+    if i == 0:
+        return float(t[0])
+    v0, v1 = values[i - 1], values[i]
+    return float(t[i - 1] + (v0 - level) / (v0 - v1) * (t[i] - t[i - 1]))
+
+
+def validate(timeline, remaining, capacity, limits=SafetyLimits(), delivered_today=0.0, resolution=1.0,
+             delivered_last_hour=0.0):
+    """规划并校验一个给药程序，返回 PlanReport
+    remaining: 当前剩余药量 (uL)；capacity: 设备容量 (uL)
+    delivered_today / delivered_last_hour: 开始前 24 小时 / 1 小时内已注射的量 (uL)，计入计划开头的窗口"""
+    trajectory = plan(timeline, remaining, resolution)
+    t, delivered = trajectory.t, trajectory.delivered
+    violations = []
+
+    if delivered[-1] > remaining:
+        at = _crossing_time(t, trajectory.remaining, 0.0)
+        violations.append(Violation("reservoir", at, float(delivered[-1]), float(remaining)))
+
+    hourly = _window_totals(t, delivered, HOUR) + delivered_last_hour
+    peak_hourly = float(hourly.max())
+    if peak_hourly > limits.hourly_cap:
+        at = float(t[np.argmax(hourly > limits.hourly_cap)])
+        violations.append(Violation("hourly_cap", at, peak_hourly, limits.hourly_cap))
+
+    daily = _window_totals(t, delivered, DAY) + delivered_today
+    daily_total = float(daily.max())
+    if daily_total > limits.daily_limit:
+        at = float(t[np.argmax(daily > limits.daily_limit)])
+        violations.append(Violation("daily_limit", at, daily_total, limits.daily_limit))
+
+    low_reservoir_at = _crossing_time(t, trajectory.remaining, limits.low_fraction * capacity)
+    return PlanReport(trajectory, low_reservoir_at, peak_hourly, daily_total, violations)
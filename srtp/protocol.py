@@ -0,0 +1,118 @@
+"""给药程序：把多段给药方案预先编译成时间线
+
+程序由依次执行的段组成：
+    Basal(rate, duration)                    基础速率持续 duration 秒
+    Bolus(volume, duration)                  在 duration 秒内推注 volume uL
+    Ramp(start_rate, end_rate, duration)     速率线性变化 (编译为 steps 级阶梯)
+    Lockout(duration)                        锁定间隔，不给药
+compile_protocol 把它们编译成紧凑的断点数组 (时间, 速率, 累计注射量)，
+相邻断点之间速率不变，因此任意时刻的应注射量用二分查找 O(log n) 得到。
+"""
+import bisect
+from array import array
+from collections import namedtuple
+
+Basal = namedtuple("Basal", "rate duration")
+Bolus = namedtuple("Bolus", "volume duration")
+Ramp = namedtuple("Ramp", "start_rate end_rate duration steps", defaults=(10,))
+Lockout = namedtuple("Lockout", "duration")
+
+
+class Timeline:
+    """编译后的给药时间线：第 i 段从 times[i] 开始，以 rates[i] 注射，起点累计注射量为 volumes[i]。
+    最后一个断点是程序结束 (速率 0)"""
+
+    __slots__ = ("times", "rates", "volumes")
+
+    def __init__(self, times, rates, volumes):
+        self.times = times  # 断点时间 (s，相对程序开始)
+        self.rates = rates  # 断点之后的速率 (uL/s)
+        self.volumes = volumes  # 断点处的累计注射量 (uL)
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self):
+        """程序总时长 (s)"""
+        return self.times[-1]
+
+    @property
+    def total_volume(self):
+        """程序总注射量 (uL)"""
+        return self.volumes[-1]
+
+    @property
+    def max_rate(self):
+        """程序中的最高速率 (uL/s)"""
+        return max(self.rates)
+
+    def finish_time(self):
+        """累计注射量达到总量的时刻 (末尾的锁定间隔不计)"""
+        i = bisect.bisect_left(self.volumes, self.volumes[-1])
+        return self.times[i]
+
+    def _index(self, elapsed):
+        return bisect.bisect_right(self.times, elapsed) - 1
+
+    def rate_at(self, elapsed):
+        """程序开始后 elapsed 秒时的速率"""
+        if elapsed < 0 or elapsed >= self.times[-1]:
+            return 0.0
+        return self.rates[self._index(elapsed)]
+
+    def volume_at(self, elapsed):
+        """程序开始后 elapsed 秒时应当已注射的剂量 (O(log n))"""
+        if elapsed <= 0:
+            return 0.0
+        if elapsed >= self.times[-1]:
+            return self.volumes[-1]
+        i = self._index(elapsed)
+        return self.volumes[i] + self.rates[i] * (elapsed - self.times[i])
+
+
+def _segment_rates(segment):
+    """把一段展开为 [(速率, 时长)]"""
+    if isinstance(segment, Basal):
+        return [(segment.rate, segment.duration)]
+    if isinstance(segment, Bolus):
+        if segment.duration <= 0:
+            raise ValueError("推注时长必须大于0")
+        return [(segment.volume / segment.duration, segment.duration)]
+    if isinstance(segment, Ramp):
+        if segment.steps < 1:
+            raise ValueError("速率渐变的阶梯数至少为1")
+        step = segment.duration / segment.steps
+        delta = (segment.end_rate - segment.start_rate) / segment.steps
+        # 每级取该级时间中点的速率，总注射量与线性渐变相同
+        return [(segment.start_rate + delta * (k + 0.5), step) for k in range(segment.steps)]
+    if isinstance(segment, Lockout):
+        return [(0.0, segment.duration)]
+    raise TypeError(f"未知的程序段: {segment!r}")
+
+
+def compile_protocol(segments):
+    """把程序段编译为 Timeline；相邻的同速率段会合并"""
+    times = array("d", [0.0])
+    rates = array("d")
+    volumes = array("d", [0.0])
+    for segment in segments:
+        for rate, duration in _segment_rates(segment):
+            if rate < 0:
+                raise ValueError(f"速率不能为负: {segment!r}")
+            if duration < 0:
+                raise ValueError(f"时长不能为负: {segment!r}")
+            if duration == 0:
+                continue
+            if rates and rates[-1] == rate:
+                # 与上一段速率相同：延长上一段
+                times[-1] += duration
+                volumes[-1] += rate * duration
+                continue
+            rates.append(rate)
+            times.append(times[-1] + duration)
+            volumes.append(volumes[-1] + rate * duration)
+    if not rates:
+        raise ValueError("给药程序为空")
+    rates.append(0.0)  # 程序结束之后不再注射
+    return Timeline(times, rates, volumes)
@@ -0,0 +1,526 @@
+"""本机控制接口：JSON-RPC 2.0 (Unix 套接字或 localhost TCP，每行一个 JSON 对象)
+
+    {"jsonrpc": "2.0", "id": 1, "method": "start", "params": {"pump": "PD-1", "volume": 50, "speed": 0.05}}
+
+方法 (params 中的 pump 为泵编号)：
+    pumps                                  泵编号列表
+    status     {pump}                      当前状态快照
+    check      {pump, volume, speed}       只检查参数，不开始注射
+    start      {pump, volume, speed, confirm}
+    pause / resume / stop  {pump}
+    set_speed  {pump, speed}
+    enqueue    {pump, volume, speed} 或 {pump, refill}  排队之后的注射或计划补药 (refill 为装到的药量，true 为装满)
+    forecast   {pump, fraction?, volume?}  按队列预测：降到容量 fraction (默认低药量阈值) 和耗尽还有多少秒，
+                                           给出 volume 时同时回答排在队尾的这次注射能否装下
+    subscribe  {pumps?, events?}           之后以通知 (没有 id 的请求) 推送泵事件：
+               {"method": "pump.event", "params": {"pump", "event", "args", "snapshot"}}
+    unsubscribe
+    metrics    {enable?, format?}              注射循环的性能指标快照 (format 为 "json" 或 "prometheus")；
+                                           enable=true/false 在运行中为全部泵开启/关闭记录
+    profile    {enable, interval?, collapsed?}  开启/关闭采样分析，collapsed=true 时附带折叠调用栈
+
+开始注射使用与界面相同的检查规则 (srtp.validation)，但不弹出任何对话框：
+参数无效或计划超过每小时/每日剂量上限 (计入这台泵之前已注射的量) 直接返回错误；
+需要确认的警告 (注射量过大、速度过快、剩余药量不足以完成计划) 在请求中没有
+confirm=true (或列出全部警告代码的 confirm 列表) 时返回 CONFIRMATION_REQUIRED 错误和警告内容。
+控制命令在注射线程确认后才返回结果；注射完成/停止等结果以通知的形式异步送达。
+
+流水线：同一连接上可以连续发送多个请求而不等待响应，响应按完成顺序返回 (用 id 对应)。
+同一台泵的控制命令严格按请求到达的顺序执行：pause/stop 在注射线程真正暂停/结束本次运行后才返回，
+之后的命令才会开始执行，因此流水线发送的 stop、start 不会因为上一次运行尚未结束而被拒绝。
+幂等：改变设备状态的方法可以在 params 中带 idempotency_key，相同 key 的重试 (包括在新连接上)
+得到第一次的结果而不会重复执行；相同 key 但参数不同时返回 IDEMPOTENCY_CONFLICT。
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from srtp.engine import ENGINE_EVENTS
+from srtp.metrics import Metrics
+from srtp.planning import SafetyLimits
+from srtp.state import PumpState
+from srtp.streaming import encode_snapshot
+from srtp.validation import SPEED_MAX, SPEED_MIN, check_infusion
+
+# JSON-RPC 错误码
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+VALIDATION_FAILED = -32001  # 参数无效
+CONFIRMATION_REQUIRED = -32002  # 有需要确认的警告
+IDEMPOTENCY_CONFLICT = -32003  # 同一幂等 key 对应了不同的请求
+DEVICE_REFUSED = -32004  # 泵拒绝了命令 (状态不允许、药量不足等)
+DEVICE_TIMEOUT = -32005  # 注射线程没有及时确认命令
+
+ACK_TIMEOUT = 5.0  # 等待注射线程确认命令的上限 (s)
+MAX_INFLIGHT = 256  # 每个连接同时处理的请求数上限 (超过后暂停读取)
+MAX_BUFFERED = 1 << 20  # 每个连接的发送缓冲上限 (字节)，跟不上通知的客户端会被断开
+IDEMPOTENCY_CAPACITY = 4096  # 记住的幂等 key 数
+NOTIFY_EVENTS = frozenset(ENGINE_EVENTS) - {"progress_updated", "log_message", "rate_measured"}  # 默认订阅的事件
+
+MUTATING = frozenset({"start", "pause", "resume", "stop", "set_speed", "enqueue"})
+RUN_ENDED = ("infusion_paused", "infusion_stopped", "infusion_finished")  # 一次运行暂停/结束的事件
+
+
+class RpcError(Exception):
+    """返回给客户端的 JSON-RPC 错误"""
+
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_dict(self):
+        error = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+def _jsonable(value):
+    return value.value if isinstance(value, PumpState) else value
+
+
+def _findings(findings):
+    return [{"code": f.code, "title": f.title, "text": f.text} for f in findings]
+
+
+class _Connection:
+    """一个客户端连接：发送响应和通知，记录订阅"""
+
+    __slots__ = ("writer", "inflight", "pumps", "events", "outbox")
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.inflight = asyncio.Semaphore(MAX_INFLIGHT)
+        self.pumps = None  # 订阅的泵 (None 表示全部)
+        self.events = None  # 订阅的事件 (None 表示未订阅)
+        self.outbox = []  # 本轮事件循环中待发送的消息
+
+    def wants(self, pump_id, event):
+        return self.events is not None and event in self.events and (self.pumps is None or pump_id in self.pumps)
+
+    def send(self, message):
+        """排队一条消息；同一轮事件循环中的消息合并为一次写入 (流水线请求的响应不再逐条系统调用)"""
+        if not self.outbox:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self.outbox.append(json.dumps(message, ensure_ascii=False, separators=(",", ":")))
+
+    def flush(self):
+        data, self.outbox = "\n".join(self.outbox) + "\n", []
+        transport = self.writer.transport
+        if transport.is_closing():
+            return
+        if transport.get_write_buffer_size() > MAX_BUFFERED:
+            transport.abort()  # 客户端不读取，断开它而不是无限缓存
+            return
+        self.writer.write(data.encode())
+
+
+class RpcServer:
+    """通过 JSON-RPC 控制若干台泵
+
+    pumps 为 {泵编号: 泵}，泵需要在后台运行注射过程 (DrugPumpSimulator、接入 PumpManager
+    或 AsyncPump 的 PumpEngine)；所有设备调用都在服务的事件循环线程中发出。"""
+
+    def __init__(self, pumps, host="127.0.0.1", port=8766, path=None, limits=SafetyLimits(), metrics=None):
+        """host/port: TCP 监听地址 (port=0 表示任选空闲端口)；path: 给出时改为监听该 Unix 套接字
+        limits: 开始注射前检查计划用的安全限值；metrics: 已经开启的 Metrics (也可以之后用 metrics 方法开启)"""
+        self.pumps = dict(pumps)
+        self.host = host
+        self.port = port
+        self.path = path
+        self.limits = limits
+        self.metrics = metrics
+        self._connections = set()
+        self._wanted = frozenset()  # 至少有一个连接订阅了的事件
+        self._tasks = set()
+        self._idempotent = OrderedDict()  # key -> (方法和参数, Future)
+        self._rejections = {}  # 泵编号 -> 本线程中刚收到的 infusion_rejected 参数
+        self._locks = {pump_id: asyncio.Lock() for pump_id in self.pumps}  # 按顺序执行同一台泵的控制命令
+        self._waiters = defaultdict(list)  # 泵编号 -> 等待运行暂停/结束的 Future
+        self._loop = None
+        self._loop_thread = None
+        self._server = None
+        self._thread = None
+        self.requests = 0  # 已处理的请求数
+        self.replayed = 0  # 由幂等 key 直接返回的请求数
+        for pump_id, pump in self.pumps.items():
+            pump.add_listener(self._listener(pump_id, pump))
+
+    # ------------------------------------------------------------------
+    # 泵事件 (任意线程)
+    # ------------------------------------------------------------------
+    def _listener(self, pump_id, pump):
+        def listener(name, *args):
+            if name == "infusion_rejected" and threading.get_ident() == self._loop_thread:
+                self._rejections[pump_id] = args  # 由本服务发出的 start 同步触发
+            loop = self._loop
+            if loop is None:
+                return
+            if name in RUN_ENDED:
+                loop.call_soon_threadsafe(self._run_ended, pump_id)
+            if name in self._wanted:
+                loop.call_soon_threadsafe(self._notify, pump_id, name, args, pump.snapshot())
+        return listener
+
+    def _run_ended(self, pump_id):
+        for future in self._waiters.pop(pump_id, ()):
+            if not future.done():
+                future.set_result(None)
+
+    def _refresh_wanted(self):
+        self._wanted = frozenset().union(*(c.events for c in self._connections if c.events is not None))
+
+    def _notify(self, pump_id, name, args, snapshot):
+        message = None
+        for connection in self._connections:
+            if connection.wants(pump_id, name):
+                if message is None:
+                    message = {"jsonrpc": "2.0", "method": "pump.event", "params": {
+                        "pump": pump_id, "event": name, "args": [_jsonable(arg) for arg in args],
+                        "snapshot": encode_snapshot(snapshot)}}
+                connection.send(message)
+
+    # ------------------------------------------------------------------
+    # 服务端 (事件循环)
+    # ------------------------------------------------------------------
+    async def serve(self):
+        """在当前事件循环中开始监听"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        if self.path is not None:
+            if os.path.exists(self.path):
+                os.unlink(self.path)  # 上一次运行遗留的套接字文件
+            self._server = await asyncio.start_unix_server(self._handle, self.path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    def start(self):
+        """在后台线程中运行自己的事件循环 (供 Qt 界面等同步程序使用)"""
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.serve())
+            except OSError as error:
+                failure.append(error)
+                ready.set()
+                loop.close()
+                return
+            ready.set()
+            loop.run_forever()
+            loop.run_until_complete(self._shutdown())
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name="rpc-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+        return self.path or self.port
+
+    def stop(self, timeout=5.0):
+        """停止后台线程中的服务"""
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+    async def _shutdown(self):
+        self._server.close()
+        for task in tuple(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._server.wait_closed()
+        if self.path is not None and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _track(self, task):
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _handle(self, reader, writer):
+        self._track(asyncio.current_task())
+        connection = _Connection(writer)
+        self._connections.add(connection)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                await connection.inflight.acquire()  # 积压过多时暂停读取 (背压)
+                self._track(asyncio.create_task(self._call(connection, line)))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass  # ValueError: 单行超过读取上限
+        except asyncio.CancelledError:
+            pass  # 服务停止
+        finally:
+            self._connections.discard(connection)
+            self._refresh_wanted()
+            writer.close()
+
+    async def _call(self, connection, line):
+        """处理一个请求；设备调用发生在第一次 await 之前，因此按请求到达的顺序执行"""
+        request_id = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                raise RpcError(PARSE_ERROR, "无法解析的 JSON") from None
+            if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+                raise RpcError(INVALID_REQUEST, "请求必须是带 method 的 JSON 对象 (不支持批量请求，请直接连续发送)")
+            request_id = request.get("id")
+            params = request.get("params", {})
+            if not isinstance(params, dict):
+                raise RpcError(INVALID_PARAMS, "params 必须是对象")
+            self.requests += 1
+            result = await self._invoke(connection, request["method"], dict(params))
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except RpcError as error:
+            response = {"jsonrpc": "2.0", "id": request_id, "error": error.to_dict()}
+        except asyncio.CancelledError:
+            return
+        except Exception as error:  # 不让一个请求的异常影响连接上的其他请求
+            response = {"jsonrpc": "2.0", "id": request_id,
+                        "error": {"code": INTERNAL_ERROR, "message": f"{type(error).__name__}: {error}"}}
+        finally:
+            connection.inflight.release()
+        if request_id is not None:
+            connection.send(response)
+
+    async def _invoke(self, connection, method, params):
+        handler = getattr(self, f"_rpc_{method}", None)
+        if handler is None:
+            raise RpcError(METHOD_NOT_FOUND, f"未知的方法: {method}")
+        key = params.pop("idempotency_key", None)
+        if key is None or method not in MUTATING:
+            return await handler(connection, params)
+
+        request = (method, json.dumps(params, sort_keys=True))
+        entry = self._idempotent.get(key)
+        if entry is not None:
+            if entry[0] != request:
+                raise RpcError(IDEMPOTENCY_CONFLICT, f"幂等 key {key!r} 已用于另一个请求")
+            self._idempotent.move_to_end(key)
+            self.replayed += 1
+            return await asyncio.shield(entry[1])  # 第一次仍在执行时等待它的结果
+
+        future = self._loop.create_future()
+        self._idempotent[key] = (request, future)
+        if len(self._idempotent) > IDEMPOTENCY_CAPACITY:
+            self._idempotent.popitem(last=False)
+        try:
+            result = await handler(connection, params)
+        except RpcError as error:
+            future.set_exception(error)  # 确定的结果 (如参数无效) 同样会被记住
+            future.exception()  # 没有重试时也不要报 "exception was never retrieved"
+            raise
+        except BaseException:
+            self._idempotent.pop(key, None)  # 意外失败允许用同一 key 重试
+            future.cancel()
+            raise
+        future.set_result(result)
+        return result
+
+    # ------------------------------------------------------------------
+    # 方法
+    # ------------------------------------------------------------------
+    def _pump(self, params):
+        pump_id = params.get("pump")
+        if pump_id not in self.pumps:
+            raise RpcError(INVALID_PARAMS, f"未知的泵: {pump_id!r}")
+        return pump_id, self.pumps[pump_id]
+
+    async def _acknowledged(self, pump, command):
+        """等待注射线程确认命令，返回结果 (确认延迟和之后的状态快照)"""
+        latency = 0.0
+        if command is not None:
+            if not await asyncio.to_thread(command.wait, ACK_TIMEOUT):
+                raise RpcError(DEVICE_TIMEOUT, f"注射线程在 {ACK_TIMEOUT:g} s 内没有确认 {command.kind} 命令")
+            latency = command.latency
+        return {"latency_ms": round(latency * 1000, 3), "snapshot": encode_snapshot(pump.snapshot())}
+
+    async def _run_end(self, pump_id, pump, action):
+        """发出暂停/停止并等到本次运行真正暂停/结束 (action 返回 False 表示泵拒绝了命令)"""
+        future = self._loop.create_future()
+        self._waiters[pump_id].append(future)  # 先登记，事件可能在 action 中同步发出
+        started = time.perf_counter()
+        if action() is False:
+            self._waiters[pump_id].remove(future)
+            raise RpcError(DEVICE_REFUSED, f"当前状态无法执行该命令 ({pump.state.value})")
+        try:
+            await asyncio.wait_for(future, ACK_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise RpcError(DEVICE_TIMEOUT, f"注射线程在 {ACK_TIMEOUT:g} s 内没有结束本次运行") from None
+        return {"latency_ms": round((time.perf_counter() - started) * 1000, 3),
+                "snapshot": encode_snapshot(pump.snapshot())}
+
+    def _check(self, pump, params):
+        return check_infusion(params.get("volume"), params.get("speed"),
+                              pump.snapshot().remaining, pump.volume, self.limits,
+                              pump.delivered_today, pump.delivered_last_hour)
+
+    async def _rpc_pumps(self, connection, params):
+        return list(self.pumps)
+
+    async def _rpc_status(self, connection, params):
+        pump_id, pump = self._pump(params)
+        return encode_snapshot(pump.snapshot())
+
+    async def _rpc_check(self, connection, params):
+        pump_id, pump = self._pump(params)
+        check = self._check(pump, params)
+        return {"errors": _findings(check.errors), "warnings": _findings(check.warnings),
+                "low_reservoir_at": check.report.low_reservoir_at if check.report is not None else None}
+
+    async def _rpc_start(self, connection, params):
+        pump_id, pump = self._pump(params)
+        async with self._locks[pump_id]:
+            check = self._check(pump, params)
+            if check.errors:
+                raise RpcError(VALIDATION_FAILED, check.errors[0].text, _findings(check.errors))
+            confirm = params.get("confirm", False)
+            confirmed = {w.code for w in check.warnings} if confirm is True else set(confirm or ())
+            pending = [w for w in check.warnings if w.code not in confirmed]
+            if pending:
+                raise RpcError(CONFIRMATION_REQUIRED, "开始注射需要确认以下警告 (在 confirm 中给出)",
+                               _findings(pending))
+            self._rejections.pop(pump_id, None)
+            command = pump.start_infusion(check.volume, check.speed)
+            if not command:
+                title, text = self._rejections.pop(pump_id, ("拒绝", f"当前状态无法开始注射 ({pump.state.value})"))
+                raise RpcError(DEVICE_REFUSED, text, {"title": title})
+        return await self._acknowledged(pump, command)
+
+    async def _rpc_resume(self, connection, params):
+        pump_id, pump = self._pump(params)
+        async with self._locks[pump_id]:
+            if pump.state is not PumpState.PAUSED:
+                raise RpcError(DEVICE_REFUSED, "没有可以恢复的注射任务")
+            command = pump.start_infusion(pump.target_volume, pump.infusion_speed, is_resume=True)
+            if not command:
+                raise RpcError(DEVICE_REFUSED, "恢复注射失败")
+        return await self._acknowledged(pump, command)
+
+    async def _rpc_pause(self, connection, params):
+        pump_id, pump = self._pump(params)
+        async with self._locks[pump_id]:
+            if pump.state is not PumpState.RUNNING:
+                raise RpcError(DEVICE_REFUSED, f"当前状态无法暂停注射 ({pump.state.value})")
+            return await self._run_end(pump_id, pump, lambda: pump.pause_infusion() is not None)
+
+    async def _rpc_stop(self, connection, params):
+        pump_id, pump = self._pump(params)
+        async with self._locks[pump_id]:
+            if pump.state not in (PumpState.RUNNING, PumpState.PAUSED):
+                raise RpcError(DEVICE_REFUSED, f"当前状态无法停止注射 ({pump.state.value})")
+            # 已暂停的注射直接停止 (stop_infusion 返回 None)，同样会发出 infusion_stopped
+            return await self._run_end(pump_id, pump, pump.stop_infusion)
+
+    async def _rpc_set_speed(self, connection, params):
+        pump_id, pump = self._pump(params)
+        speed = params.get("speed")
+        if not isinstance(speed, (int, float)) or not SPEED_MIN <= speed <= SPEED_MAX:
+            raise RpcError(VALIDATION_FAILED, f"注射速度必须在 {SPEED_MIN} - {SPEED_MAX} μL/s 之间！")
+        async with self._locks[pump_id]:
+            if pump.is_running and pump.timeline is not None:
+                raise RpcError(DEVICE_REFUSED, "给药程序执行中，速率由程序决定")
+            command = pump.set_speed(speed)
+        return await self._acknowledged(pump, command)
+
+    async def _rpc_enqueue(self, connection, params):
+        pump_id, pump = self._pump(params)
+        async with self._locks[pump_id]:
+            forecast = pump.enable_forecast()
+            refill = params.get("refill")
+            if refill is not None:
+                if refill is not True and (not isinstance(refill, (int, float)) or not 0 < refill <= pump.volume):
+                    raise RpcError(VALIDATION_FAILED, f"补药量必须在 0 - {pump.volume:g} μL 之间！")
+                at = forecast.enqueue_refill(None if refill is True else refill)
+            else:
+                volume, speed = params.get("volume"), params.get("speed")
+                if not isinstance(volume, (int, float)) or volume <= 0:
+                    raise RpcError(VALIDATION_FAILED, "注射剂量必须大于0！")
+                if not isinstance(speed, (int, float)) or not SPEED_MIN <= speed <= SPEED_MAX:
+                    raise RpcError(VALIDATION_FAILED, f"注射速度必须在 {SPEED_MIN} - {SPEED_MAX} μL/s 之间！")
+                at = forecast.enqueue(volume, speed)
+            return {"queued": forecast.queued, "done_in_s": max(0.0, at - forecast.clock.now()),
+                    "remaining_after": forecast.remaining_after()}
+
+    async def _rpc_forecast(self, connection, params):
+        pump_id, pump = self._pump(params)
+        forecast = pump.enable_forecast()
+        fraction = params.get("fraction", self.limits.low_fraction)
+        if not isinstance(fraction, (int, float)) or not 0 <= fraction <= 1:
+            raise RpcError(INVALID_PARAMS, "fraction 必须在 0 - 1 之间")
+        result = {"remaining": pump.snapshot().remaining, "remaining_after": forecast.remaining_after(),
+                  "queued": forecast.queued, "fraction": fraction,
+                  "low_in_s": forecast.time_until(fraction), "empty_in_s": forecast.time_until(0.0)}
+        volume = params.get("volume")
+        if volume is not None:
+            if not isinstance(volume, (int, float)):
+                raise RpcError(INVALID_PARAMS, "volume 必须是数字")
+            result["fits"] = forecast.can_fit(volume)
+        return result
+
+    async def _rpc_subscribe(self, connection, params):
+        pumps, events = params.get("pumps"), params.get("events")
+        if pumps is not None and not set(pumps) <= set(self.pumps):
+            raise RpcError(INVALID_PARAMS, f"未知的泵: {sorted(set(pumps) - set(self.pumps))}")
+        if events is not None and not set(events) <= set(ENGINE_EVENTS):
+            raise RpcError(INVALID_PARAMS, f"未知的事件: {sorted(set(events) - set(ENGINE_EVENTS))}")
+        connection.pumps = None if pumps is None else frozenset(pumps)
+        connection.events = NOTIFY_EVENTS if events is None else frozenset(events)
+        self._refresh_wanted()
+        return {"pumps": list(connection.pumps or self.pumps), "events": sorted(connection.events)}
+
+    async def _rpc_unsubscribe(self, connection, params):
+        connection.events = None
+        self._refresh_wanted()
+        return True
+
+    def _attach_metrics(self, metrics):
+        for pump in self.pumps.values():
+            getattr(pump, "engine", pump).metrics = metrics  # DrugPumpSimulator 的指标在它的引擎上
+
+    async def _rpc_metrics(self, connection, params):
+        enable = params.get("enable")
+        if enable is True:
+            if self.metrics is None:
+                self.metrics = Metrics()
+            self._attach_metrics(self.metrics)
+        elif enable is False:
+            self._attach_metrics(None)  # 保留已记录的数据
+        if self.metrics is None:
+            raise RpcError(INVALID_PARAMS, "性能指标未开启 (enable=true 开启)")
+        if params.get("format") == "prometheus":
+            return self.metrics.to_prometheus()
+        return self.metrics.snapshot()
+
+    async def _rpc_profile(self, connection, params):
+        if self.metrics is None:
+            raise RpcError(INVALID_PARAMS, "性能指标未开启 (先调用 metrics 并设置 enable=true)")
+        if params.get("enable", True):
+            profiler = self.metrics.start_profiler(float(params.get("interval", 0.005)))
+        else:
+            profiler = self.metrics.stop_profiler()
+        if profiler is None:
+            return None
+        result = {"running": profiler.running, "samples": profiler.samples, "top": profiler.top()}
+        if params.get("collapsed"):
+            result["collapsed"] = profiler.collapsed()
+        return result
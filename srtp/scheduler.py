@@ -0,0 +1,161 @@
+"""基于单调时钟的无漂移注射排期器
+
+已注射量不再由 "每步 +0.1uL 再 sleep" 累加得到，而是由时钟直接计算：
+    已注射量 = 起点注射量 + 速度 × (当前时间 - 起点时间)
+每一步都有绝对截止时间 (起点 + k × 步长周期)，醒来晚了也不会把误差带到后面，
+因此实际注射速率不受循环开销和系统 sleep 抖动的影响。
+
+步长周期由 StepPlanner 按目标刷新周期和精度上限选择，而不是固定每步 0.1uL：
+低速时进度仍按刷新周期更新，高速和加速仿真时每秒的唤醒次数也不会随速度增加。
+
+执行给药程序 (srtp.protocol.Timeline) 时，已注射量由时间线在程序时间上查表得到：
+    已注射量 = timeline.volume_at(当前时间 - 程序零点)
+"""
+import math
+
+from srtp.clock import MonotonicClock
+
+
+class StepPlanner:
+    """按目标刷新周期和精度上限选择步长周期，使每步的工作量和每秒的唤醒次数与注射速度无关"""
+
+    def __init__(self, update_period=0.2, max_step=0.5):
+        """update_period: 两次进度更新之间的目标间隔 (真实时间, s)
+        max_step: 每步注射量的上限 (uL)，即剩余药量显示和低药量警告最多滞后的剂量"""
+        if update_period <= 0 or max_step <= 0:
+            raise ValueError("刷新周期和步长上限必须大于0")
+        self.update_period = update_period
+        self.max_step = max_step
+
+    def period(self, rate, clock):
+        """速度 rate (uL/s) 下每一步的时间间隔 (时钟时间, s)"""
+        if rate <= 0:
+            return self.update_period
+        bound = self.max_step / rate  # 精度上限：每步注射量不超过 max_step
+        factor = clock.factor if clock.virtual else 1.0
+        if factor is None:
+            return bound  # 尽可能快的仿真没有真实刷新周期，只受精度约束
+        return min(self.update_period * factor, bound)  # 加速仿真按真实时间的刷新周期换算
+
+
+class InfusionScheduler:
+    """计算任意时刻应注射的剂量以及下一步的截止时间，并统计速率误差"""
+
+    def __init__(self, clock=None, planner=None):
+        self.clock = clock or MonotonicClock()  # 单调时钟或虚拟时钟
+        self.planner = planner or StepPlanner()  # 步长周期的选择策略
+        self.target = 0.0  # 目标注射量 (uL)
+        self.rate = 0.0  # 当前注射速度 (uL/s)
+        self.period = self.planner.update_period  # 每一步的时间间隔 (s)
+        self._origin = 0.0  # 当前速度段的起点时间
+        self._base = 0.0  # 当前速度段起点的已注射量
+        self._finish = math.inf  # 当前速度段注射到目标量的时刻
+        self.timeline = None  # 正在执行的给药程序 (None 表示恒定速率)
+        self._deadline = 0.0  # 最近一次排定的截止时间
+        self._session_start = 0.0  # 本次运行的开始时间
+        self._session_volume = 0.0  # 本次运行开始时的已注射量
+        self._planned = 0.0  # 之前各速度段按设定速度应注射的量
+        self._last_tick = 0.0  # 最近一步的执行时间
+        self._delivered = 0.0  # 最近一步的已注射量
+        self.ticks = 0  # 已执行的步数
+        self.late_ticks = 0  # 晚于截止时间 1ms 以上醒来的步数
+        self.max_lateness = 0.0  # 最大唤醒延迟 (s)
+        self.total_lateness = 0.0  # 累计唤醒延迟 (s)
+
+    def begin(self, delivered, target, rate):
+        """从已注射量 delivered 开始一次新的运行 (开始或恢复注射)"""
+        now = self.clock.now()
+        self.timeline = None
+        self.target = target
+        self._session_start = now
+        self._session_volume = delivered
+        self._planned = 0.0
+        self._last_tick = now
+        self._delivered = delivered
+        self.ticks = 0
+        self.late_ticks = 0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+        self._rebase(now, delivered, rate)
+
+    def begin_protocol(self, timeline, position=0.0):
+        """从程序时间 position 开始 (或恢复) 执行给药程序"""
+        self.begin(timeline.volume_at(position), timeline.total_volume, timeline.max_rate)
+        self.timeline = timeline
+        self._origin -= position  # 程序零点对应的时钟时间
+        self._finish = self._origin + timeline.finish_time()
+
+    def position(self):
+        """最近一步对应的程序时间 (s)，暂停后从这里恢复，保证与已注射量一致"""
+        return self._last_tick - self._origin
+
+    def set_rate(self, rate):
+        """运行中修改速度：以当前时刻的注射量为新速度段的起点 (执行给药程序时速率由程序决定，忽略)"""
+        if self.timeline is not None:
+            return
+        now = self.clock.now()
+        volume = self.volume_at(now)
+        self._planned += self.rate * (now - self._origin)
+        self._rebase(now, volume, rate)
+
+    def _rebase(self, now, volume, rate):
+        self._origin = now
+        self._base = volume
+        self.rate = rate
+        self.period = self.planner.period(rate, self.clock)
+        self._finish = now + (self.target - volume) / rate if rate > 0 else math.inf
+
+    def finish_time(self):
+        """按当前速度注射到目标量的时刻"""
+        return self._finish
+
+    def volume_at(self, now):
+        """某一时刻应当已注射的剂量 (不超过目标量)"""
+        if now >= self._finish:
+            return self.target
+        if self.timeline is not None:
+            return self.timeline.volume_at(now - self._origin)
+        return self._base + self.rate * max(0.0, now - self._origin)
+
+    def next_deadline(self):
+        """下一步的绝对截止时间：跳过已错过的节拍，最后一步对齐到完成时刻"""
+        now = self.clock.now()
+        k = math.floor((now - self._origin) / self.period) + 1
+        deadline = self._origin + k * self.period
+        if deadline <= now:  # 浮点舍入可能让 k 少算一拍
+            deadline += self.period
+        self._deadline = min(deadline, self._finish)
+        return self._deadline
+
+    def tick(self):
+        """执行一步：按时钟计算当前应注射量并记录唤醒延迟"""
+        now = self.clock.now()
+        lateness = now - self._deadline
+        if lateness > 0.001:
+            self.late_ticks += 1
+        if lateness > self.max_lateness:
+            self.max_lateness = lateness
+        self.total_lateness += max(0.0, lateness)
+        self.ticks += 1
+        self._last_tick = now
+        self._delivered = self.volume_at(now)
+        return self._delivered
+
+    def metrics(self):
+        """本次运行的速率统计：目标速率、实际速率 (uL/s) 与相对误差"""
+        elapsed = self._last_tick - self._session_start
+        delivered = self._delivered - self._session_volume
+        if elapsed <= 0:
+            return {"target_rate": self.rate, "actual_rate": 0.0, "rate_error": 0.0,
+                    "ticks": self.ticks, "late_ticks": self.late_ticks,
+                    "max_lateness": self.max_lateness}
+        if self.timeline is not None:
+            planned = self.timeline.volume_at(self._last_tick - self._origin) - self._session_volume
+        else:
+            planned = self._planned + self.rate * (self._last_tick - self._origin)
+        target_rate = planned / elapsed  # 多段速度时为时间加权平均
+        actual_rate = delivered / elapsed
+        rate_error = (actual_rate - target_rate) / target_rate if target_rate > 0 else 0.0
+        return {"target_rate": target_rate, "actual_rate": actual_rate, "rate_error": rate_error,
+                "ticks": self.ticks, "late_ticks": self.late_ticks,
+                "max_lateness": self.max_lateness}
@@ -0,0 +1,42 @@
+"""给药泵状态机：状态枚举和预先计算好的合法转换表
+
+状态只在引擎中以 PumpState 表示，显示文字和颜色由界面层 (ui.py) 本地化。
+"""
+import enum
+
+
+class PumpState(enum.Enum):
+    """给药泵状态"""
+    IDLE = "idle"  # 就绪
+    RUNNING = "running"  # 注射中
+    PAUSED = "paused"  # 暂停中
+    STOPPING = "stopping"  # 正在停止 (已发出停止命令，等待注射线程确认)
+    STOPPED = "stopped"  # 已停止
+    FINISHED = "finished"  # 完成
+
+
+# 合法的状态转换：当前状态 -> 允许进入的状态集合
+TRANSITIONS = {
+    PumpState.IDLE: frozenset({PumpState.RUNNING, PumpState.PAUSED}),  # 开始；按注射日志恢复被中断的注射
+    # 储药器在注射中耗尽时由注射线程直接停止
+    PumpState.RUNNING: frozenset({PumpState.PAUSED, PumpState.STOPPING, PumpState.STOPPED, PumpState.FINISHED}),
+    # 暂停/停止命令生效前运行可能已经完成，所以 PAUSED/STOPPING 也可以进入 FINISHED
+    PumpState.PAUSED: frozenset({PumpState.RUNNING, PumpState.STOPPING, PumpState.STOPPED, PumpState.FINISHED}),
+    PumpState.STOPPING: frozenset({PumpState.STOPPED, PumpState.FINISHED}),
+    PumpState.STOPPED: frozenset({PumpState.RUNNING}),
+    PumpState.FINISHED: frozenset({PumpState.RUNNING}),
+}
+
+
+class InvalidTransition(ValueError):
+    """不合法的状态转换"""
+
+    def __init__(self, old, new):
+        super().__init__(f"不允许的状态转换: {old.name} -> {new.name}")
+        self.old = old
+        self.new = new
+
+
+def can_transition(old, new):
+    """old -> new 是否为合法转换 (查表，O(1))"""
+    return new in TRANSITIONS[old]
@@ -0,0 +1,262 @@
+"""局域网遥测推送服务 (asyncio + Server-Sent Events，只用标准库)
+
+    GET /events     SSE 流：每台泵一帧 JSON，{"pump": 编号, "seq": 序号, "key": 是否关键帧, "d": {变化的字段}}
+    GET /snapshot   全部泵的最新状态 (JSON)
+    GET /           index.html 仪表盘 (构造时给出 root 目录时)
+
+每个客户端只收到相对于它上一次收到的状态发生变化的字段 (增量帧)，第一次收到某台泵时发送完整的关键帧。
+每个客户端有一个有界队列：跟不上时把队列合并为每台泵的最新快照 (丢弃中间帧)，
+因为增量是在发送时相对该客户端已收到的状态计算的，丢帧后画面仍然正确。
+泵线程只调用 publish()，它不会等待任何客户端，因此慢客户端不会拖慢注射循环。
+"""
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+# 推送的字段 (PumpSnapshot 的字段，剂量保留到 nL)
+FIELDS = ("state", "current", "target", "remaining", "speed", "running")
+
+HEARTBEAT = 15.0  # 没有数据时发送 SSE 注释保持连接的间隔 (s)
+SEND_BUFFER = 64 * 1024  # SSE 连接的发送缓冲上限 (内核 + asyncio 各一份)
+
+
+def encode_snapshot(snapshot):
+    """PumpSnapshot -> 推送用的字段字典"""
+    return {
+        "state": snapshot.state.value,
+        "current": round(snapshot.current, 3),
+        "target": round(snapshot.target, 3),
+        "remaining": round(snapshot.remaining, 3),
+        "speed": snapshot.speed,
+        "running": snapshot.is_running,
+    }
+
+
+class _Client:
+    """一个 SSE 客户端的发送状态"""
+
+    __slots__ = ("queue", "limit", "sent", "wakeup", "frames", "dropped", "bytes")
+
+    def __init__(self, limit):
+        self.queue = deque()  # 待发送的 (泵编号, 字段)
+        self.limit = limit  # 队列上限
+        self.sent = {}  # 每台泵已发送给该客户端的字段
+        self.wakeup = asyncio.Event()
+        self.frames = 0  # 已发送的帧数
+        self.dropped = 0  # 因跟不上而丢弃的中间帧数
+        self.bytes = 0  # 已发送的字节数
+
+    def push(self, pump_id, fields):
+        if len(self.queue) >= self.limit:
+            # 跟不上：只保留每台泵的最新快照
+            latest = dict(self.queue)
+            latest[pump_id] = fields
+            self.dropped += len(self.queue) + 1 - len(latest)
+            self.queue.clear()
+            self.queue.extend(latest.items())
+        else:
+            self.queue.append((pump_id, fields))
+        self.wakeup.set()
+
+    def encode_pending(self):
+        """把队列中的快照编码为增量帧 (SSE 格式)，没有变化的快照不发送"""
+        chunks = []
+        while self.queue:
+            pump_id, fields = self.queue.popleft()
+            previous = self.sent.get(pump_id)
+            if previous is None:
+                delta = fields
+            else:
+                delta = {name: value for name, value in fields.items() if previous[name] != value}
+                if not delta:
+                    continue
+            self.sent[pump_id] = fields
+            self.frames += 1
+            frame = {"pump": pump_id, "seq": self.frames, "key": previous is None, "d": delta}
+            chunks.append(f"data: {json.dumps(frame, separators=(',', ':'))}\n\n")
+        return "".join(chunks).encode()
+
+
+class TelemetryServer:
+    """把若干台泵的状态快照推送给局域网中的浏览器"""
+
+    def __init__(self, host="127.0.0.1", port=8765, queue_size=64, root=None):
+        """host/port: 监听地址 (port=0 表示任选空闲端口，启动后见 self.port)
+        queue_size: 每个客户端的队列上限
+        root: index.html 所在目录，为 None 时不提供页面"""
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+        self.root = root
+        self._latest = {}  # 每台泵的最新字段
+        self._clients = set()
+        self._tasks = set()  # 正在处理的连接
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self.published = 0  # publish 调用次数
+
+    # ------------------------------------------------------------------
+    # 泵一侧 (任意线程)
+    # ------------------------------------------------------------------
+    def attach(self, pump_id, pump):
+        """订阅一台泵 (PumpEngine 或 DrugPumpSimulator) 的进度和状态变化"""
+        def listener(name, *args):
+            if name in ("progress_updated", "state_changed"):
+                self.publish(pump_id, pump.snapshot())
+        pump.add_listener(listener)
+        self.publish(pump_id, pump.snapshot())
+
+    def publish(self, pump_id, snapshot):
+        """发布一台泵的新快照：只把它交给事件循环，不等待任何客户端"""
+        fields = encode_snapshot(snapshot)
+        self.published += 1
+        loop = self._loop
+        if loop is None:
+            self._latest[pump_id] = fields  # 服务还没有运行：没有别的线程在读
+            return
+        try:
+            loop.call_soon_threadsafe(self._broadcast, pump_id, fields)
+        except RuntimeError:
+            pass  # 事件循环刚刚关闭 (服务已停止)
+
+    def _broadcast(self, pump_id, fields):
+        # _latest 只在事件循环中修改，新客户端的关键帧和 /snapshot 遍历它时不会与泵线程冲突
+        self._latest[pump_id] = fields
+        for client in self._clients:
+            client.push(pump_id, fields)
+
+    # ------------------------------------------------------------------
+    # 服务端 (事件循环)
+    # ------------------------------------------------------------------
+    async def serve(self):
+        """在当前事件循环中开始监听"""
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    def start(self):
+        """在后台线程中运行自己的事件循环 (供 Qt 界面等同步程序使用)，返回监听端口"""
+        ready = threading.Event()
+        failure = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.serve())
+            except OSError as error:
+                failure.append(error)
+                ready.set()
+                loop.close()
+                return
+            ready.set()
+            loop.run_forever()
+            loop.run_until_complete(self._shutdown())
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name="telemetry-server", daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+        return self.port
+
+    def stop(self, timeout=5.0):
+        """停止后台线程中的服务"""
+        if self._thread is None:
+            return
+        loop, self._loop = self._loop, None  # 之后的 publish 直接记录最新快照
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+    async def _shutdown(self):
+        self._server.close()
+        self._clients.clear()
+        for task in tuple(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def stats(self):
+        """推送统计：客户端数、已发布快照数、已发送帧数、丢弃的中间帧数 (合计，以及各客户端从多到少)"""
+        clients = tuple(self._clients)
+        return {
+            "clients": len(clients),
+            "published": self.published,
+            "frames": sum(client.frames for client in clients),
+            "dropped": sum(client.dropped for client in clients),
+            "dropped_by_client": sorted((client.dropped for client in clients), reverse=True),
+        }
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            request = await reader.readline()
+            while (await reader.readline()).strip():
+                pass  # 忽略请求头
+            parts = request.decode("latin-1").split()
+            path = parts[1].split("?")[0] if len(parts) > 1 else "/"
+            if path == "/events":
+                await self._stream(writer)
+            elif path == "/snapshot":
+                body = json.dumps(self._latest, ensure_ascii=False).encode()
+                await self._respond(writer, "200 OK", "application/json; charset=utf-8", body)
+            elif path in ("/", "/index.html") and self.root is not None:
+                with open(os.path.join(self.root, "index.html"), "rb") as page:
+                    body = page.read()
+                await self._respond(writer, "200 OK", "text/html; charset=utf-8", body)
+            else:
+                await self._respond(writer, "404 Not Found", "text/plain; charset=utf-8", b"not found")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # 服务停止
+        finally:
+            self._tasks.discard(task)
+            writer.close()
+
+    async def _respond(self, writer, status, content_type, body):
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(body)}\r\nAccess-Control-Allow-Origin: *\r\n"
+                     f"Connection: close\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def _stream(self, writer):
+        """SSE 推送循环：每次醒来把积压的快照编码成一批增量帧写出"""
+        # 限制发送缓冲：慢客户端的积压留在有界队列里按最新快照合并，而不是在缓冲区里排着旧数据
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUFFER)
+        writer.transport.set_write_buffer_limits(high=SEND_BUFFER)
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Access-Control-Allow-Origin: *\r\nConnection: keep-alive\r\n\r\n"
+                     b"retry: 2000\n\n")
+        client = _Client(self.queue_size)
+        for pump_id, fields in self._latest.items():
+            client.push(pump_id, fields)  # 新客户端先收到全部泵的关键帧
+        self._clients.add(client)
+        last_write = time.monotonic()
+        try:
+            while client in self._clients:
+                try:
+                    await asyncio.wait_for(client.wakeup.wait(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    pass
+                client.wakeup.clear()
+                data = client.encode_pending()
+                if not data and time.monotonic() - last_write >= HEARTBEAT:
+                    data = b": ping\n\n"
+                if data:
+                    writer.write(data)
+                    client.bytes += len(data)
+                    last_write = time.monotonic()
+                    await writer.drain()  # 只阻塞这个客户端自己的发送任务
+        finally:
+            self._clients.discard(client)
@@ -0,0 +1,226 @@
+"""批量场景验证：在进程池中用虚拟时钟运行大量注射场景并检查不变量 (不依赖 PyQt6)
+
+每个场景是 (目标注射量, 速度, 初始剩余药量, 暂停位置, 暂停时长)：新建一台 PumpEngine，
+补药到初始剩余药量，在尽可能快的虚拟时钟上同步运行；给出暂停位置时，在已注射量达到
+目标量的该比例后暂停，虚拟时间前进暂停时长后恢复。检查的不变量：
+    refusal        目标量超过剩余药量时拒绝开始且不改变任何状态；否则正常开始
+    warning        剩余药量首次降到容量 5% 时发出且只发出一次低药量警告 (暂停/恢复不重复发出)
+    conservation   已注射量 + 剩余药量 == 初始药量 (整数纳升)，完成时已注射量等于目标量，
+                   暂停期间剩余药量不变
+结果按列写出 (.npz 每列一个 NumPy 数组，或 .csv)。
+
+    python -m srtp.sweep --count 10000 --seed 1 --output sweep.npz    # 随机抽样
+    python -m srtp.sweep --output sweep.csv                           # 默认网格
+"""
+import argparse
+import csv
+import itertools
+import math
+import os
+import random
+import sys
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from srtp.clock import VirtualClock
+from srtp.engine import PumpEngine
+from srtp.volume import to_nl
+
+# pause_at 为暂停时已注射量占目标量的比例 (NaN 表示不暂停)，pause_for 为暂停的虚拟时长 (s)
+Scenario = namedtuple("Scenario", "id volume speed initial_remaining pause_at pause_for")
+
+# 每个场景的结果 (写出时每个字段为一列)
+Result = namedtuple("Result", (
+    "id volume speed initial_remaining pause_at pause_for "
+    "outcome refused paused delivered final_remaining warnings warning_remaining "
+    "steps sim_seconds rate_error wall_ms ok_refusal ok_warning ok_conservation failures"))
+
+INVARIANTS = ("refusal", "warning", "conservation")
+
+GRID_VOLUMES = (0.5, 5.0, 50.0, 250.0, 1000.0, 4999.0)
+GRID_SPEEDS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0)
+GRID_REMAINING = (10.0, 200.0, 260.0, 1000.0, 5000.0)  # 覆盖已低于 5% (250 uL)、刚好高于 5% 和满储药器
+GRID_PAUSES = ((math.nan, 0.0), (0.5, 600.0), (0.99, 60.0))
+
+
+def grid(volumes=GRID_VOLUMES, speeds=GRID_SPEEDS, remaining=GRID_REMAINING, pauses=GRID_PAUSES):
+    """全部组合"""
+    combos = itertools.product(volumes, speeds, remaining, pauses)
+    return [Scenario(i, v, s, r, p, d) for i, (v, s, r, (p, d)) in enumerate(combos)]
+
+
+def sample(count, seed=None, capacity=5000.0):
+    """随机抽样：注射量和速度按对数均匀分布，约一半场景带暂停，约一成场景目标量超过剩余药量"""
+    rng = random.Random(seed)
+    scenarios = []
+    for i in range(count):
+        remaining = rng.choice((capacity, rng.uniform(0.0, capacity), rng.uniform(0.0, capacity * 0.1)))
+        if rng.random() < 0.1:
+            volume = remaining * rng.uniform(1.001, 2.0) + 0.001  # 检查拒绝
+        else:
+            volume = min(math.exp(rng.uniform(math.log(0.1), math.log(capacity))), remaining)
+        volume = round(max(volume, 0.001), 3)
+        speed = round(math.exp(rng.uniform(math.log(0.001), math.log(1.0))), 4)
+        if rng.random() < 0.5:
+            pause_at, pause_for = round(rng.uniform(0.0, 1.0), 3), round(rng.uniform(0.0, 3600.0), 1)
+        else:
+            pause_at, pause_for = math.nan, 0.0
+        scenarios.append(Scenario(i, volume, speed, round(remaining, 3), pause_at, pause_for))
+    return scenarios
+
+
+def run_scenario(scenario):
+    """在当前进程中运行一个场景，返回 Result"""
+    started = time.perf_counter()
+    clock = VirtualClock()
+    engine = PumpEngine(clock, progress_rate=None)  # 每一步都发出进度，以便在准确的位置暂停
+    engine.refill(scenario.initial_remaining)
+    capacity_nl = to_nl(engine.volume)
+    initial_nl = to_nl(engine.remaining_medicine)
+    seen = {"warnings": 0, "warning_remaining": math.nan,
+            "last_remaining": initial_nl, "rejected": 0, "paused": 0, "pause_remaining": None}
+    failures = []
+
+    def listener(name, *args):
+        if name == "progress_updated":
+            if (seen["paused"] == 0 and not math.isnan(scenario.pause_at) and engine.is_running
+                    and args[0] >= scenario.pause_at * args[1]):
+                engine.pause_infusion()  # 与界面在两步之间按下暂停相同
+            seen["last_remaining"] = to_nl(args[2])
+        elif name == "remaining_low_warning":
+            seen["warnings"] += 1
+            remaining = engine.snapshot().remaining
+            seen["warning_remaining"] = remaining
+            if seen["warnings"] == 1:
+                # 必须在越过 5% 的那一步发出 (或一开始就已低于 5% 时在第一步发出)
+                crossed = to_nl(remaining) * 20 <= capacity_nl
+                previous = seen["last_remaining"]
+                if not crossed or (previous * 20 <= capacity_nl and previous != initial_nl):
+                    failures.append("warning")
+        elif name == "infusion_rejected":
+            seen["rejected"] += 1
+        elif name == "infusion_paused":
+            seen["paused"] += 1
+            seen["pause_remaining"] = to_nl(engine.remaining_medicine)
+
+    engine.add_listener(listener)
+    sim_started = clock.now()
+    command = engine.start_infusion(scenario.volume, scenario.speed)  # 同步运行到暂停或结束
+    expect_refusal = to_nl(scenario.volume) > initial_nl or initial_nl == 0
+    refused = command is False
+
+    if refused:
+        outcome = "refused"
+        if not expect_refusal or seen["rejected"] != 1 or engine.is_running \
+                or to_nl(engine.remaining_medicine) != initial_nl:
+            failures.append("refusal")
+    else:
+        if expect_refusal:
+            failures.append("refusal")
+        if seen["paused"]:
+            clock.advance(scenario.pause_for)
+            if to_nl(engine.remaining_medicine) != seen["pause_remaining"]:
+                failures.append("conservation")  # 暂停期间不应出药
+            engine.start_infusion(engine.target_volume, scenario.speed, is_resume=True)
+        outcome = engine.state.value
+
+    delivered_nl = to_nl(engine.current_volume)
+    final_nl = to_nl(engine.remaining_medicine)
+    if not refused:
+        if delivered_nl + final_nl != initial_nl:
+            failures.append("conservation")
+        elif outcome == "finished" and delivered_nl != to_nl(scenario.volume):
+            failures.append("conservation")
+        elif outcome != "finished":
+            failures.append("conservation")  # 剩余药量足够时必须完成
+    expected_warnings = int(not refused and final_nl * 20 <= capacity_nl and delivered_nl > 0)
+    if seen["warnings"] != expected_warnings and "warning" not in failures:
+        failures.append("warning")
+
+    metrics = engine.rate_metrics
+    failures = sorted(set(failures))
+    return Result(
+        scenario.id, scenario.volume, scenario.speed, scenario.initial_remaining,
+        scenario.pause_at, scenario.pause_for,
+        outcome, refused, seen["paused"] > 0, delivered_nl / 1000, final_nl / 1000,
+        seen["warnings"], seen["warning_remaining"],
+        engine.scheduler.ticks, clock.now() - sim_started if not refused else 0.0,
+        metrics.get("rate_error", 0.0) if not refused else 0.0,
+        (time.perf_counter() - started) * 1000,
+        "refusal" not in failures, "warning" not in failures, "conservation" not in failures,
+        ",".join(failures))
+
+
+def run(scenarios, workers=None, chunksize=None):
+    """在进程池中运行全部场景 (workers=1 时在当前进程中运行)，按场景顺序返回 Result 列表"""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [run_scenario(scenario) for scenario in scenarios]
+    chunksize = chunksize or max(1, len(scenarios) // (workers * 8))
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(run_scenario, scenarios, chunksize=chunksize))
+
+
+def columns(results):
+    """Result 列表 -> {列名: 列值列表}"""
+    return {field: [getattr(r, field) for r in results] for field in Result._fields}
+
+
+def write(results, path):
+    """按列写出：.npz 为每列一个 NumPy 数组 (np.load 读取)，其他后缀写 CSV"""
+    data = columns(results)
+    if path.endswith(".npz"):
+        import numpy as np
+
+        np.savez_compressed(path, **{name: np.asarray(values) for name, values in data.items()})
+        return
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(Result._fields)
+        writer.writerows(zip(*data.values()))
+
+
+def summarize(results):
+    """{不变量: 失败的场景数} 以及结果分布"""
+    return {
+        "scenarios": len(results),
+        "failures": {name: sum(not getattr(r, f"ok_{name}") for r in results) for name in INVARIANTS},
+        "outcomes": dict(sorted(Counter(r.outcome for r in results).items())),
+        "paused": sum(r.paused for r in results),
+        "warnings": sum(r.warnings for r in results),
+        "steps": sum(r.steps for r in results),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, help="随机抽样的场景数 (不给出时运行默认网格)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="进程数 (默认 CPU 核数)")
+    parser.add_argument("--output", help="结果文件 (.npz 或 .csv)")
+    args = parser.parse_args(argv)
+
+    scenarios = sample(args.count, args.seed) if args.count else grid()
+    started = time.perf_counter()
+    results = run(scenarios, args.workers)
+    elapsed = time.perf_counter() - started
+    summary = summarize(results)
+    print(f"{summary['scenarios']} scenarios in {elapsed:.1f} s "
+          f"({summary['scenarios'] / elapsed:,.0f}/s, {summary['steps']:,} steps, "
+          f"{args.workers or os.cpu_count()} workers)")
+    print(f"outcomes: {summary['outcomes']}, paused/resumed: {summary['paused']}, "
+          f"low-reservoir warnings: {summary['warnings']}")
+    print("invariant failures: " + ", ".join(f"{name} {count}" for name, count in summary["failures"].items()))
+    for r in results:
+        if r.failures:
+            print(f"  FAIL {r.failures}: {Scenario(*r[:6])}")
+            break
+    if args.output:
+        write(results, args.output)
+        print(f"wrote {args.output}")
+    return 1 if any(summary["failures"].values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
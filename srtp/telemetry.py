@@ -0,0 +1,72 @@
+"""进度遥测：合并进度快照并限制送达频率
+
+注射线程每一步都调用 publish()，但只有距离上次送达超过 1/max_rate 秒时才真正送达
+(例如发射 Qt 信号)，期间的快照只保留最新一条。终止类事件 (完成/停止/暂停/低药量警告)
+发出前先调用 flush()，保证界面看到的最后状态与事件一致，且这些事件本身从不丢弃。
+"""
+import math
+import time
+
+
+class ProgressCoalescer:
+    """按最高频率送达最新的 (已注射量, 目标量, 剩余药量) 快照，并统计合并与界面耗时"""
+
+    def __init__(self, deliver, max_rate=30.0, clock=time.monotonic):
+        self._deliver = deliver  # 送达回调 deliver(current, target, remaining)
+        self._clock = clock  # 限频使用真实时间 (界面帧率与仿真是否加速无关)
+        self.min_interval = 1.0 / max_rate if max_rate else 0.0  # 两次送达的最小间隔 (s)
+        self._pending = None  # 尚未送达的最新快照
+        self._last_delivery = -math.inf
+        # 注射线程侧计数
+        self.published = 0  # 收到的快照数
+        self.delivered = 0  # 实际送达数
+        self.merged = 0  # 被更新快照覆盖而未送达的快照数
+        # 界面线程侧计数 (由 record_slot 更新)
+        self.slot_calls = 0  # 槽函数调用次数
+        self.slot_time = 0.0  # 槽函数累计耗时 (s)
+        self.slot_max = 0.0  # 槽函数最大耗时 (s)
+        self.over_budget = 0  # 耗时超过一帧预算的次数
+
+    def publish(self, current, target, remaining):
+        """注射线程每一步调用：到达间隔则立即送达，否则与之前的快照合并"""
+        self.published += 1
+        if self._pending is not None:
+            self.merged += 1
+        self._pending = (current, target, remaining)
+        now = self._clock()
+        if now - self._last_delivery >= self.min_interval:
+            self._deliver_pending(now)
+
+    def flush(self):
+        """立即送达尚未送达的快照 (终止类事件之前调用)"""
+        if self._pending is not None:
+            self._deliver_pending(self._clock())
+
+    def _deliver_pending(self, now):
+        snapshot = self._pending
+        self._pending = None
+        self._last_delivery = now
+        self.delivered += 1
+        self._deliver(*snapshot)
+
+    def record_slot(self, seconds):
+        """界面线程在处理完一次送达后调用，记录耗时"""
+        self.slot_calls += 1
+        self.slot_time += seconds
+        if seconds > self.slot_max:
+            self.slot_max = seconds
+        if self.min_interval and seconds > self.min_interval:
+            self.over_budget += 1
+
+    def stats(self):
+        """当前计数的快照"""
+        return {
+            "published": self.published,
+            "delivered": self.delivered,
+            "merged": self.merged,
+            "slot_calls": self.slot_calls,
+            "slot_avg_ms": self.slot_time / self.slot_calls * 1000 if self.slot_calls else 0.0,
+            "slot_max_ms": self.slot_max * 1000,
+            "over_budget": self.over_budget,
+            "frame_budget_ms": self.min_interval * 1000,
+        }
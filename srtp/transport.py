@@ -0,0 +1,158 @@
+"""设备链路的字节流传输
+
+链路层 (srtp.link) 只需要一个双向字节流：
+    write(data)             写出全部字节
+    read(size, timeout)     最多读 size 字节，timeout 秒内没有数据返回 b""
+    close()
+
+这里提供三种本机端点对 (一端给主机，一端给设备模拟器)，真实硬件到货后换成串口即可：
+    memory_pair()   进程内内存管道 (不经过操作系统)
+    socket_pair()   socket.socketpair()
+    pty_pair()      伪终端 (主机端为 master，设备端为 slave，原始模式)，最接近串口
+以及用于测试重传的 LossyTransport (按概率丢弃或损坏写出的数据块)。
+"""
+import os
+import random
+import select
+import socket
+import threading
+from collections import deque
+
+
+class TransportClosed(ConnectionError):
+    """对端已关闭"""
+
+
+class MemoryTransport:
+    """进程内字节管道的一端"""
+
+    def __init__(self):
+        self._chunks = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.peer = None
+
+    def write(self, data):
+        peer = self.peer
+        with peer._cond:
+            if peer._closed:
+                raise TransportClosed("对端已关闭")
+            peer._chunks.append(bytes(data))
+            peer._cond.notify()
+
+    def read(self, size=4096, timeout=None):
+        with self._cond:
+            if not self._chunks:
+                if self._closed:
+                    raise TransportClosed("传输已关闭")
+                self._cond.wait(timeout)
+                if not self._chunks:
+                    if self._closed:
+                        raise TransportClosed("传输已关闭")
+                    return b""
+            data = bytearray()
+            while self._chunks and len(data) < size:
+                data += self._chunks.popleft()
+            if len(data) > size:
+                self._chunks.appendleft(bytes(data[size:]))
+                del data[size:]
+            return bytes(data)
+
+    def close(self):
+        for end in (self, self.peer):
+            with end._cond:
+                end._closed = True
+                end._cond.notify_all()
+
+
+class FdTransport:
+    """文件描述符 (socket、pty) 上的字节流"""
+
+    def __init__(self, fd, owner=None):
+        self.fd = fd
+        self._owner = owner  # 持有 fd 的对象 (socket)，避免被回收时关闭 fd
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            try:
+                written = os.write(self.fd, view)
+            except OSError as error:
+                raise TransportClosed(str(error)) from None
+            view = view[written:]
+
+    def read(self, size=4096, timeout=None):
+        try:
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+        except (OSError, ValueError) as error:
+            raise TransportClosed(str(error)) from None
+        if not ready:
+            return b""
+        try:
+            data = os.read(self.fd, size)
+        except OSError as error:  # pty 的对端关闭后读取会得到 EIO
+            raise TransportClosed(str(error)) from None
+        if not data:
+            raise TransportClosed("对端已关闭")
+        return data
+
+    def close(self):
+        if self.fd < 0:
+            return
+        if self._owner is not None:
+            self._owner.close()
+        else:
+            os.close(self.fd)
+        self.fd = -1
+
+
+class LossyTransport:
+    """测试用：按概率丢弃或损坏写出的数据块 (模拟线路噪声)"""
+
+    def __init__(self, inner, drop=0.0, corrupt=0.0, seed=None):
+        self.inner = inner
+        self.drop = drop
+        self.corrupt = corrupt
+        self._random = random.Random(seed)
+        self.dropped = 0
+        self.corrupted = 0
+
+    def write(self, data):
+        roll = self._random.random()
+        if roll < self.drop:
+            self.dropped += 1
+            return
+        if roll < self.drop + self.corrupt and data:
+            data = bytearray(data)
+            data[self._random.randrange(len(data))] ^= 0xFF
+            self.corrupted += 1
+        self.inner.write(data)
+
+    def read(self, size=4096, timeout=None):
+        return self.inner.read(size, timeout)
+
+    def close(self):
+        self.inner.close()
+
+
+def memory_pair():
+    """进程内内存管道：返回 (主机端, 设备端)"""
+    host, device = MemoryTransport(), MemoryTransport()
+    host.peer, device.peer = device, host
+    return host, device
+
+
+def socket_pair():
+    """socketpair：返回 (主机端, 设备端)"""
+    host, device = socket.socketpair()
+    return FdTransport(host.fileno(), host), FdTransport(device.fileno(), device)
+
+
+def pty_pair():
+    """伪终端：返回 (主机端 master, 设备端 slave)，两端都设为原始模式 (不回显、不转换换行)"""
+    import tty  # 仅 POSIX
+
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    return FdTransport(master), FdTransport(slave)
@@ -0,0 +1,97 @@
+"""开始注射前的参数检查 (界面和 RPC 接口共用，不依赖 PyQt6)
+
+检查结果分两类：
+    errors    参数无效或超过每小时/每日剂量上限 (计入之前已注射的量)，不能开始 (界面显示告警，RPC 直接拒绝)
+    warnings  需要操作者确认才能开始 (界面合并为一条待确认的告警，RPC 需要请求中带 confirm)
+计划校验需要 NumPy (srtp.planning)，在第一次调用 check_infusion 时才导入，不拖慢界面和命令行的启动。
+轨迹最多 PLAN_POINTS 个采样点：恒定速率的轨迹是直线，加大采样间隔不影响规则判断，只影响违规时刻的精度。
+"""
+from collections import namedtuple
+
+SPEED_MIN = 0.001  # 注射速度范围 (uL/s)，与界面的速度输入框一致
+SPEED_MAX = 1.0
+VOLUME_WARNING = 200.0  # 超过该注射量 (uL) 需要确认
+SPEED_WARNING = 0.1  # 超过该注射速度 (uL/s) 需要确认
+PLAN_POINTS = 20000  # 计划轨迹的最多采样点数 (采样间隔不小于 1 s)
+
+# 一条检查结果：code 为机器可读的代码，title/text 为提示框的标题和内容
+Finding = namedtuple("Finding", "code title text")
+
+# 检查结果：volume 为解析后的注射量 (无效时为 None)，report 为计划校验结果 (参数无效时为 None)
+InfusionCheck = namedtuple("InfusionCheck", "volume speed errors warnings report")
+
+# 安全规则的显示名称
+RULE_TEXT = {
+    "reservoir": "剩余药量不足",
+    "hourly_cap": "超过每小时剂量上限",
+    "daily_limit": "超过每日剂量上限",
+}
+DOSE_CAPS = frozenset({"hourly_cap", "daily_limit"})  # 超过即不能开始 (不能通过确认放行) 的规则
+
+
+def format_duration(seconds):
+    """把秒数格式化为 "1h 02m 03s" """
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m {secs:02d}s" if hours else f"{minutes}m {secs:02d}s"
+
+
+def parse_volume(value):
+    """把输入框文本或数字解析为注射量 (uL)，无效时抛出 ValueError"""
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            raise ValueError("请输入目标给药量！")
+    try:
+        volume = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的剂量: {value!r}") from None
+    if not volume > 0:  # 同时排除 NaN
+        raise ValueError("无效的剂量: 剂量必须为正数")
+    return volume
+
+
+def check_infusion(volume, speed, remaining, capacity, limits=None, delivered_today=0.0, delivered_last_hour=0.0):
+    """检查一次新注射的参数，返回 InfusionCheck
+    volume: 注射量 (输入框文本或数字)；speed: 注射速度 (uL/s)；remaining/capacity: 剩余药量和设备容量 (uL)
+    limits: srtp.planning.SafetyLimits (默认值仅用于仿真)
+    delivered_today / delivered_last_hour: 这台泵最近 24 小时 / 1 小时内已注射的量 (uL，PumpEngine 同名属性)"""
+    errors, warnings = [], []
+    try:
+        volume = parse_volume(volume)
+    except ValueError as error:
+        errors.append(Finding("volume_invalid", "输入错误", str(error)))
+        volume = None
+    if not isinstance(speed, (int, float)) or not speed > 0:
+        errors.append(Finding("speed_invalid", "输入错误", "注射速度必须大于0！"))
+    elif not SPEED_MIN <= speed <= SPEED_MAX:
+        errors.append(Finding("speed_invalid", "输入错误", f"注射速度必须在 {SPEED_MIN} - {SPEED_MAX} μL/s 之间！"))
+    if errors:
+        return InfusionCheck(volume, speed, errors, warnings, None)
+
+    if volume > VOLUME_WARNING:
+        warnings.append(Finding("volume_high", "注射量过大警告",
+                                f"目标注射量({volume}μL)超过{VOLUME_WARNING:g}μL！"))
+    if speed > SPEED_WARNING:
+        warnings.append(Finding("speed_high", "注射速率过快警告",
+                                f"注射速度({speed}μL/s)超过{SPEED_WARNING:g}μL/s！"))
+
+    # 在整条计划轨迹上检查安全规则 (每小时上限、每日上限、剩余药量)
+    from srtp.planning import SafetyLimits, constant_rate, validate
+
+    timeline = constant_rate(volume, speed)
+    resolution = max(1.0, timeline.duration / PLAN_POINTS)  # 长计划 (例如 4999 uL / 0.001 uL/s) 降低采样密度
+    report = validate(timeline, remaining, capacity, limits or SafetyLimits(), delivered_today, resolution,
+                      delivered_last_hour)
+    caps = [v for v in report.violations if v.rule in DOSE_CAPS]
+    others = [v for v in report.violations if v.rule not in DOSE_CAPS]
+    if caps:
+        errors.append(Finding("dose_limit", "剂量上限", f"注射计划超过剂量上限，不能开始：\n{_details(caps)}"))
+    if others:
+        warnings.append(Finding("plan_violation", "注射计划警告", f"注射计划违反安全规则：\n{_details(others)}"))
+    return InfusionCheck(volume, speed, errors, warnings, report)
+
+
+def _details(violations):
+    return "\n".join(f"{RULE_TEXT[v.rule]}: {v.value:.1f}μL > {v.limit:.1f}μL (开始后 {format_duration(v.at or 0)})"
+                     for v in violations)
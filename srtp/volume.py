@@ -0,0 +1,80 @@
+"""整数纳升的注射量账本
+
+剂量全部以整数纳升 (nL) 记录，每一步的注射量同时从本次任务的已注射量和储药器中
+增减同一个整数，因此不会有浮点累积误差，且始终满足 已出药量 + 剩余药量 == 装药量。
+对外 (界面、日志、事件) 仍以 uL 浮点数表示。
+DeliveryWindow 记录最近 24 小时内各段运行的注射量，用于每小时/每日剂量上限的检查。
+"""
+from collections import deque
+
+NL_PER_UL = 1000  # 1 uL = 1000 nL
+HOUR = 3600.0
+DAY = 24 * HOUR
+
+
+def to_nl(microlitres):
+    """uL -> 整数 nL"""
+    return round(microlitres * NL_PER_UL)
+
+
+def to_ul(nanolitres):
+    """整数 nL -> uL"""
+    return nanolitres / NL_PER_UL
+
+
+class VolumeLedger:
+    """一台泵的剂量账本 (单位 nL)，只由持有它的 PumpEngine 修改"""
+
+    __slots__ = ("capacity", "loaded", "dispensed", "current", "target")
+
+    def __init__(self, capacity):
+        self.capacity = capacity  # 储药器容量
+        self.loaded = capacity  # 最近一次装药 (补药) 的药量
+        self.dispensed = 0  # 装药以来已经注射出的药量
+        self.current = 0  # 本次任务的已注射量
+        self.target = 0  # 本次任务的目标量
+
+    @property
+    def remaining(self):
+        """储药器中的剩余药量"""
+        return self.loaded - self.dispensed
+
+    def load(self, amount):
+        """装药：储药器重新装到 amount"""
+        self.loaded = amount
+        self.dispensed = 0
+
+    def begin(self, target):
+        """开始新任务"""
+        self.current = 0
+        self.target = target
+
+    def advance_to(self, volume):
+        """把本次任务的已注射量推进到 volume，不超过目标量和剩余药量；返回本步实际注射量"""
+        delta = min(volume, self.target) - self.current
+        delta = min(delta, self.remaining)
+        if delta <= 0:
+            return 0
+        self.current += delta
+        self.dispensed += delta
+        return delta
+
+
+class DeliveryWindow:
+    """最近 retention 秒内的注射量 (单位 nL)：每段运行 (开始/恢复到暂停/停止/完成) 结束时记录一次，
+    按结束时刻计入滚动窗口。只由注射线程追加，任何线程都可以查询"""
+
+    def __init__(self, retention=DAY):
+        self.retention = retention
+        self._segments = deque()  # (结束时刻, 注射量)，按时间顺序
+
+    def add(self, at, amount):
+        """记录一段运行在 at 时刻结束，期间注射了 amount"""
+        if amount > 0:
+            self._segments.append((at, amount))
+        while self._segments and self._segments[0][0] <= at - self.retention:
+            self._segments.popleft()
+
+    def total(self, now, window=DAY):
+        """最近 window 秒 (不超过 retention) 内的注射量"""
+        return sum(amount for at, amount in list(self._segments) if at > now - window)
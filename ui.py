@@ -1,240 +1,507 @@
+import functools
+import os
+import re
 import sys
 import time
-from PyQt6.QtWidgets import (
+
+STARTED = time.perf_counter()  # 启动计时的起点 (开始导入 PyQt6 之前)
+
+from PyQt6.QtWidgets import (  # noqa: E402
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
-    QLabel, QLineEdit, QPushButton, QProgressBar, QTextBrowser, QMessageBox,
-    QDoubleSpinBox, QGroupBox, QFrame
+    QLabel, QLineEdit, QPushButton, QProgressBar, QTextBrowser,
+    QDoubleSpinBox, QGroupBox, QFrame, QScrollArea
 )
-from PyQt6.QtCore import QThread, pyqtSignal
-from PyQt6.QtGui import QFont
+from PyQt6.QtCore import QLineF, QPointF, Qt, QThread, QTimer, pyqtSignal  # noqa: E402
+from PyQt6.QtGui import QColor, QFont, QPainter, QPen, QPolygonF, QTextCursor  # noqa: E402
+
+from srtp.alerts import LEVEL_TEXT, AlertLevel, AlertManager  # noqa: E402
+from srtp.engine import ENGINE_EVENTS, PumpEngine  # noqa: E402
+from srtp.history import DecimatedHistory  # noqa: E402
+from srtp.state import PumpState  # noqa: E402
+from srtp.journal import InfusionJournal  # noqa: E402
+from srtp.manager import PumpManager  # noqa: E402
+from srtp.metrics import Metrics, PhaseTimer  # noqa: E402
+from srtp.oplog import FileSink, OperationLog, format_line  # noqa: E402
+from srtp.validation import SPEED_MAX, SPEED_MIN, check_infusion, format_duration  # noqa: E402
+
+DEVICE_ID = "PD-2024-SIM001"  # 设备ID
+LOG_CAPACITY = 1000  # 日志区域保留的最大条数
+LOG_FLUSH_INTERVAL_MS = 33  # 日志批量刷新到界面的间隔 (约每帧一次)
+LOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "operation.log")  # 持久化日志文件
+JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs", "infusion.journal")  # 注射日志
+TELEMETRY_PORT = 8765  # 局域网遥测推送服务的默认端口 (--serve)
+RPC_PORT = 8766  # 本机控制接口的默认端口 (--rpc)
+METRICS_PERIOD_MS = 5000  # 性能指标文件的写出周期 (--metrics)
+PLAN_DEBOUNCE_MS = 150  # 输入停止变化多久之后才重新规划注射计划
+STARTUP_PHASES = {"import": "导入", "construct": "构建", "first_paint": "首次绘制", "panels": "次要面板"}
 
 
 # ==================================================================
-# 模拟给药泵硬件 (在后台线程中运行) - 保持不变
+# 模拟给药泵硬件 (在后台线程中运行) - 核心逻辑见 srtp.engine.PumpEngine
 # ==================================================================
 class DrugPumpSimulator(QThread):
+    """PumpEngine 的 Qt 适配器：把引擎事件转发为信号，并在自己的 QThread 中运行引擎。
+    其余属性和方法 (start_infusion、state、remaining_medicine 等) 都直接由引擎提供。"""
+
     # 定义信号
     progress_updated = pyqtSignal(float, float, float)  # 信号：发射 (当前已注射量, 总目标量, 剩余药量)
     infusion_finished = pyqtSignal()  # 信号：注射完成
     infusion_stopped = pyqtSignal(float)  # 信号：注射停止 (参数：已注射量)
     infusion_paused = pyqtSignal(float)  # 信号：注射暂停 (参数：已注射量)
-    status_changed = pyqtSignal(str)  # 信号：状态改变 (参数：状态字符串)
+    state_changed = pyqtSignal(object, object)  # 信号：状态改变 (参数：旧状态, 新状态 PumpState)
     log_message = pyqtSignal(str)  # 信号：记录日志 (参数：日志消息)
     remaining_low_warning = pyqtSignal()  # 信号：剩余药量不足警告
+    rate_measured = pyqtSignal(float, float)  # 信号：本次运行的速率 (目标速率, 实际速率 uL/s)
+    infusion_rejected = pyqtSignal(str, str)  # 信号：开始注射被拒绝 (标题, 说明)
+    _run_requested = pyqtSignal()  # 在本对象所属的线程 (界面线程) 中启动注射线程
 
-    def __init__(self):
+    def __init__(self, clock=None, threaded=True, progress_rate=30.0, journal=None, metrics=None, capacity=5000.0):
+        """threaded: 为 False 时在调用线程中同步运行注射过程 (无界面仿真，不需要 QApplication)
+        其余参数见 PumpEngine"""
         super().__init__()
-        self.target_volume = 0.0  # 目标给药量 (uL)
-        self.current_volume = 0.0  # 当前已注射量 (uL)
-        self.infusion_speed = 0.0  # 注射速度 (uL/s)
-        self.is_running = False  # 是否正在注射
-        self.should_stop = False  # 是否收到停止指令
-        self.should_pause = False  # 是否收到暂停指令
-        self.status = "就绪"  # 当前状态
-        self.remaining_medicine = 5000  # 设备剩余药剂量 (uL), 初始5.0mL = 5000uL
-        self.paused_volume = 0.0  # 暂停时的已注射量
-        self.low_warning_emitted = False  # 标记是否已经发出低药量警告
-        self.volume = self.remaining_medicine  # 设备容量
-
-    def set_speed(self, speed):
-        """设置注射速度"""
-        self.infusion_speed = speed
-
-    def start_infusion(self, volume, speed, is_resume=False):
-        """启动模拟注射过程"""
-        if self.is_running:
-            self.log_message.emit("警告：注射已在进行中！")
-            return False
+        self.engine = PumpEngine(clock, progress_rate, journal, metrics=metrics, capacity=capacity)
+        emitters = {name: getattr(self, name).emit for name in ENGINE_EVENTS}
+        self.engine.add_listener(lambda name, *args: emitters[name](*args))
+        if threaded:
+            # 在界面线程中调用时直接启动；其他线程 (例如远程控制的事件循环) 调用时排队交给界面线程
+            self._run_requested.connect(self._restart)
+            self.engine.runner = self._run_requested.emit
+
+    def __getattr__(self, name):
+        engine = self.__dict__.get("engine")
+        if engine is None:
+            raise AttributeError(name)
+        return getattr(engine, name)
+
+    def _restart(self):
+        """启动注射线程 (在界面线程中)：上一次运行刚确认暂停时线程可能还在退出，此时 start() 什么也不做，
+        恢复命令就没人执行了，所以先等它结束"""
+        self.wait()
+        self.start()
 
-        # 检查剩余药量
-        if self.remaining_medicine <= 0:
-            self.log_message.emit("错误：设备中药量已耗尽！")
-            QMessageBox.critical(None, "药量不足", "设备中药量已耗尽，无法开始注射！")
-            return False
+    def run(self):
+        """后台线程执行的核心模拟逻辑 (不要直接操作UI！)"""
+        self.engine.run()
 
-        # 检查剩余药量是否足够
-        if not is_resume:  # 新任务需要检查整个目标量
-            if volume > self.remaining_medicine:
-                self.log_message.emit(f"错误：剩余药量不足（剩余:{self.remaining_medicine}uL, 需要:{volume}uL）")
-                QMessageBox.critical(None, "药量不足",
-                                     f"剩余药量不足！\n剩余药量: {self.remaining_medicine:.1f}uL\n需要药量: {volume:.1f}uL")
-                return False
-            # 新任务开始时重置警告标记
-            self.low_warning_emitted = False
-
-        self.target_volume = volume
-        self.infusion_speed = speed
-        self.is_running = True
-        self.should_stop = False
-        self.should_pause = False
-        self.status = "注射中"
-        self.status_changed.emit(self.status)
-
-        if is_resume:
-            self.log_message.emit(
-                f"[恢复] 继续注射: 目标剂量: {self.target_volume} uL, 速度: {self.infusion_speed} uL/s")
-        else:
-            self.current_volume = 0.0  # 新任务重置已注射量
-            self.log_message.emit(f"[开始] 目标剂量: {self.target_volume} uL, 速度: {self.infusion_speed} uL/s")
 
-        self.start()  # 启动后台线程 (会调用 run() 方法)
+# ==================================================================
+# 界面视图状态 - 缓存指示灯颜色，只在颜色变化时才触碰 Qt
+# ==================================================================
+def medicine_band(remaining, capacity):
+    """根据剩余药量百分比返回指示灯颜色：<5% 红, <20% 橙, 其余绿"""
+    med_percent = (remaining / capacity) * 100
+    if med_percent < 5:
+        return "red"
+    if med_percent < 20:
+        return "orange"
+    return "green"
+
+
+# 各状态的显示文字和状态指示灯颜色 (状态的本地化只在界面层进行)
+STATE_TEXT = {
+    PumpState.IDLE: "就绪",
+    PumpState.RUNNING: "注射中",
+    PumpState.PAUSED: "暂停中",
+    PumpState.STOPPING: "正在停止...",
+    PumpState.STOPPED: "已停止",
+    PumpState.FINISHED: "完成",
+}
+STATE_COLOR = {
+    PumpState.IDLE: "green",
+    PumpState.RUNNING: "orange",
+    PumpState.PAUSED: "blue",
+    PumpState.STOPPING: "red",
+    PumpState.STOPPED: "red",
+    PumpState.FINISHED: "green",
+}
+
+
+class IndicatorLight:
+    """圆形指示灯：颜色通过动态属性 light 匹配主窗口样式表中预先写好的规则，
+    并缓存当前颜色，颜色不变时不做任何 Qt 调用 (避免重新解析样式表和重新 polish)"""
+
+    __slots__ = ("widget", "color")
+
+    def __init__(self, widget, color):
+        self.widget = widget
+        self.color = None
+        widget.setFixedSize(20, 20)
+        self.set(color)
+
+    def set(self, color):
+        """切换颜色，返回是否真的发生了变化"""
+        if color == self.color:
+            return False
+        self.color = color
+        self.widget.setProperty("light", color)
+        style = self.widget.style()
+        style.unpolish(self.widget)
+        style.polish(self.widget)
         return True
 
-    def pause_infusion(self):
-        """暂停模拟注射过程"""
-        if self.is_running and not self.should_pause:
-            self.should_pause = True
-            self.status = "暂停中"
-            self.status_changed.emit(self.status)
-            self.log_message.emit("[用户操作] 暂停注射")
-
-    def stop_infusion(self):
-        """停止模拟注射过程"""
-        if self.is_running:
-            self.should_stop = True
-            self.status = "正在停止..."
-            self.status_changed.emit(self.status)
-            self.log_message.emit("[用户操作] 停止注射")
 
-    def run(self):
-        """后台线程执行的核心模拟逻辑 (不要直接操作UI！)"""
-        increment = 0.1  # 每次模拟增加的剂量 (uL) - 模拟精度
+class TrajectoryPreview(QWidget):
+    """注射计划预览：已注射量 (蓝) 和剩余药量 (灰) 曲线、低药量阈值线以及降到阈值的时刻 (红)。
+    曲线直接来自 srtp.planning 的轨迹数组，按控件宽度抽样后绘制"""
+
+    def __init__(self):
+        super().__init__()
+        self.setMinimumHeight(110)
+        self._report = None
+        self._capacity = 1.0
+        self._low_level = 0.0
+
+    def set_plan(self, report, capacity=1.0, low_fraction=0.05):
+        """显示新的计划 (report 为 None 时清空)"""
+        self._report = report
+        self._capacity = capacity
+        self._low_level = low_fraction * capacity
+        self.update()
+
+    def _polyline(self, x, values, scale, top, height):
+        """把数组映射为控件坐标的折线 (values / scale 为 0~1)"""
+        y = top + height * (1.0 - values / scale)
+        return QPolygonF([QPointF(px, py) for px, py in zip(x.tolist(), y.tolist())])
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.rect().adjusted(4, 16, -4, -4)
+        if self._report is None or rect.width() <= 0 or rect.height() <= 0:
+            painter.drawText(self.rect().adjusted(4, 0, 0, 0), Qt.AlignmentFlag.AlignVCenter, "输入目标注射量和速度后显示注射计划")
+            return
+        trajectory = self._report.trajectory
+        stride = max(1, len(trajectory.t) // (2 * rect.width()))  # 每个像素最多两个点
+        t = trajectory.t[::stride]
+        delivered = trajectory.delivered[::stride]
+        remaining = trajectory.remaining[::stride]
+        duration = trajectory.t[-1] or 1.0
+        x = rect.left() + rect.width() * (t / duration)
+        top, height = rect.top(), rect.height()
+
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.setPen(QPen(QColor("#c0c0c0"), 1))
+        painter.drawRect(rect)
+        low_y = top + height * (1.0 - self._low_level / self._capacity)
+        painter.setPen(QPen(QColor("#e67e22"), 1, Qt.PenStyle.DashLine))
+        painter.drawLine(QPointF(rect.left(), low_y), QPointF(rect.right(), low_y))
+        painter.setPen(QPen(QColor("#7f8c8d"), 2))
+        painter.drawPolyline(self._polyline(x, remaining, self._capacity, top, height))
+        painter.setPen(QPen(QColor("#2980b9"), 2))
+        painter.drawPolyline(self._polyline(x, delivered, max(float(trajectory.delivered[-1]), 1e-9), top, height))
+
+        crossing = self._report.low_reservoir_at
+        if crossing is not None:
+            cx = rect.left() + rect.width() * crossing / duration
+            painter.setPen(QPen(QColor("#e74c3c"), 1))
+            painter.drawLine(QPointF(cx, top), QPointF(cx, top + height))
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(4, 12, f"计划: {trajectory.delivered[-1]:.1f} μL / {format_duration(duration)}, "
+                                f"剩余 {trajectory.remaining[-1]:.1f} μL")
+
+
+class LiveChart(QWidget):
+    """实时曲线：已注射量 (蓝) 和实测注射速率 (橙) 的历史，鼠标滚轮缩放时间跨度。
+    数据存放在固定内存的 DecimatedHistory 中，按当前跨度选择分辨率，画出每个桶的最小/最大值包络"""
+
+    MIN_SPAN = 10.0  # 最小时间跨度 (s)
+    MAX_SPAN = 10 * 24 * 3600.0  # 最大时间跨度 (10 天)
+    RATE_WINDOW = 1.0  # 计算实测速率的最短时间窗 (s)
+    REPAINT_INTERVAL_MS = 250  # 有新数据时的重绘间隔
+
+    def __init__(self, clock=time.monotonic):
+        super().__init__()
+        self.setMinimumHeight(120)
+        self.clock = clock
+        self._origin = clock()
+        self.volume = DecimatedHistory()  # 已注射量 (uL)
+        self.rate = DecimatedHistory()  # 实测速率 (uL/s)
+        self.span = 600.0  # 可见时间跨度 (s)
+        self._anchor = None  # 计算速率的起点 (t, 已注射量)
+        self._dirty = False
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.REPAINT_INTERVAL_MS)
+        self._timer.timeout.connect(self._repaint_if_dirty)
+        self._timer.start()
+
+    def add_sample(self, current):
+        """记录一次进度 (已注射量 uL)，每隔 RATE_WINDOW 秒计算一次实测速率"""
+        t = self.clock() - self._origin
+        self.volume.append(t, current)
+        if self._anchor is None or current < self._anchor[1]:
+            self._anchor = (t, current)  # 新任务开始，已注射量归零
+        elif t - self._anchor[0] >= self.RATE_WINDOW:
+            self.rate.append(t, (current - self._anchor[1]) / (t - self._anchor[0]))
+            self._anchor = (t, current)
+        self._dirty = True
+
+    def mark_idle(self):
+        """注射暂停/停止/完成：速率记为 0"""
+        self.rate.append(self.clock() - self._origin, 0.0)
+        self._anchor = None
+        self._dirty = True
+
+    def _repaint_if_dirty(self):
+        if self._dirty:
+            self._dirty = False
+            self.update()
+
+    def wheelEvent(self, event):
+        """滚轮向上放大 (缩短跨度)，向下缩小"""
+        factor = 0.5 if event.angleDelta().y() > 0 else 2.0
+        self.span = min(self.MAX_SPAN, max(self.MIN_SPAN, self.span * factor))
+        self.update()
+
+    def _envelope(self, painter, history, start, end, rect, color):
+        """画一个序列在 [start, end] 内的最小/最大值包络 (每个桶一条竖线，约一像素一个桶)，返回该段的最大值"""
+        data = history.query(start, end, rect.width())
+        if not data.t:
+            return 0.0
+        top = max(max(data.vmax), 1e-9)
+        scale_x = rect.width() / (end - start)
+        scale_y = rect.height() / top
+        left, bottom = rect.left() - start * scale_x + data.width * scale_x / 2, rect.bottom()
+        xs = [left + t * scale_x for t in data.t]
+        # 只用 1 像素宽的画笔：更宽的折线要经过描边器，长会话时重绘慢数十倍
+        painter.setPen(QPen(QColor(color), 1))
+        painter.drawLines([QLineF(x, bottom - low * scale_y, x, bottom - high * scale_y)
+                           for x, low, high in zip(xs, data.vmin, data.vmax)])
+        painter.drawPolyline(QPolygonF([QPointF(x, bottom - high * scale_y) for x, high in zip(xs, data.vmax)]))
+        return top
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        rect = self.rect().adjusted(4, 16, -4, -4)
+        painter.setPen(QPen(QColor("#c0c0c0"), 1))
+        painter.drawRect(rect)
+        if self.volume.latest is None or rect.width() <= 0:
+            painter.drawText(self.rect().adjusted(4, 0, 0, 0), Qt.AlignmentFlag.AlignVCenter, "注射开始后显示实时曲线")
+            return
+        end = max(self.volume.latest[0], self.rate.latest[0] if self.rate.latest else 0.0)
+        start = end - self.span
+        volume_top = self._envelope(painter, self.volume, start, end, rect, "#2980b9")
+        rate_top = self._envelope(painter, self.rate, start, end, rect, "#e67e22")
+        painter.setPen(QColor("#2c3e50"))
+        painter.drawText(4, 12, f"最近 {format_duration(self.span)} (滚轮缩放)  "
+                                f"已注射 ≤ {volume_top:.1f} μL  速率 ≤ {rate_top:.4f} μL/s")
 
-        # 计算每次增加的延迟时间 (基于注射速度)
-        if self.infusion_speed > 0:
-            delay = increment / self.infusion_speed
-        else:
-            delay = 0.1  # 默认延迟
-
-        while self.current_volume < self.target_volume and not self.should_stop:
-            if self.should_pause:
-                self.paused_volume = self.current_volume
-                self.infusion_paused.emit(self.current_volume)
-                self.is_running = False
-                return
-
-            # 模拟一小步注射
-            self.current_volume += increment
-            if self.current_volume > self.target_volume:
-                self.current_volume = self.target_volume
-
-            # 更新剩余药量
-            self.remaining_medicine -= increment
-            if self.remaining_medicine < 0:
-                self.remaining_medicine = 0
-
-            # 检查剩余药量是否低于5% 且 尚未发出警告
-            if self.remaining_medicine <= 0.05 * self.volume and not self.low_warning_emitted:  # 5% of volume
-                self.remaining_low_warning.emit()
-                self.low_warning_emitted = True  # 标记已发出警告
-
-            # 通过信号更新进度 (UI线程会接收并更新界面)
-            self.progress_updated.emit(self.current_volume, self.target_volume, self.remaining_medicine)
-            time.sleep(delay)  # 模拟注射需要时间
-
-        # 注射结束处理
-        self.is_running = False
-        if self.should_stop:
-            self.status = "已停止"
-            self.status_changed.emit(self.status)
-            self.infusion_stopped.emit(self.current_volume)
-            self.log_message.emit(f"[停止] 已注射: {self.current_volume:.1f} uL")
-        else:
-            self.status = "完成"
-            self.status_changed.emit(self.status)
-            self.infusion_finished.emit()
-            self.log_message.emit(f"[完成] 已注射: {self.current_volume:.1f} uL")
+
+class AlertBanner(QFrame):
+    """非模态告警横幅：显示优先级最高的待确认告警和确认按钮 (告警带动作时另有动作按钮)，没有告警时隐藏。
+    告警排队期间事件循环照常运行，进度更新不会被挡住"""
+
+    def __init__(self, alerts):
+        super().__init__()
+        self.setObjectName("alertBanner")
+        self.alerts = alerts
+        self._key = None  # 正在显示的告警
+        self._level = None
+        self.message_label = QLabel()
+        self.message_label.setWordWrap(True)
+        self.more_label = QLabel()
+        self.action_button = QPushButton()
+        self.ack_button = QPushButton("确认")
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(8, 4, 8, 4)
+        layout.addWidget(self.message_label, 1)
+        layout.addWidget(self.more_label)
+        layout.addWidget(self.action_button)
+        layout.addWidget(self.ack_button)
+        self.action_button.clicked.connect(lambda: self.alerts.acknowledge(self._key, run_action=True))
+        self.ack_button.clicked.connect(lambda: self.alerts.acknowledge(self._key))
+        alerts.add_listener(self.refresh)
+        self.refresh()
+
+    def refresh(self):
+        """告警队列变化时更新横幅"""
+        alert = self.alerts.top()
+        if alert is None:
+            self._key = None
+            self.hide()
+            return
+        self._key = alert.key
+        level = alert.level.name.lower()
+        if level != self._level:
+            self._level = level
+            self.setProperty("level", level)
+            self.style().unpolish(self)
+            self.style().polish(self)
+        count = f" (×{alert.count})" if alert.count > 1 else ""
+        self.message_label.setText(f"[{LEVEL_TEXT[alert.level]}] {alert.title}{count}: {alert.text}")
+        others = len(self.alerts) - 1
+        self.more_label.setText(f"另有 {others} 条待确认" if others else "")
+        self.action_button.setVisible(alert.action is not None)
+        if alert.action is not None:
+            self.action_button.setText(alert.action[0])
+        self.ack_button.setText("取消" if alert.action is not None else "确认")
+        self.show()
+
+
+# 应用样式 (主窗口与多泵监控窗口共用)
+APP_STYLE_SHEET = """
+QMainWindow {
+    background-color: #f0f5f5;
+}
+QGroupBox {
+    font-weight: bold;
+    border: 1px solid #c0c0c0;
+    border-radius: 5px;
+    margin-top: 1ex;
+}
+QGroupBox::title {
+    subcontrol-origin: margin;
+    left: 10px;
+    padding: 0 3px 0 3px;
+    color: #2c3e50;
+}
+QPushButton {
+    background-color: #5c9ccc;
+    color: white;
+    border: none;
+    padding: 8px 16px;
+    border-radius: 4px;
+    font-weight: bold;
+}
+QPushButton:hover {
+    background-color: #4a8bc2;
+}
+QPushButton:pressed {
+    background-color: #3a7ab2;
+}
+QPushButton:disabled {
+    background-color: #cccccc;
+    color: #888888;
+}
+QPushButton#stopButton {
+    background-color: #e74c3c;
+}
+QPushButton#stopButton:hover {
+    background-color: #c0392b;
+}
+QPushButton#stopButton:pressed {
+    background-color: #a93226;
+}
+QLabel {
+    color: #2c3e50;
+}
+QProgressBar {
+    border: 1px solid #c0c0c0;
+    border-radius: 5px;
+    text-align: center;
+    background-color: #e0e0e0;
+}
+QProgressBar::chunk {
+    background-color: #5c9ccc;
+    width: 10px;
+}
+QTextBrowser {
+    background-color: white;
+    border: 1px solid #c0c0c0;
+    border-radius: 4px;
+}
+QDoubleSpinBox, QLineEdit {
+    border: 1px solid #c0c0c0;
+    border-radius: 4px;
+    padding: 4px;
+    background-color: white;
+}
+QFrame#pumpTile {
+    background-color: white;
+    border: 1px solid #c0c0c0;
+    border-radius: 5px;
+}
+QFrame#pumpTile QPushButton {
+    padding: 2px 6px;
+}
+QFrame#alertBanner {
+    border-radius: 5px;
+}
+QFrame#alertBanner[level="critical"] {
+    background-color: #f8d7da;
+    border: 1px solid #d9534f;
+}
+QFrame#alertBanner[level="warning"] {
+    background-color: #fff3cd;
+    border: 1px solid #e0b000;
+}
+QFrame#alertBanner[level="info"] {
+    background-color: #d9edf7;
+    border: 1px solid #5bc0de;
+}
+QLabel[light] {
+    border-radius: 10px;
+}
+QLabel[light="gray"] {
+    background-color: gray;
+}
+QLabel[light="green"] {
+    background-color: green;
+}
+QLabel[light="orange"] {
+    background-color: orange;
+}
+QLabel[light="red"] {
+    background-color: red;
+}
+QLabel[light="blue"] {
+    background-color: blue;
+}
+"""
+
+
+@functools.lru_cache(maxsize=None)
+def compiled_style_sheet():
+    """去掉空白后的 APP_STYLE_SHEET (只计算一次)"""
+    return re.sub(r"\s*([{}:;,])\s*", r"\1", APP_STYLE_SHEET).strip()
+
+
+def apply_style_sheet():
+    """整个应用只设置一次样式表：Qt 只解析一次，之后创建的窗口直接使用，不再各自重新解析"""
+    app = QApplication.instance()
+    sheet = compiled_style_sheet()
+    if app.styleSheet() != sheet:
+        app.setStyleSheet(sheet)
 
 
 # ==================================================================
 # 主应用程序窗口 - 美化界面
 # ==================================================================
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, startup=None, defer_panels=True):
+        """startup: 启动计时 PhaseTimer (默认从构建窗口开始计时)
+        defer_panels: 设备信息和操作日志面板在第一次绘制之后再构建，剂量面板先显示出来"""
         super().__init__()
+        self.startup = startup or PhaseTimer()
         self.setWindowTitle("帕金森给药装置控制软件 (模拟模式)")
         self.setMinimumSize(800, 600)
 
-        # 设置应用样式
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #f0f5f5;
-            }
-            QGroupBox {
-                font-weight: bold;
-                border: 1px solid #c0c0c0;
-                border-radius: 5px;
-                margin-top: 1ex;
-            }
-            QGroupBox::title {
-                subcontrol-origin: margin;
-                left: 10px;
-                padding: 0 3px 0 3px;
-                color: #2c3e50;
-            }
-            QPushButton {
-                background-color: #5c9ccc;
-                color: white;
-                border: none;
-                padding: 8px 16px;
-                border-radius: 4px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #4a8bc2;
-            }
-            QPushButton:pressed {
-                background-color: #3a7ab2;
-            }
-            QPushButton:disabled {
-                background-color: #cccccc;
-                color: #888888;
-            }
-            QPushButton#stopButton {
-                background-color: #e74c3c;
-            }
-            QPushButton#stopButton:hover {
-                background-color: #c0392b;
-            }
-            QPushButton#stopButton:pressed {
-                background-color: #a93226;
-            }
-            QLabel {
-                color: #2c3e50;
-            }
-            QProgressBar {
-                border: 1px solid #c0c0c0;
-                border-radius: 5px;
-                text-align: center;
-                background-color: #e0e0e0;
-            }
-            QProgressBar::chunk {
-                background-color: #5c9ccc;
-                width: 10px;
-            }
-            QTextBrowser {
-                background-color: white;
-                border: 1px solid #c0c0c0;
-                border-radius: 4px;
-            }
-            QDoubleSpinBox, QLineEdit {
-                border: 1px solid #c0c0c0;
-                border-radius: 4px;
-                padding: 4px;
-                background-color: white;
-            }
-        """)
+        # 设置应用样式 (整个应用共用一份)
+        apply_style_sheet()
 
         # 创建模拟泵对象
-        self.pump_simulator = DrugPumpSimulator()
+        self.journal = InfusionJournal(JOURNAL_PATH)
+        self.pump_simulator = DrugPumpSimulator(journal=self.journal)
+
+        # 操作日志：有界环形缓冲，后台线程写入滚动文件
+        self.operation_log = OperationLog(LOG_CAPACITY, DEVICE_ID, FileSink(LOG_PATH))
+        self._log_timer = QTimer(self)
+        self._log_timer.setSingleShot(True)
+        self._log_timer.setInterval(LOG_FLUSH_INTERVAL_MS)
+        self._log_timer.timeout.connect(self.flush_log)
+        # 计划预览：输入连续变化 (逐字输入、按住微调按钮) 时只在停下来之后规划一次
+        self._plan_timer = QTimer(self)
+        self._plan_timer.setSingleShot(True)
+        self._plan_timer.setInterval(PLAN_DEBOUNCE_MS)
+        self._plan_timer.timeout.connect(self.update_plan)
+
+        # 非模态告警：按优先级排队、同类合并，发出/确认都写入操作日志 (审计记录)
+        self.alerts = AlertManager(audit=self.audit_alert)
 
         # ----------------------------
         # 创建 UI 控件
         # ----------------------------
         # 状态显示
         self.status_indicator = QLabel()
-        self.status_indicator.setFixedSize(20, 20)
-        self.status_indicator.setStyleSheet("background-color: gray; border-radius: 10px;")
+        self.status_light = IndicatorLight(self.status_indicator, "gray")
 
         self.status_label = QLabel("状态: 就绪")
         self.status_label.setFont(QFont("Arial", 10, QFont.Weight.Bold))
@@ -245,25 +512,10 @@ class MainWindow(QMainWindow):
         status_layout.addWidget(self.status_label)
         status_layout.addStretch()
 
-        # 设备信息面板
-        device_info_group = QGroupBox("设备信息")
-        device_info_layout = QGridLayout()
-
-        self.device_name_label = QLabel("设备名称:")
-        self.device_name_value = QLabel("帕金森给药装置模拟器")
-        self.device_id_label = QLabel("设备ID:")
-        self.device_id_value = QLabel("PD-2024-SIM001")
-        self.software_ver_label = QLabel("软件版本:")
-        self.software_ver_value = QLabel("v1.2.0")
-
-        device_info_layout.addWidget(self.device_name_label, 0, 0)
-        device_info_layout.addWidget(self.device_name_value, 0, 1)
-        device_info_layout.addWidget(self.device_id_label, 1, 0)
-        device_info_layout.addWidget(self.device_id_value, 1, 1)
-        device_info_layout.addWidget(self.software_ver_label, 2, 0)
-        device_info_layout.addWidget(self.software_ver_value, 2, 1)
-
-        device_info_group.setLayout(device_info_layout)
+        # 设备信息面板和日志区域 (内容在 build_secondary_panels 中构建)
+        self.device_info_group = QGroupBox("设备信息")
+        self.log_group = QGroupBox("操作日志")
+        self.log_display = None
 
         # 参数设置区域
         params_group = QGroupBox("参数设置")
@@ -273,7 +525,7 @@ class MainWindow(QMainWindow):
         self.speed_label = QLabel("注射速度 (μL/s):")
         self.speed_input = QDoubleSpinBox()
         self.speed_input.setDecimals(3)
-        self.speed_input.setRange(0.001, 1.0)
+        self.speed_input.setRange(SPEED_MIN, SPEED_MAX)
         self.speed_input.setSingleStep(0.001)
         self.speed_input.setValue(0.0)
         self.speed_input.setFixedWidth(120)
@@ -298,7 +550,7 @@ class MainWindow(QMainWindow):
         self.current_vol_label.setFont(QFont("Arial", 10, QFont.Weight.Bold))
         self.target_vol_label = QLabel("0.0")
         self.target_vol_label.setFont(QFont("Arial", 10, QFont.Weight.Bold))
-        self.remaining_vol_label = QLabel("5000.0")
+        self.remaining_vol_label = QLabel(f"{self.pump_simulator.volume:.1f}")
         self.remaining_vol_label.setFont(QFont("Arial", 10, QFont.Weight.Bold))
 
         self.dose_layout.addWidget(QLabel("已注射量 (μL):"), 0, 0)
@@ -311,8 +563,7 @@ class MainWindow(QMainWindow):
 
         # 药量状态指示器
         self.medicine_status_indicator = QLabel()
-        self.medicine_status_indicator.setFixedSize(20, 20)
-        self.medicine_status_indicator.setStyleSheet("background-color: green; border-radius: 10px;")
+        self.medicine_light = IndicatorLight(self.medicine_status_indicator, "green")
         self.dose_layout.addWidget(self.medicine_status_indicator, 3, 1)
 
         dose_group.setLayout(self.dose_layout)
@@ -344,15 +595,16 @@ class MainWindow(QMainWindow):
         self.progress_bar.setValue(0)
         self.progress_bar.setFixedHeight(25)
         progress_layout.addWidget(self.progress_bar)
+        self.live_chart = LiveChart()
+        progress_layout.addWidget(self.live_chart)
         progress_group.setLayout(progress_layout)
 
-        # 日志区域
-        log_group = QGroupBox("操作日志")
-        log_layout = QVBoxLayout()
-        self.log_display = QTextBrowser()
-        self.log_display.setReadOnly(True)
-        log_layout.addWidget(self.log_display)
-        log_group.setLayout(log_layout)
+        # 注射计划预览 (输入改变时重新规划)
+        plan_group = QGroupBox("注射计划")
+        plan_layout = QVBoxLayout()
+        self.plan_preview = TrajectoryPreview()
+        plan_layout.addWidget(self.plan_preview)
+        plan_group.setLayout(plan_layout)
 
         # 分隔线
         separator = QFrame()
@@ -374,9 +626,13 @@ class MainWindow(QMainWindow):
         top_layout = QHBoxLayout()
         top_layout.addLayout(status_layout)
         top_layout.addStretch()
-        top_layout.addWidget(device_info_group)
+        top_layout.addWidget(self.device_info_group)
         main_layout.addLayout(top_layout)
 
+        # 告警横幅 (没有待确认的告警时隐藏)
+        self.alert_banner = AlertBanner(self.alerts)
+        main_layout.addWidget(self.alert_banner)
+
         # 参数和剂量区域
         params_dose_layout = QHBoxLayout()
         params_dose_layout.addWidget(params_group, 1)
@@ -389,8 +645,11 @@ class MainWindow(QMainWindow):
         # 进度条区域
         main_layout.addWidget(progress_group)
 
+        # 注射计划预览区域
+        main_layout.addWidget(plan_group)
+
         # 日志区域
-        main_layout.addWidget(log_group, 1)  # 参数1表示这个控件可以拉伸
+        main_layout.addWidget(self.log_group, 1)  # 参数1表示这个控件可以拉伸
 
         # ----------------------------
         # 连接信号与槽 (事件处理) - 保持不变
@@ -400,23 +659,86 @@ class MainWindow(QMainWindow):
         self.pause_button.clicked.connect(self.on_pause_clicked)
         self.stop_button.clicked.connect(self.on_stop_clicked)
         self.speed_input.valueChanged.connect(self.on_speed_changed)
+        self.speed_input.valueChanged.connect(self._plan_timer.start)
+        self.volume_input.textChanged.connect(self._plan_timer.start)
 
         # 连接模拟泵的信号到UI的槽
         self.pump_simulator.progress_updated.connect(self.update_progress)
         self.pump_simulator.infusion_finished.connect(self.on_infusion_finished)
         self.pump_simulator.infusion_stopped.connect(self.on_infusion_stopped)
         self.pump_simulator.infusion_paused.connect(self.on_infusion_paused)
-        self.pump_simulator.status_changed.connect(self.update_status)
+        self.pump_simulator.state_changed.connect(self.update_status)
         self.pump_simulator.log_message.connect(self.log_message)
         self.pump_simulator.remaining_low_warning.connect(self.on_remaining_low)
+        self.pump_simulator.infusion_rejected.connect(self.on_infusion_rejected)
 
-        # 初始日志消息
+        # 初始日志消息 (日志区域构建好之前先留在操作日志的缓冲中)
         self.log_message("系统启动 - 模拟模式")
+        self.restore_view()
         self.log_message("设备已就绪，等待指令")
 
+        self._painted = False
+        self._panels_pending = defer_panels
+        if not defer_panels:
+            self.build_secondary_panels()
+        self.startup.mark("construct")
+
+    def build_secondary_panels(self):
+        """构建设备信息和操作日志面板 (默认在第一次绘制之后由事件循环调用)"""
+        self._panels_pending = False
+        device_info_layout = QGridLayout()
+        self.device_name_label = QLabel("设备名称:")
+        self.device_name_value = QLabel("帕金森给药装置模拟器")
+        self.device_id_label = QLabel("设备ID:")
+        self.device_id_value = QLabel(DEVICE_ID)
+        self.software_ver_label = QLabel("软件版本:")
+        self.software_ver_value = QLabel("v1.2.0")
+        device_info_layout.addWidget(self.device_name_label, 0, 0)
+        device_info_layout.addWidget(self.device_name_value, 0, 1)
+        device_info_layout.addWidget(self.device_id_label, 1, 0)
+        device_info_layout.addWidget(self.device_id_value, 1, 1)
+        device_info_layout.addWidget(self.software_ver_label, 2, 0)
+        device_info_layout.addWidget(self.software_ver_value, 2, 1)
+        self.device_info_group.setLayout(device_info_layout)
+
+        log_layout = QVBoxLayout()
+        self.log_display = QTextBrowser()
+        self.log_display.setReadOnly(True)
+        self.log_display.document().setMaximumBlockCount(LOG_CAPACITY)  # 超出后丢弃最早的行
+        log_layout.addWidget(self.log_display)
+        self.log_group.setLayout(log_layout)
+        self.flush_log()  # 显示构建之前缓冲的日志
+        if self._painted:
+            self.startup.mark("panels")
+            self.log_message(f"[启动] {self.startup.format(STARTUP_PHASES)}")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self._painted:
+            return
+        self._painted = True
+        self.startup.mark("first_paint")
+        if self._panels_pending:
+            # 剂量面板已经可见，次要面板交给事件循环在下一轮构建
+            self._panels_pending = False
+            QTimer.singleShot(0, self.build_secondary_panels)
+        else:
+            self.log_message(f"[启动] {self.startup.format(STARTUP_PHASES)}")
+
     # ==================================================================
     # 槽函数 (处理事件和更新UI) - 保持不变
     # ==================================================================
+    def plan_infusion(self):
+        """按当前输入规划并校验注射计划，输入无效时返回 None"""
+        pump = self.pump_simulator
+        return check_infusion(self.volume_input.text(), self.speed_input.value(),
+                              pump.snapshot().remaining, pump.volume, delivered_today=pump.delivered_today,
+                              delivered_last_hour=pump.delivered_last_hour).report
+
+    def update_plan(self):
+        """输入改变时重新规划并刷新预览"""
+        self.plan_preview.set_plan(self.plan_infusion(), self.pump_simulator.volume)
+
     def on_speed_changed(self, value):
         """注射速度改变"""
         self.pump_simulator.set_speed(value)
@@ -424,7 +746,7 @@ class MainWindow(QMainWindow):
     def on_start_clicked(self):
         """处理 '开始注射' 按钮点击"""
         # 根据当前状态决定是开始新任务还是恢复暂停的任务
-        if self.pump_simulator.status == "暂停中":
+        if self.pump_simulator.state is PumpState.PAUSED:
             # 恢复暂停的任务
             self.log_message("恢复暂停的注射任务")
             self.pump_simulator.start_infusion(
@@ -432,85 +754,47 @@ class MainWindow(QMainWindow):
                 self.pump_simulator.infusion_speed,
                 is_resume=True
             )
-            self.start_button.setEnabled(False)
-            self.pause_button.setEnabled(True)
-            self.stop_button.setEnabled(True)
             return
 
         # 否则是开始新的注射任务
-        # 1. 获取并验证输入
-        volume_text = self.volume_input.text().strip()
-        speed = self.speed_input.value()
-
-        if not volume_text:
-            QMessageBox.warning(self, "输入错误", "请输入目标给药量！")
+        # 1. 检查输入、注射量和速度警告，并在整条计划轨迹上检查安全规则 (与 RPC 接口共用同一套规则)
+        pump = self.pump_simulator
+        check = check_infusion(self.volume_input.text(), self.speed_input.value(),
+                               pump.snapshot().remaining, pump.volume, delivered_today=pump.delivered_today,
+                               delivered_last_hour=pump.delivered_last_hour)
+        if check.errors:
+            error = check.errors[0]
+            self.alerts.raise_alert(("input", DEVICE_ID), AlertLevel.WARNING, error.title, error.text, DEVICE_ID)
             return
-
-        try:
-            target_volume = float(volume_text)
-            if target_volume <= 0:
-                raise ValueError("剂量必须为正数")
-        except ValueError as e:
-            QMessageBox.warning(self, "输入错误", f"无效的剂量: {e}")
-            return
-
-        # 2. 检查注射速度
-        if speed <= 0:
-            QMessageBox.warning(self, "输入错误", "注射速度必须大于0！")
-            return
-
-        # 3. 检查注射量警告
-        if target_volume > 200:
-            reply = QMessageBox.warning(
-                self,
-                "注射量过大警告",
-                f"目标注射量({target_volume}μL)超过200μL！\n是否继续？",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            if reply == QMessageBox.StandardButton.No:
-                return
-
-        # 4. 检查注射速度警告
-        if speed > 0.1:
-            reply = QMessageBox.warning(
-                self,
-                "注射速率过快警告",
-                f"注射速度({speed}μL/s)超过0.1μL/s！\n是否继续？",
-                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-            )
-            if reply == QMessageBox.StandardButton.No:
-                return
-
-        # 5. 确认操作 (安全措施!)
-        reply = QMessageBox.question(
-            self,
-            "确认注射",
-            f"确认开始注射 {target_volume} uL 药物?\n注射速度: {speed} uL/s",
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-        )
-        if reply == QMessageBox.StandardButton.No:
-            return
-
-        # 6. 调用模拟泵开始注射
+        self.alerts.resolve(("input", DEVICE_ID))
+        target_volume, speed, report = check.volume, check.speed, check.report
+        self.plan_preview.set_plan(report, pump.volume)
+        if report.low_reservoir_at is not None:
+            self.log_message(f"[计划] 预计开始后 {format_duration(report.low_reservoir_at)} 剩余药量低于5%")
+
+        # 2. 警告和开始确认合并为一条非模态告警 (安全措施!)，点击 "确认开始" 后才开始注射
+        lines = [f"{warning.title}: {warning.text}" for warning in check.warnings]
+        lines.append(f"确认开始注射 {target_volume} uL 药物? 注射速度: {speed} uL/s")
+        self.alerts.raise_alert(
+            ("confirm_start", DEVICE_ID),
+            AlertLevel.WARNING if check.warnings else AlertLevel.INFO,
+            "确认注射", "\n".join(lines), DEVICE_ID,
+            action=("确认开始", lambda: self.start_confirmed(target_volume, speed)))
+
+    def start_confirmed(self, target_volume, speed):
+        """操作者在告警横幅上确认后开始注射 (按钮状态随 state_changed 更新，RPC 发起的注射也一样)"""
         if self.pump_simulator.start_infusion(target_volume, speed):
-            # 7. 更新UI状态 (禁用开始按钮，启用停止按钮)
-            self.start_button.setEnabled(False)
-            self.pause_button.setEnabled(True)
-            self.stop_button.setEnabled(True)
             self.log_message(f"[用户操作] 开始注射指令发出: {target_volume} uL, 速度: {speed} uL/s")
 
     def on_pause_clicked(self):
         """处理 '暂停注射' 按钮点击"""
-        if self.pump_simulator.status == "注射中":
+        if self.pump_simulator.state is PumpState.RUNNING:
             self.pump_simulator.pause_infusion()
-            self.start_button.setEnabled(True)
-            self.pause_button.setEnabled(False)
-            self.stop_button.setEnabled(True)  # 确保暂停状态下可以停止
 
     def on_stop_clicked(self):
         """处理 '停止注射' 按钮点击"""
         # 在"注射中"或"暂停中"状态下都可以停止
-        if self.pump_simulator.status in ["注射中", "暂停中"]:
+        if self.pump_simulator.state in (PumpState.RUNNING, PumpState.PAUSED):
             self.pump_simulator.stop_infusion()
             # 注意：UI状态的改变将在收到模拟泵的`infusion_stopped`信号后处理
         else:
@@ -518,6 +802,7 @@ class MainWindow(QMainWindow):
 
     def update_progress(self, current_vol, target_vol, remaining_med):
         """更新进度条和剂量显示 (由模拟泵的progress_updated信号触发)"""
+        started = time.perf_counter()
         # 计算百分比
         percent = (current_vol / target_vol) * 100 if target_vol > 0 else 0
         self.progress_bar.setValue(int(percent))
@@ -527,78 +812,408 @@ class MainWindow(QMainWindow):
         self.target_vol_label.setText(f"{target_vol:.1f}")
         self.remaining_vol_label.setText(f"{remaining_med:.1f}")
 
-        # 更新药量状态指示器
-        med_percent = (remaining_med / 5000) * 100
-        if med_percent < 5:
-            self.medicine_status_indicator.setStyleSheet("background-color: red; border-radius: 10px;")
-        elif med_percent < 20:
-            self.medicine_status_indicator.setStyleSheet("background-color: orange; border-radius: 10px;")
-        else:
-            self.medicine_status_indicator.setStyleSheet("background-color: green; border-radius: 10px;")
+        # 更新药量状态指示器 (颜色区间不变时不会触碰 Qt)
+        self.medicine_light.set(medicine_band(remaining_med, self.pump_simulator.volume))
+
+        # 实时曲线只记录数据，由自己的定时器限频重绘
+        self.live_chart.add_sample(current_vol)
+
+        elapsed = time.perf_counter() - started
+        self.pump_simulator.telemetry.record_slot(elapsed)
+        metrics = self.pump_simulator.metrics
+        if metrics is not None:
+            metrics.observe("slot_seconds", elapsed)
 
     def on_infusion_finished(self):
         """注射完成处理 (由模拟泵的infusion_finished信号触发)"""
-        self.start_button.setEnabled(True)
-        self.pause_button.setEnabled(False)
-        self.stop_button.setEnabled(False)
-        QMessageBox.information(self, "完成", "药物注射已完成！")
+        self.log_telemetry()
+        self.update_plan()  # 剩余药量变了，重新规划
+        self.alerts.raise_alert(("run_end", DEVICE_ID), AlertLevel.INFO, "完成", "药物注射已完成！", DEVICE_ID)
 
     def on_infusion_stopped(self, volume_injected):
         """注射停止处理 (由模拟泵的infusion_stopped信号触发)"""
-        self.start_button.setEnabled(True)
-        self.pause_button.setEnabled(False)
-        self.stop_button.setEnabled(False)
-        QMessageBox.information(self, "已停止", f"注射已停止。已注射量: {volume_injected:.1f} uL")
+        self.log_telemetry()
+        self.update_plan()  # 剩余药量变了，重新规划
+        self.alerts.raise_alert(("run_end", DEVICE_ID), AlertLevel.INFO, "已停止",
+                                f"注射已停止。已注射量: {volume_injected:.1f} uL", DEVICE_ID)
 
     def on_infusion_paused(self, volume_injected):
         """注射暂停处理 (由模拟泵的infusion_paused信号触发)"""
         self.log_message(f"注射已暂停。已注射量: {volume_injected:.1f} uL")
         # 不需要弹出消息框，因为暂停是用户主动操作
-        # 更新UI状态已在按钮点击事件中处理
-
-    def update_status(self, new_status):
-        """更新状态标签 (由模拟泵的status_changed信号触发)"""
-        self.status_label.setText(f"状态: {new_status}")
-
-        # 更新状态指示灯
-        if "注射中" in new_status:
-            self.status_indicator.setStyleSheet("background-color: orange; border-radius: 10px;")
-            # 禁用速度设置
-            self.speed_input.setEnabled(False)
-        elif "暂停中" in new_status:
-            self.status_indicator.setStyleSheet("background-color: blue; border-radius: 10px;")
-            # 启用速度设置（允许在暂停时修改速度）
-            self.speed_input.setEnabled(True)
-        elif "停止" in new_status or "错误" in new_status:
-            self.status_indicator.setStyleSheet("background-color: red; border-radius: 10px;")
-            # 启用速度设置
-            self.speed_input.setEnabled(True)
-        else:  # 就绪/完成
-            self.status_indicator.setStyleSheet("background-color: green; border-radius: 10px;")
-            # 启用速度设置
-            self.speed_input.setEnabled(True)
-
-    def log_message(self, message):
-        """向日志区域添加消息 (可由自身或模拟泵的log_message信号触发)"""
-        timestamp = time.strftime("%H:%M:%S")  # 添加时间戳
-        self.log_display.append(f"[{timestamp}] {message}")
+        # 按钮状态随 state_changed 更新
+
+    def update_status(self, old_state, new_state):
+        """更新状态标签 (由模拟泵的state_changed信号触发)"""
+        self.status_label.setText(f"状态: {STATE_TEXT[new_state]}")
+
+        # 更新状态指示灯 (颜色不变时不会触碰 Qt)
+        self.status_light.set(STATE_COLOR[new_state])
+        # 按钮随状态更新，无论注射是由按钮还是 RPC 接口发起的 (暂停状态下可以继续或停止)
+        running = new_state is PumpState.RUNNING
+        self.start_button.setEnabled(not running and new_state is not PumpState.STOPPING)
+        self.pause_button.setEnabled(running)
+        self.stop_button.setEnabled(running or new_state is PumpState.PAUSED)
+        # 注射中禁用速度设置，其余状态 (包括暂停中) 允许修改速度
+        self.speed_input.setEnabled(not running)
+        if new_state is not PumpState.RUNNING:
+            self.live_chart.mark_idle()
+
+    def log_message(self, message, level=None, event=None):
+        """记录一条日志 (可由自身或模拟泵的log_message信号触发)，界面在下一帧批量刷新"""
+        snapshot = self.pump_simulator.snapshot()
+        self.operation_log.record(message, snapshot.current, snapshot.target, snapshot.remaining, level, event)
+        if not self._log_timer.isActive():
+            self._log_timer.start()
+
+    def flush_log(self):
+        """把自上一帧以来的新日志一次性追加到日志区域"""
+        if self.log_display is None:
+            return  # 日志区域尚未构建，记录留在缓冲中
+        batch = self.operation_log.take_batch()
+        if not batch:
+            return
+        scrollbar = self.log_display.verticalScrollBar()
+        at_bottom = scrollbar.value() == scrollbar.maximum()
+        cursor = QTextCursor(self.log_display.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        if not self.log_display.document().isEmpty():
+            cursor.insertBlock()
+        cursor.insertText("\n".join(format_line(record) for record in batch))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def restore_view(self):
+        """按注射日志恢复的状态刷新界面 (储药量、被中断的注射)"""
+        pump = self.pump_simulator
+        self.update_progress(pump.current_volume, pump.target_volume, pump.remaining_medicine)
+        self.log_message(f"[日志回放] 设备剩余药量: {pump.remaining_medicine:.1f} uL")
+        if pump.state is PumpState.PAUSED:
+            self.update_status(PumpState.IDLE, pump.state)
+            self.log_message(
+                f"警告：检测到未完成的注射 (已注射 {pump.current_volume:.1f} / {pump.target_volume:.1f} uL)，"
+                f"已恢复为暂停状态，点击 '开始注射' 继续")
+
+    def closeEvent(self, event):
+        """关闭窗口时暂停正在进行的注射，并写完日志"""
+        if self.pump_simulator.is_running:
+            self.pump_simulator.pause_infusion()
+            self.pump_simulator.wait()
+        self.journal.close()
+        self._log_timer.stop()
+        self.flush_log()
+        self.operation_log.close()
+        super().closeEvent(event)
+
+    def log_telemetry(self):
+        """记录进度遥测计数，确认界面线程没有超出帧预算"""
+        stats = self.pump_simulator.telemetry.stats()
+        self.log_message(
+            f"[遥测] 进度快照: {stats['published']}, 送达: {stats['delivered']}, "
+            f"合并: {stats['merged']}, 界面平均耗时: {stats['slot_avg_ms']:.3f} ms, "
+            f"最大: {stats['slot_max_ms']:.3f} ms, 超出帧预算 ({stats['frame_budget_ms']:.1f} ms): "
+            f"{stats['over_budget']} 次")
+
+    def on_infusion_rejected(self, title, text):
+        """开始注射被拒绝 (由模拟泵的infusion_rejected信号触发)"""
+        self.alerts.raise_alert(("rejected", DEVICE_ID), AlertLevel.CRITICAL, title, text, DEVICE_ID)
 
     def on_remaining_low(self):
-        """剩余药量不足5%警告"""
-        remaining = self.pump_simulator.remaining_medicine
+        """剩余药量不足5%警告 (每台泵只保留一条，确认前重复触发只合并计数)"""
+        remaining = self.pump_simulator.snapshot().remaining  # 注射线程仍在写入，只读取已发布的快照
         self.log_message(f"警告：设备剩余药量不足5% ({remaining:.1f}μL)！")
-        QMessageBox.warning(
-            self,
-            "药量不足警告",
-            f"设备剩余药量不足5%！\n当前剩余药量: {remaining:.1f}μL\n请及时补充药物。"
-        )
+        self.alerts.raise_alert(("remaining_low", DEVICE_ID), AlertLevel.WARNING, "药量不足警告",
+                                f"设备剩余药量不足5%！当前剩余药量: {remaining:.1f}μL，请及时补充药物。", DEVICE_ID)
+
+    def audit_alert(self, record):
+        """告警的审计记录写入操作日志 (同时持久化到日志文件)"""
+        action = {"raised": "发出", "coalesced": "合并", "acknowledged": "确认", "resolved": "解除"}[record.action]
+        by = f" ({record.by})" if record.by else ""
+        level = {AlertLevel.CRITICAL: "ERROR", AlertLevel.WARNING: "WARNING"}.get(record.level, "INFO")
+        self.log_message(f"[告警] {action}{by} {LEVEL_TEXT[record.level]}: {record.title} "
+                         f"(第 {record.count} 次)", level, "alert")
+
+
+# ==================================================================
+# 多泵监控 - 一个调度线程驱动的泵阵列
+# ==================================================================
+class PumpTile(QFrame):
+    """单台泵的紧凑显示：状态灯、进度条、剂量和 开始/暂停/停止 按钮"""
+
+    def __init__(self, pump, name, check, alerts):
+        super().__init__()
+        self.setObjectName("pumpTile")
+        self.pump = pump
+        self.name = name
+        self.check = check  # check(泵) 按公共参数检查这台泵的注射 (srtp.validation.check_infusion)
+        self.alerts = alerts  # 窗口共用的告警队列
+
+        self.status_indicator = QLabel()
+        self.status_light = IndicatorLight(self.status_indicator, "gray")
+        self.name_label = QLabel(name)
+        self.name_label.setFont(QFont("Arial", 9, QFont.Weight.Bold))
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFixedHeight(14)
+        self.progress_bar.setTextVisible(False)
+        self.volume_label = QLabel("0.0 / 0.0 μL")
+        self.start_button = QPushButton("开始")
+        self.pause_button = QPushButton("暂停")
+        self.pause_button.setEnabled(False)
+        self.stop_button = QPushButton("停止")
+        self.stop_button.setObjectName("stopButton")
+        self.stop_button.setEnabled(False)
+
+        header = QHBoxLayout()
+        header.addWidget(self.status_indicator)
+        header.addWidget(self.name_label)
+        header.addStretch()
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.start_button)
+        buttons.addWidget(self.pause_button)
+        buttons.addWidget(self.stop_button)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(6, 6, 6, 6)
+        layout.setSpacing(4)
+        layout.addLayout(header)
+        layout.addWidget(self.progress_bar)
+        layout.addWidget(self.volume_label)
+        layout.addLayout(buttons)
+
+        self.start_button.clicked.connect(self.on_start_clicked)
+        self.pause_button.clicked.connect(pump.pause_infusion)
+        self.stop_button.clicked.connect(pump.stop_infusion)
+        pump.progress_updated.connect(self.update_progress)
+        pump.state_changed.connect(self.update_status)
+        pump.infusion_rejected.connect(self.on_infusion_rejected)
+        pump.remaining_low_warning.connect(self.on_remaining_low)
+
+    def on_start_clicked(self):
+        """恢复暂停的任务，或检查参数后在告警横幅上请求确认开始 (与主窗口相同的规则)"""
+        if self.pump.state is PumpState.PAUSED:
+            self.pump.start_infusion(self.pump.target_volume, self.pump.infusion_speed, is_resume=True)
+            return
+        check = self.checked()
+        if check is None:
+            return
+        lines = [f"{warning.title}: {warning.text}" for warning in check.warnings]
+        lines.append(f"确认 {self.name} 开始注射 {check.volume} uL 药物? 注射速度: {check.speed} uL/s")
+        self.alerts.raise_alert(
+            ("confirm_start", self.name), AlertLevel.WARNING if check.warnings else AlertLevel.INFO,
+            "确认注射", "\n".join(lines), self.name,
+            action=("确认开始", lambda: self.pump.start_infusion(check.volume, check.speed)))
+
+    def checked(self):
+        """检查这台泵的注射参数：有错误时发出告警并返回 None"""
+        check = self.check(self.pump)
+        if check.errors:
+            error = check.errors[0]
+            self.alerts.raise_alert(("input", self.name), AlertLevel.WARNING, error.title,
+                                    f"{self.name}: {error.text}", self.name)
+            return None
+        self.alerts.resolve(("input", self.name))
+        return check
+
+    def on_infusion_rejected(self, title, text):
+        self.setToolTip(f"{title}: {text}")
+        self.alerts.raise_alert(("rejected", self.name), AlertLevel.CRITICAL, title, f"{self.name}: {text}", self.name)
+
+    def on_remaining_low(self):
+        remaining = self.pump.snapshot().remaining
+        self.alerts.raise_alert(("remaining_low", self.name), AlertLevel.WARNING, "药量不足警告",
+                                f"{self.name} 剩余药量不足5% ({remaining:.1f}μL)", self.name)
+
+    def update_progress(self, current_vol, target_vol, remaining_med):
+        started = time.perf_counter()
+        percent = (current_vol / target_vol) * 100 if target_vol > 0 else 0
+        self.progress_bar.setValue(int(percent))
+        self.volume_label.setText(f"{current_vol:.1f} / {target_vol:.1f} μL")
+        metrics = self.pump.metrics
+        if metrics is not None:
+            metrics.observe("slot_seconds", time.perf_counter() - started)
+
+    def update_status(self, old_state, new_state):
+        self.status_light.set(STATE_COLOR[new_state])
+        running = new_state is PumpState.RUNNING
+        self.start_button.setEnabled(not running and new_state is not PumpState.STOPPING)
+        self.pause_button.setEnabled(running)
+        self.stop_button.setEnabled(running or new_state is PumpState.PAUSED)
+
+
+class PumpBenchWindow(QMainWindow):
+    """多泵监控窗口：PumpManager 用一个调度线程驱动全部模拟泵"""
+
+    COLUMNS = 8  # 每行的泵数
+
+    def __init__(self, pump_count):
+        super().__init__()
+        self.setWindowTitle(f"帕金森给药装置控制软件 - 多泵监控 ({pump_count} 台, 模拟模式)")
+        self.setMinimumSize(900, 600)
+        apply_style_sheet()
+
+        self.manager = PumpManager()
+        self.tiles = []
+        self.alerts = AlertManager()  # 全部泵共用一个告警队列，同一台泵的同类告警只保留一条
+
+        # 公共参数
+        self.speed_input = QDoubleSpinBox()
+        self.speed_input.setDecimals(3)
+        self.speed_input.setRange(SPEED_MIN, SPEED_MAX)
+        self.speed_input.setSingleStep(0.001)
+        self.speed_input.setValue(0.1)
+        self.volume_input = QLineEdit("10")
+        self.volume_input.setFixedWidth(80)
+        start_all = QPushButton("全部开始")
+        stop_all = QPushButton("全部停止")
+        stop_all.setObjectName("stopButton")
+        params_layout = QHBoxLayout()
+        params_layout.addWidget(QLabel("注射速度 (μL/s):"))
+        params_layout.addWidget(self.speed_input)
+        params_layout.addWidget(QLabel("目标注射量 (μL):"))
+        params_layout.addWidget(self.volume_input)
+        params_layout.addStretch()
+        params_layout.addWidget(start_all)
+        params_layout.addWidget(stop_all)
+
+        # 泵阵列
+        grid_widget = QWidget()
+        grid = QGridLayout(grid_widget)
+        grid.setSpacing(8)
+        for i in range(pump_count):
+            pump = self.manager.add_pump(DrugPumpSimulator())
+            tile = PumpTile(pump, f"泵 {i + 1:02d}", self.check_infusion, self.alerts)
+            grid.addWidget(tile, i // self.COLUMNS, i % self.COLUMNS)
+            self.tiles.append(tile)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setWidget(grid_widget)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QVBoxLayout(central_widget)
+        main_layout.addLayout(params_layout)
+        main_layout.addWidget(AlertBanner(self.alerts))
+        main_layout.addWidget(scroll, 1)
+
+        start_all.clicked.connect(self.on_start_all)
+        stop_all.clicked.connect(self.on_stop_all)
+        self.manager.start()
+
+    def check_infusion(self, pump):
+        """按公共参数检查一台泵的注射 (输入、注射量和速度警告、计划安全规则)"""
+        return check_infusion(self.volume_input.text(), self.speed_input.value(),
+                              pump.snapshot().remaining, pump.volume, delivered_today=pump.delivered_today,
+                              delivered_last_hour=pump.delivered_last_hour)
+
+    def on_start_all(self):
+        """暂停的泵直接恢复；空闲的泵逐台检查，全部警告合并为一条确认告警，确认后一起开始"""
+        ready = []
+        for tile in self.tiles:
+            if tile.pump.state is PumpState.PAUSED:
+                tile.on_start_clicked()
+            elif not tile.pump.is_running and tile.pump.state is not PumpState.STOPPING:
+                check = tile.checked()
+                if check is not None:
+                    ready.append((tile, check))
+        if not ready:
+            return
+        warnings = sorted({f"{warning.title}: {warning.text}" for _, check in ready for warning in check.warnings})
+        volume, speed = ready[0][1].volume, ready[0][1].speed
+        lines = warnings + [f"确认 {len(ready)} 台泵同时开始注射 {volume} uL 药物? 注射速度: {speed} uL/s"]
+
+        def start_all():
+            for tile, check in ready:
+                tile.pump.start_infusion(check.volume, check.speed)
+
+        self.alerts.raise_alert(("confirm_start", "all"), AlertLevel.WARNING if warnings else AlertLevel.INFO,
+                                "确认全部开始", "\n".join(lines), "全部", action=("确认开始", start_all))
+
+    def on_stop_all(self):
+        for tile in self.tiles:
+            tile.pump.stop_infusion()
+
+    def closeEvent(self, event):
+        """关闭窗口时停止全部泵并结束调度线程"""
+        self.on_stop_all()
+        self.manager.shutdown(1.0)
+        super().closeEvent(event)
 
 
 # ==================================================================
 # 主程序入口
 # ==================================================================
+def serve_telemetry(pumps, port=TELEMETRY_PORT):
+    """在后台线程中启动遥测推送服务 (监听局域网)，pumps 为 {泵编号: 泵}，浏览器打开 http://本机:端口/ 查看"""
+    from srtp.streaming import TelemetryServer  # 只在开启服务时导入 asyncio
+
+    server = TelemetryServer("0.0.0.0", port, root=os.path.dirname(os.path.abspath(__file__)))
+    for pump_id, pump in pumps.items():
+        server.attach(pump_id, pump)
+    server.start()
+    return server
+
+
+def export_metrics(pumps, path, period_ms=METRICS_PERIOD_MS):
+    """为全部泵开启性能指标，并定期写出到 path (.json 为 JSON，其他为 Prometheus 文本)，返回 (Metrics, 定时器)"""
+    metrics = Metrics()
+    for pump in pumps.values():
+        pump.engine.metrics = metrics
+    timer = QTimer()
+    timer.timeout.connect(lambda: metrics.write(path))
+    timer.start(period_ms)
+    return metrics, timer
+
+
+def serve_rpc(pumps, address=RPC_PORT, metrics=None):
+    """在后台线程中启动本机 JSON-RPC 控制接口，address 为 localhost 端口或 Unix 套接字路径"""
+    from srtp.rpc import RpcServer  # 只在开启服务时导入 asyncio 和 NumPy
+
+    if isinstance(address, int):
+        server = RpcServer(pumps, port=address, metrics=metrics)
+    else:
+        server = RpcServer(pumps, path=address, metrics=metrics)
+    server.start()
+    return server
+
+
 if __name__ == "__main__":
+    startup = PhaseTimer(STARTED)
+    startup.mark("import")
     app = QApplication(sys.argv)
-    window = MainWindow()
+    # python ui.py --pumps 16 打开多泵监控窗口
+    if "--pumps" in sys.argv:
+        window = PumpBenchWindow(int(sys.argv[sys.argv.index("--pumps") + 1]))
+        pumps = {f"pump-{i + 1:02d}": tile.pump for i, tile in enumerate(window.tiles)}
+    else:
+        window = MainWindow(startup)
+        pumps = {DEVICE_ID: window.pump_simulator}
+    # python ui.py --serve [端口] 同时向局域网推送泵状态 (index.html 实时监控)
+    server = None
+    if "--serve" in sys.argv:
+        i = sys.argv.index("--serve") + 1
+        port = int(sys.argv[i]) if i < len(sys.argv) and sys.argv[i].isdigit() else TELEMETRY_PORT
+        server = serve_telemetry(pumps, port)
+        print(f"遥测推送服务: http://0.0.0.0:{server.port}/")
+    # python ui.py --metrics 文件 定期写出注射循环的性能指标 (--profile 同时开启采样分析)
+    metrics = metrics_path = None
+    if "--metrics" in sys.argv:
+        metrics_path = sys.argv[sys.argv.index("--metrics") + 1]
+        metrics, metrics_timer = export_metrics(pumps, metrics_path)
+        if "--profile" in sys.argv:
+            metrics.start_profiler()
+    # python ui.py --rpc [端口|套接字路径] 同时开放本机 JSON-RPC 控制接口 (自动化实验)
+    rpc = None
+    if "--rpc" in sys.argv:
+        i = sys.argv.index("--rpc") + 1
+        address = sys.argv[i] if i < len(sys.argv) and not sys.argv[i].startswith("--") else RPC_PORT
+        rpc = serve_rpc(pumps, int(address) if str(address).isdigit() else address, metrics)
+        print(f"控制接口: {rpc.path or f'127.0.0.1:{rpc.port}'}")
     window.show()
-    sys.exit(app.exec())
\ No newline at end of file
+    code = app.exec()
+    for service in (server, rpc):
+        if service is not None:
+            service.stop()
+    if metrics is not None:
+        metrics.stop_profiler()
+        metrics.write(metrics_path)
+    sys.exit(code)
\ No newline at end of file